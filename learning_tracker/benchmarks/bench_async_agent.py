@@ -0,0 +1,153 @@
+"""
+智能助手并发基准（本地假模型服务）
+
+启动一个兼容 OpenAI 接口的本地假模型服务（每次对话补全等待 --latency 秒后返回，模拟大模型的生成耗时），
+让 --conversations 个对话同时提问，比较：
+    sync   —— 同步实现 simple_agent，放在 --workers 个线程中执行（相当于 --workers 个同步工作线程）
+    async  —— 异步视图 agent/chat/ （asimple_agent）经 ASGI 处理器在一个事件循环里同时处理
+输出总耗时、吞吐量和假模型服务上同时进行的请求数峰值，
+并检查异步实现能让全部对话的模型请求同时进行、总耗时远小于同步实现。
+
+用法（在 learning_tracker 目录下）：
+    python benchmarks/bench_async_agent.py
+    python benchmarks/bench_async_agent.py --conversations 500 --latency 1 --workers 16
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from common import setup_django, temp_database
+
+QUESTION = '请简单解释一下什么是间隔重复学习法'
+ANSWER = '间隔重复是在即将遗忘时安排复习，逐步拉长复习间隔的学习方法。'
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    '''对 /chat/completions 等待 latency 秒后返回固定回答，记录同时进行的请求数峰值'''
+    daemon_threads = True
+    request_queue_size = 4096
+
+    def __init__(self, latency):
+        super().__init__(('127.0.0.1', 0), FakeLLMHandler)
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+        self.requests = 0
+
+    @property
+    def base_url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}/v1'
+
+    def reset(self):
+        with self.lock:
+            self.peak = self.requests = 0
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        server = self.server
+        with server.lock:
+            server.in_flight += 1
+            server.requests += 1
+            server.peak = max(server.peak, server.in_flight)
+        try:
+            time.sleep(server.latency)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+        body = json.dumps({
+            'id': 'chatcmpl-bench', 'object': 'chat.completion', 'created': int(time.time()), 'model': 'fake',
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': ANSWER}, 'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': 10, 'completion_tokens': 10, 'total_tokens': 20},
+        }, ensure_ascii=False).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run_sync(conversations, workers):
+    from tracker.views import simple_agent
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda _: simple_agent(QUESTION), range(conversations)))
+
+
+async def run_async(conversations):
+    from django.test import AsyncClient
+    from django.urls import reverse
+    url = reverse('agent_chat')
+
+    async def chat():
+        response = await AsyncClient().post(url, {'question': QUESTION})
+        return response.json().get('answer')
+
+    return await asyncio.gather(*(chat() for _ in range(conversations)))
+
+
+def report(name, server, conversations, elapsed, answers):
+    correct = sum(answer == ANSWER for answer in answers)
+    print(f'{name:5}：{conversations} 个对话用时 {elapsed:.2f}s，吞吐 {conversations / elapsed:.1f} 个/秒，'
+          f'模型请求 {server.requests} 次，同时进行的请求峰值 {server.peak}，回答正确 {correct}')
+    return correct == conversations
+
+
+def main():
+    parser = argparse.ArgumentParser(description='智能助手并发基准')
+    parser.add_argument('--conversations', type=int, default=200, help='同时进行的对话数')
+    parser.add_argument('--latency', type=float, default=0.5, help='假模型每次回答的耗时（秒）')
+    parser.add_argument('--workers', type=int, default=8, help='同步实现的工作线程数')
+    args = parser.parse_args()
+
+    server = FakeLLMServer(args.latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ['SCHOOL_LLM_BASE_URL'] = server.base_url
+    os.environ['SCHOOL_LLM_API_KEY'] = 'bench'
+    setup_django()
+    from django.test.utils import setup_test_environment
+    setup_test_environment()  # 允许测试客户端的 testserver 主机名
+
+    ok = True
+    with temp_database():
+        from tracker import views  # noqa: F401 预先导入，不计入耗时
+        asyncio.run(run_async(1))  # 预热：导入 langchain_openai、建立连接池
+        print(f'假模型服务 {server.base_url}，每次回答 {args.latency}s，同步工作线程 {args.workers} 个')
+
+        server.reset()
+        t0 = time.perf_counter()
+        answers = run_sync(args.conversations, args.workers)
+        sync_time = time.perf_counter() - t0
+        ok &= report('sync', server, args.conversations, sync_time, answers)
+
+        server.reset()
+        t0 = time.perf_counter()
+        answers = asyncio.run(run_async(args.conversations))
+        async_time = time.perf_counter() - t0
+        ok &= report('async', server, args.conversations, async_time, answers)
+
+        concurrent = server.peak >= args.conversations * 0.9
+        ok &= concurrent
+        print(f"[{'ok' if concurrent else 'FAIL':4}] 异步实现的模型请求同时进行（峰值 {server.peak}/{args.conversations}）")
+        faster = async_time * 3 < sync_time
+        ok &= faster
+        print(f"[{'ok' if faster else 'FAIL':4}] 异步实现总耗时远小于同步实现（{sync_time / async_time:.1f}x）")
+    server.shutdown()
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
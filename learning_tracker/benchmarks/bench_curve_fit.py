@@ -0,0 +1,98 @@
+"""
+遗忘曲线拟合基准
+
+在临时库中构造大量已完成的复习（默认100万条，2000门课程，每门课程随机给定真实的遗忘曲线，
+按真实保留率随机决定记住/忘记），计时 fit_forgetting_curves（一次分组查询 + 一次向量化最小二乘 + 写入），
+检查拟合曲线与真实曲线的保留率中位绝对误差（同时输出参数的中位相对误差）。
+
+用法（在 learning_tracker 目录下）：
+    python benchmarks/bench_curve_fit.py
+    python benchmarks/bench_curve_fit.py --rows 200000 --courses 500
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+from common import setup_django, temp_database
+
+setup_django()
+
+from django.db import connection  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from tracker.curve_fit import fit_forgetting_curves, get_fitted_curves  # noqa: E402
+from tracker.utils.forgetting_curve import DecayCurve  # noqa: E402
+
+ELAPSED_DAYS = [1, 2, 3, 5, 7, 10, 15, 30]
+
+
+def seed(rows, courses):
+    '''每门课程一条真实曲线；复习间隔从 ELAPSED_DAYS 中随机取，复习前已完成0~4次'''
+    rng = random.Random(42)
+    created = timezone.now().strftime('%Y-%m-%d %H:%M:%S')
+    truth = {i: DecayCurve(rng.uniform(2, 20), rng.uniform(1.3, 3.0)) for i in range(1, courses + 1)}
+    base = date(2020, 1, 1)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            'INSERT INTO tracker_course (id, name, description, created_at) VALUES (%s, %s, %s, %s)',
+            [(i, f'课程{i}', '', created) for i in truth]
+        )
+        batch = []
+        for i in range(rows):
+            course_id = i % courses + 1
+            days, count = rng.choice(ELAPSED_DAYS), rng.randrange(0, 5)
+            grade = 3 if rng.random() < truth[course_id].retention(days, count) else 1
+            batch.append(((base + timedelta(days=i // courses)).isoformat(), True, count + 1, created, created,
+                          course_id, days, grade))
+            if len(batch) == 50000 or i == rows - 1:
+                cursor.executemany(
+                    'INSERT INTO tracker_reviewschedule (review_date, completed, review_count, created_at, updated_at, '
+                    'course_id, elapsed_days, grade) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)', batch
+                )
+                batch = []
+    return truth
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='遗忘曲线拟合基准')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='已完成的复习条数（默认100万）')
+    parser.add_argument('--courses', type=int, default=2000, help='课程数')
+    parser.add_argument('--tolerance', type=float, default=0.05, help='允许的保留率中位绝对误差')
+    args = parser.parse_args()
+
+    ok = True
+    with temp_database():
+        t0 = time.perf_counter()
+        truth = seed(args.rows, args.courses)
+        print(f'写入 {args.rows} 条复习记录用时 {time.perf_counter() - t0:.1f}s')
+
+        report = fit_forgetting_curves(min_reviews=1)
+        print(report.summary())
+        curves = get_fitted_curves()
+        fitted = len(curves.courses) == args.courses
+        ok &= fitted
+        print(f"[{'ok' if fitted else 'FAIL':4}] 拟合课程数 {len(curves.courses)}/{args.courses}")
+
+        stability_error = median(abs(curves.get(c).stability / t.stability - 1) for c, t in truth.items())
+        growth_error = median(abs(curves.get(c).growth / t.growth - 1) for c, t in truth.items())
+        retention_error = median(
+            abs(curves.get(c).retention(d, 2) - t.retention(d, 2)) for c, t in truth.items() for d in ELAPSED_DAYS
+        )
+        close = retention_error <= args.tolerance
+        ok &= close
+        print(f"[{'ok' if close else 'FAIL':4}] 保留率中位绝对误差 {retention_error:.3f}"
+              f"（每门课程平均 {args.rows / args.courses:.0f} 条样本）")
+        print(f'         参数中位相对误差：稳定性 {stability_error:.1%}，倍数 {growth_error:.1%}')
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
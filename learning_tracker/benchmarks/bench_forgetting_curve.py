@@ -0,0 +1,88 @@
+"""
+遗忘曲线批量函数基准
+
+对同一批学习记录（默认100万条，随机学习时间与已复习次数），分别用逐条函数
+（calculate_review_dates / get_next_review_date / generate_review_schedule）
+和向量化的 batch_* 函数计算，比较耗时并抽样核对结果一致。
+
+用法（在 learning_tracker 目录下）：
+    python benchmarks/bench_forgetting_curve.py
+    python benchmarks/bench_forgetting_curve.py --items 200000
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from common import PROJECT_DIR
+
+if PROJECT_DIR not in sys.path:
+    sys.path.insert(0, PROJECT_DIR)
+
+from tracker.utils.forgetting_curve import (  # noqa: E402
+    batch_calculate_review_dates, batch_generate_review_schedule, batch_next_review_dates,
+    calculate_review_dates, generate_review_schedule, get_next_review_date,
+)
+
+
+def make_items(count, seed=42):
+    rng = np.random.default_rng(seed)
+    base = np.datetime64('2024-01-01T00:00:00', 's')
+    dates = base + rng.integers(0, 700 * 24 * 3600, size=count).astype('timedelta64[s]')
+    counts = rng.integers(0, 12, size=count)
+    return dates, counts
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description='遗忘曲线批量函数基准')
+    parser.add_argument('--items', type=int, default=1_000_000, help='学习记录条数（默认100万）')
+    parser.add_argument('--check', type=int, default=10_000, help='抽样核对的条数')
+    args = parser.parse_args()
+
+    dates, counts = make_items(args.items)
+    py_dates = dates.astype(object).tolist()  # datetime 对象，逐条函数的输入
+    py_counts = counts.tolist()
+
+    cases = [
+        ('calculate_review_dates',
+         lambda: [calculate_review_dates(d, c) for d, c in zip(py_dates, py_counts)],
+         lambda: batch_calculate_review_dates(dates, counts)),
+        ('get_next_review_date',
+         lambda: [get_next_review_date(d, c) for d, c in zip(py_dates, py_counts)],
+         lambda: batch_next_review_dates(dates, counts)),
+        ('generate_review_schedule',
+         lambda: [generate_review_schedule(d, c) for d, c in zip(py_dates, py_counts)],
+         lambda: batch_generate_review_schedule(dates, counts)),
+    ]
+    print(f'{args.items} 条学习记录')
+    mismatches = 0
+    for name, scalar, batch in cases:
+        scalar_result, scalar_time = timed(scalar)
+        batch_result, batch_time = timed(batch)
+        # 抽样核对：逐条结果转为datetime64后与批量结果比较
+        sample = np.random.default_rng(0).choice(args.items, size=min(args.check, args.items), replace=False)
+        for i in sample:
+            expected = scalar_result[i]
+            if name == 'generate_review_schedule':
+                got = list(zip(batch_result[0][i].astype(object), batch_result[1][i].tolist()))
+            elif name == 'calculate_review_dates':
+                got = batch_result[i].astype(object).tolist()
+            else:
+                got = batch_result[i].astype(object)
+            mismatches += got != expected
+        print(f'{name:26} 逐条 {scalar_time:8.2f}s   批量 {batch_time:8.3f}s   加速 {scalar_time / batch_time:7.1f}x')
+    if mismatches:
+        print(f'{mismatches} 条结果不一致')
+        sys.exit(1)
+    print('抽样结果一致')
+
+
+if __name__ == '__main__':
+    main()
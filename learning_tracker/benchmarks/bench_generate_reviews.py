@@ -0,0 +1,90 @@
+"""
+批量生成复习计划基准
+
+在临时库中构造大量学习项（默认100万个：课程×资料，每个学习项一条最近的学习记录，
+部分学习项带已完成的复习计划），计时 generate_reviews 的首次执行和重复执行（应不新建任何行）。
+
+用法（在 learning_tracker 目录下）：
+    python benchmarks/bench_generate_reviews.py
+    python benchmarks/bench_generate_reviews.py --items 200000 --chunk-size 10000
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from common import setup_django, temp_database
+
+setup_django()
+
+from django.db import connection  # noqa: E402
+
+from tracker.models import ReviewSchedule  # noqa: E402
+from tracker.review_plans import generate_reviews  # noqa: E402
+
+
+def seed(items, materials_per_course=500):
+    '''每个学习项一份资料和一条最近6天内的学习记录；约三成学习项已完成1~3次复习'''
+    rng = random.Random(42)
+    now = datetime.now(dt_timezone.utc).replace(tzinfo=None)
+    fmt = '%Y-%m-%d %H:%M:%S'
+    courses = (items + materials_per_course - 1) // materials_per_course
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            'INSERT INTO tracker_course (id, name, description, created_at) VALUES (%s, %s, %s, %s)',
+            [(i, f'课程{i}', '', now.strftime(fmt)) for i in range(1, courses + 1)]
+        )
+        materials, sessions, reviews = [], [], []
+        for i in range(1, items + 1):
+            course_id = (i - 1) // materials_per_course + 1
+            start = now - timedelta(minutes=rng.randrange(60, 6 * 24 * 60))
+            materials.append((i, f'资料{i}', 'book', '', '', 0, now.strftime(fmt), course_id))
+            sessions.append((start.strftime(fmt), (start + timedelta(minutes=30)).strftime(fmt), 30.0,
+                             now.strftime(fmt), now.strftime(fmt), '', course_id, i))
+            if rng.random() < 0.3:
+                for k in range(rng.randrange(1, 4)):
+                    reviews.append(((start - timedelta(days=k + 1)).strftime('%Y-%m-%d'), True, k,
+                                    now.strftime(fmt), now.strftime(fmt), course_id, i))
+            if len(materials) == 50000 or i == items:
+                cursor.executemany(
+                    'INSERT INTO tracker_studymaterial (id, name, material_type, description, file_path, estimated_time, '
+                    'created_at, course_id) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)', materials
+                )
+                cursor.executemany(
+                    'INSERT INTO tracker_studysession (start_time, end_time, duration, created_at, updated_at, notes, '
+                    'course_id, material_id) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)', sessions
+                )
+                cursor.executemany(
+                    'INSERT INTO tracker_reviewschedule (review_date, completed, review_count, created_at, updated_at, '
+                    'course_id, material_id) VALUES (%s, %s, %s, %s, %s, %s, %s)', reviews
+                )
+                materials, sessions, reviews = [], [], []
+        cursor.execute('ANALYZE')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量生成复习计划基准')
+    parser.add_argument('--items', type=int, default=1_000_000, help='学习项个数（默认100万）')
+    parser.add_argument('--chunk-size', type=int, default=5000, help='每批学习项数')
+    args = parser.parse_args()
+
+    with temp_database():
+        t0 = time.perf_counter()
+        seed(args.items)
+        print(f'写入 {args.items} 个学习项用时 {time.perf_counter() - t0:.1f}s')
+
+        report = generate_reviews(chunk_size=args.chunk_size)
+        print(f'首次执行：{report.summary()}')
+        expected = args.items * 3
+        rerun = generate_reviews(chunk_size=args.chunk_size)
+        print(f'重复执行：{rerun.summary()}')
+        pending = ReviewSchedule.objects.filter(completed=False).count()
+    if report.created != expected or rerun.created or pending != expected:
+        print(f'结果不符合预期：应新建 {expected} 条，实际 {report.created} 条，重复执行新建 {rerun.created} 条')
+        sys.exit(1)
+    print('结果正确')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+PDF向量索引缓存基准
+
+默认生成一本 --pages 页的纯文字PDF（每页约40行），用本地的确定性假嵌入模型
+（每条文本额外等待 --latency 秒，模拟嵌入接口的网络耗时）计时：
+首次提问（加载、分块、嵌入、建索引并写入缓存）、新进程读盘命中、进程内命中，
+并检查命中时没有调用嵌入接口、检索结果与新建的索引一致。
+最后生成一份每 --edit-every 页改动一页的修改版重新上传：PDF索引不命中，但未改动页的分块嵌入命中，
+输出嵌入缓存命中率和节省的接口调用次数。
+
+用法（在 learning_tracker 目录下）：
+    python benchmarks/bench_pdf_index.py
+    python benchmarks/bench_pdf_index.py --pages 100 --latency 0.01
+    python benchmarks/bench_pdf_index.py --pdf 某教材.pdf
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+from common import setup_django
+
+setup_django()
+
+from django.test import override_settings  # noqa: E402
+from langchain_core.embeddings import DeterministicFakeEmbedding  # noqa: E402
+
+from tracker import pdf_index  # noqa: E402
+
+
+class SlowEmbeddings(DeterministicFakeEmbedding):
+    '''每条文本等待 latency 秒的假嵌入模型'''
+    latency: float = 0.005
+    texts: int = 0
+
+    def embed_documents(self, texts):
+        self.texts += len(texts)
+        time.sleep(self.latency * len(texts))
+        return super().embed_documents(texts)
+
+
+def make_pdf(path, pages, edit_every=0):
+    '''每页约40行随机词组成的文字；edit_every>0 时每隔这么多页换一页内容'''
+    from matplotlib.backends.backend_pdf import PdfPages
+    from matplotlib.figure import Figure
+    words = [f'term{i}' for i in range(2000)]
+    with PdfPages(path) as pdf:
+        for page in range(pages):
+            edited = edit_every and page % edit_every == 0
+            rng = random.Random(page + (10 ** 6 if edited else 0))
+            figure = Figure(figsize=(8.27, 11.69))
+            for line in range(40):
+                text = ' '.join(rng.choice(words) for _ in range(8))
+                figure.text(0.05, 0.97 - line * 0.024, f'{page}.{line} {text}.', fontsize=8)
+            pdf.savefig(figure)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PDF向量索引缓存基准')
+    parser.add_argument('--pdf', help='使用已有的PDF文件（默认生成）')
+    parser.add_argument('--pages', type=int, default=300, help='生成的PDF页数')
+    parser.add_argument('--latency', type=float, default=0.005, help='每条文本的模拟嵌入耗时（秒）')
+    parser.add_argument('--edit-every', type=int, default=10, help='修改版每隔多少页改动一页')
+    args = parser.parse_args()
+
+    ok = True
+    embeddings = SlowEmbeddings(size=1024, latency=args.latency)
+    with tempfile.TemporaryDirectory() as tmp, override_settings(
+            PDF_INDEX_CACHE_DIR=os.path.join(tmp, 'index'), EMBEDDING_CACHE_PATH=os.path.join(tmp, 'embeddings.sqlite3')):
+        generated = not args.pdf
+        if generated:
+            args.pdf = os.path.join(tmp, 'book.pdf')
+            make_pdf(args.pdf, args.pages)
+        t0 = time.perf_counter()
+        built = pdf_index.load_pdf_index(args.pdf, embeddings)
+        build_time = time.perf_counter() - t0
+        chunks = embeddings.texts
+        print(f'首次提问：{chunks} 个分块，建立索引用时 {build_time:.2f}s')
+
+        disk = pdf_index.PdfIndexCache(os.path.join(tmp, 'index'))
+        key = pdf_index.index_key(pdf_index.pdf_digest(args.pdf))
+        t0 = time.perf_counter()
+        loaded = disk.load(key, embeddings)
+        disk_time = time.perf_counter() - t0
+        print(f'新进程读盘命中用时 {disk_time * 1000:.1f}ms')
+
+        t0 = time.perf_counter()
+        again = pdf_index.load_pdf_index(args.pdf, embeddings)
+        memory_time = time.perf_counter() - t0
+        print(f'进程内命中（含计算文件哈希）用时 {memory_time * 1000:.2f}ms')
+
+        no_calls = loaded is not None and again is built and embeddings.texts == chunks
+        ok &= no_calls
+        print(f"[{'ok' if no_calls else 'FAIL':4}] 命中时没有调用嵌入接口")
+        query = built.docstore.search(built.index_to_docstore_id[0]).page_content[:200]
+        same = [d.page_content for d in loaded.similarity_search(query, k=4)] == \
+            [d.page_content for d in built.similarity_search(query, k=4)]
+        ok &= same
+        print(f"[{'ok' if same else 'FAIL':4}] 读盘的索引检索结果与新建的一致")
+        print(f'缓存大小 {sum(size for _, size, _ in disk.entries()) / 1024 / 1024:.1f}MB，'
+              f'加速 {build_time / disk_time:.0f}x')
+
+        if generated:
+            edited = os.path.join(tmp, 'book-edited.pdf')
+            make_pdf(edited, args.pages, args.edit_every)
+            t0 = time.perf_counter()
+            _, stats = pdf_index.build_pdf_index(edited, embeddings)
+            print(f'修改版（每 {args.edit_every} 页改动一页）建立索引用时 {time.perf_counter() - t0:.2f}s：{stats.summary()}')
+            expected = 1 - 1 / args.edit_every
+            reused = stats.hit_ratio >= expected - 0.02
+            ok &= reused
+            print(f"[{'ok' if reused else 'FAIL':4}] 未改动页的分块全部命中嵌入缓存（预期约 {expected:.0%}）")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
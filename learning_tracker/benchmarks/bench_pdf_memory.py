@@ -0,0 +1,133 @@
+"""
+PDF流式建索引内存基准
+
+生成 --pages 页和它的四分之一页数的两本纯文字PDF（见 bench_pdf_index.make_pdf），
+分别用两种方式建立索引，每种情况在独立的子进程中测量内存：
+    eager   —— 整本加载（PyPDFLoader.load）→ 整本分块 → 全部分块一次嵌入 → 建立索引（改造前的做法）
+    stream  —— pdf_index.build_pdf_index：逐页加载 → 分块 → 每 --batch 个分块嵌入一批 → 追加到索引
+用 tracemalloc 统计 Python 对象的内存峰值，减去建完后仍被索引（分块内容、文档库）占用的部分，
+得到建索引过程中的临时内存；同时给出进程常驻内存（RSS）峰值的增量（含 FAISS 中的向量）。
+检查流式建索引的临时内存不随页数增长，且远小于整本加载。
+
+用法（在 learning_tracker 目录下）：
+    python benchmarks/bench_pdf_memory.py
+    python benchmarks/bench_pdf_memory.py --pages 2000 --batch 128
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from common import setup_django
+
+setup_django()
+
+from django.test import override_settings  # noqa: E402
+from langchain_core.embeddings import DeterministicFakeEmbedding  # noqa: E402
+
+from bench_pdf_index import make_pdf  # noqa: E402
+from tracker import pdf_index  # noqa: E402
+
+MB = 1024 * 1024
+
+
+def build_eager(pdf_path, embeddings, batch_size):
+    '''整本加载、分块、嵌入后一次建立索引'''
+    from langchain_community.document_loaders import PyPDFLoader
+    from langchain_community.vectorstores import FAISS
+    from django.conf import settings
+    from tracker.embedding_cache import CachedEmbeddings, get_embedding_store
+    docs = PyPDFLoader(pdf_path).load()
+    chunks = pdf_index.text_splitter().split_documents(docs)
+    texts = [chunk.page_content for chunk in chunks]
+    vectors = CachedEmbeddings(embeddings, get_embedding_store(settings.EMBEDDING_CACHE_PATH)).embed_documents(texts)
+    return FAISS.from_embeddings(list(zip(texts, vectors)), embeddings, metadatas=[chunk.metadata for chunk in chunks])
+
+
+def build_stream(pdf_path, embeddings, batch_size):
+    return pdf_index.build_pdf_index(pdf_path, embeddings, batch_size=batch_size)[0]
+
+
+BUILDERS = {'eager': build_eager, 'stream': build_stream}
+
+
+def measure(mode, pdf_path, batch_size, warm_pdf):
+    '''在子进程中执行：建立索引并输出内存统计（JSON）'''
+    embeddings = DeterministicFakeEmbedding(size=1024)
+    with tempfile.TemporaryDirectory() as tmp, \
+            override_settings(EMBEDDING_CACHE_PATH=os.path.join(tmp, 'embeddings.sqlite3')):
+        BUILDERS[mode](warm_pdf, embeddings, batch_size)  # 预热：导入依赖、初始化嵌入缓存（一页的PDF）
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        store = BUILDERS[mode](pdf_path, embeddings, batch_size)
+        elapsed = time.perf_counter() - t0
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        rss_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    print(json.dumps({
+        'chunks': store.index.ntotal, 'seconds': elapsed, 'peak': peak, 'retained': current,
+        'working': peak - current, 'rss': max(rss_peak - rss_before, 0),
+    }))
+
+
+def run_child(mode, pdf_path, batch_size, warm_pdf):
+    output = subprocess.run(
+        [sys.executable, __file__, '--child', mode, pdf_path, '--batch', str(batch_size), '--warm', warm_pdf],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PDF流式建索引内存基准')
+    parser.add_argument('--pages', type=int, default=400, help='大PDF的页数（另测四分之一页数的PDF）')
+    parser.add_argument('--batch', type=int, default=pdf_index.EMBED_BATCH, help='流式建索引每批嵌入的分块数')
+    parser.add_argument('--child', nargs=2, metavar=('MODE', 'PDF'), help=argparse.SUPPRESS)
+    parser.add_argument('--warm', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        measure(*args.child, args.batch, args.warm)
+        return
+
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        sizes = [args.pages // 4, args.pages]
+        paths = {}
+        t0 = time.perf_counter()
+        for pages in sizes:
+            paths[pages] = os.path.join(tmp, f'book-{pages}.pdf')
+            make_pdf(paths[pages], pages)
+        warm = os.path.join(tmp, 'warm.pdf')
+        make_pdf(warm, 1)
+        print(f'生成 {sizes} 页的PDF用时 {time.perf_counter() - t0:.1f}s，流式每批 {args.batch} 个分块')
+
+        results = {}
+        for pages in sizes:
+            for mode in BUILDERS:
+                r = results[mode, pages] = run_child(mode, paths[pages], args.batch, warm)
+                print(f'{mode:6} {pages:5} 页 {r["chunks"]:6} 个分块：用时 {r["seconds"]:.1f}s，'
+                      f'临时内存 {r["working"] / MB:7.1f}MB，索引占用 {r["retained"] / MB:6.1f}MB，'
+                      f'RSS峰值增量 {r["rss"] / MB:7.1f}MB')
+
+    small, large = sizes
+    growth = results['stream', large]['working'] / results['stream', small]['working']
+    bounded = growth < 1.5
+    ok &= bounded
+    print(f"[{'ok' if bounded else 'FAIL':4}] 流式建索引的临时内存不随页数增长"
+          f"（{small}→{large} 页增长 {growth:.2f}x）")
+    saving = results['eager', large]['working'] / results['stream', large]['working']
+    smaller = saving > 3
+    ok &= smaller
+    print(f"[{'ok' if smaller else 'FAIL':4}] {large} 页时流式建索引的临时内存是整本加载的 1/{saving:.0f}")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
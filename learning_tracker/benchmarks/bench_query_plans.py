@@ -0,0 +1,188 @@
+"""
+列表视图查询计划基准
+
+在临时库中写入大量学习记录（默认100万条），对各列表视图的查询执行
+SQLite 的 EXPLAIN QUERY PLAN，检查是否走索引：
+不允许出现全表扫描（SCAN 表名 且未使用索引），也不允许 USE TEMP B-TREE FOR ORDER BY。
+同时对比深页的键集分页与 OFFSET 分页耗时，以及 dashboard 趋势读取每日汇总与聚合原始记录的耗时。
+
+用法（在 learning_tracker 目录下）：
+    python benchmarks/bench_query_plans.py
+    python benchmarks/bench_query_plans.py --rows 200000
+"""
+import argparse
+import random
+import re
+import sys
+import time
+from datetime import datetime, timedelta
+
+from common import setup_django, temp_database
+
+setup_django()
+
+from django.db import connection  # noqa: E402
+from django.db.models import Sum  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from tracker.models import DailyStudyStat, PomodoroSession, ReviewSchedule, StudySession  # noqa: E402
+from tracker.utils.pagination import get_ordering, keyset_filter  # noqa: E402
+
+BAD_PLAN_PATTERNS = [
+    re.compile(r'^SCAN tracker_\w+$'),  # 未使用索引的全表扫描
+    re.compile(r'USE TEMP B-TREE FOR ORDER BY'),  # 排序无法利用索引
+]
+
+
+def seed(rows, courses=200):
+    '''用executemany批量写入测试数据（绕过ORM，只为快速造数）'''
+    rng = random.Random(42)
+    base = datetime(2024, 1, 1)
+    fmt = '%Y-%m-%d %H:%M:%S'
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            'INSERT INTO tracker_course (id, name, description, created_at) VALUES (%s, %s, %s, %s)',
+            [(i, f'课程{i}', '', base.strftime(fmt)) for i in range(1, courses + 1)]
+        )
+        batch = []
+        for i in range(1, rows + 1):
+            start = base + timedelta(minutes=rng.randrange(0, 60 * 24 * 700))
+            minutes = rng.randrange(10, 180)
+            batch.append((
+                i, start.strftime(fmt), (start + timedelta(minutes=minutes)).strftime(fmt),
+                float(minutes), start.strftime(fmt), start.strftime(fmt), '', rng.randrange(1, courses + 1)
+            ))
+            if len(batch) == 50000:
+                cursor.executemany(
+                    'INSERT INTO tracker_studysession (id, start_time, end_time, duration, created_at, updated_at, notes, '
+                    'course_id) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)', batch
+                )
+                batch = []
+        if batch:
+            cursor.executemany(
+                'INSERT INTO tracker_studysession (id, start_time, end_time, duration, created_at, updated_at, notes, '
+                'course_id) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)', batch
+            )
+        cursor.executemany(
+            'INSERT INTO tracker_pomodorosession (session_date, updated_at, start_time, focus_time, break_time, completed, '
+            'course_id) VALUES (%s, %s, %s, 25, 5, %s, %s)',
+            [
+                ((base + timedelta(minutes=m)).strftime(fmt), (base + timedelta(minutes=m)).strftime(fmt),
+                 (base + timedelta(minutes=m)).strftime(fmt), rng.random() < 0.9, rng.randrange(1, courses + 1))
+                for m in (rng.randrange(0, 60 * 24 * 700) for _ in range(rows // 10))
+            ]
+        )
+        # 每个课程每天最多一条复习计划（唯一约束），随机撞到同一天的直接忽略
+        cursor.executemany(
+            'INSERT OR IGNORE INTO tracker_reviewschedule (review_date, completed, review_count, created_at, updated_at, '
+            'course_id) VALUES (%s, %s, %s, %s, %s, %s)',
+            [
+                ((base + timedelta(days=d)).strftime('%Y-%m-%d'), rng.random() < 0.7, rng.randrange(0, 6),
+                 base.strftime(fmt), base.strftime(fmt), rng.randrange(1, courses + 1))
+                for d in (rng.randrange(0, 760) for _ in range(rows // 5))
+            ]
+        )
+    DailyStudyStat.rebuild()
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def view_querysets():
+    '''与各列表视图一致的查询'''
+    course_id = 1
+    date_start = timezone.make_aware(datetime(2025, 3, 1))
+    date_end = timezone.make_aware(datetime(2025, 3, 8))
+    sessions = StudySession.objects.select_related('course', 'material').all()
+    pomodoros = PomodoroSession.objects.select_related('course').all().order_by('-session_date')
+    all_reviews = ReviewSchedule.objects.select_related('course', 'material').all().order_by('review_date')
+    reviews = all_reviews.filter(completed=False)
+    thirty_days_ago = date_end - timedelta(days=30)
+    return [
+        ('session_list', sessions),
+        ('session_list?course', sessions.filter(course_id=course_id)),
+        ('session_list?date', sessions.filter(start_time__gte=date_start, start_time__lt=date_end, end_time__lt=date_end)),
+        ('session_list?course&date', sessions.filter(
+            course_id=course_id, start_time__gte=date_start, start_time__lt=date_end, end_time__lt=date_end)),
+        ('pomodoro_list', pomodoros),
+        ('pomodoro_list?course', pomodoros.filter(course_id=course_id)),
+        ('review_list', reviews),
+        ('review_list?course', reviews.filter(course_id=course_id)),
+        ('review_list?show_completed', all_reviews),
+        ('review_list?course&show_completed', all_reviews.filter(course_id=course_id)),
+        ('dashboard(30天)', DailyStudyStat.objects.filter(
+            date__gt=thirty_days_ago.date(), session_count__gt=0).values('date').annotate(
+            total=Sum('total_minutes')).order_by('date')),
+        ('dashboard(今日)', DailyStudyStat.objects.filter(date=date_start.date()).values('total_minutes')),
+    ]
+
+
+def deep_page_querysets(rows):
+    '''取排在中间位置的一行作为游标，构造深页查询：(名称, 键集查询, OFFSET查询)'''
+    result = []
+    sessions = StudySession.objects.select_related('course', 'material').all()
+    reviews = ReviewSchedule.objects.select_related('course', 'material').order_by('review_date').filter(completed=False)
+    for name, queryset, offset in [('session_list', sessions, rows // 2), ('review_list', reviews, rows // 20)]:
+        ordering = get_ordering(queryset)
+        ordered = queryset.order_by(*ordering)
+        key = list(ordered.values_list(*[f.lstrip('-') for f in ordering])[offset])
+        result.append((name, keyset_filter(queryset, ordering, key).order_by(*ordering), ordered[offset:]))
+    return result
+
+
+def explain(queryset):
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='列表视图查询计划基准')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='学习记录条数（默认100万）')
+    parser.add_argument('--page-size', type=int, default=50, help='计时时读取的行数')
+    args = parser.parse_args()
+
+    failures = 0
+    with temp_database():
+        t0 = time.perf_counter()
+        seed(args.rows)
+        print(f'写入 {args.rows} 条学习记录用时 {time.perf_counter() - t0:.1f}s')
+        # 趋势图：原始记录按天聚合 vs 读取每日汇总
+        since = timezone.make_aware(datetime(2025, 3, 8)) - timedelta(days=30)
+        t0 = time.perf_counter()
+        StudySession.objects.filter(start_time__gte=since).aggregate(Sum('duration'))
+        raw = 1000 * (time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        list(DailyStudyStat.objects.filter(date__gt=since.date()).values('date').annotate(Sum('total_minutes')))
+        print(f'dashboard 30天聚合：原始记录 {raw:.1f}ms  每日汇总 {1000 * (time.perf_counter() - t0):.1f}ms')
+
+        deep_pages = deep_page_querysets(args.rows)
+        checks = view_querysets() + [(f'{name} 深页(键集)', keyset) for name, keyset, _ in deep_pages]
+        for name, queryset in checks:
+            plan = explain(queryset)
+            bad = [line for line in plan if any(p.search(line) for p in BAD_PLAN_PATTERNS)]
+            t0 = time.perf_counter()
+            list(queryset[:args.page_size])
+            elapsed = 1000 * (time.perf_counter() - t0)
+            status = 'FAIL' if bad else 'ok'
+            failures += bool(bad)
+            print(f'[{status:4}] {name:28} {elapsed:8.2f}ms')
+            for line in plan:
+                print(f'         {line}')
+
+        print('深页耗时对比（键集 vs OFFSET）：')
+        for name, keyset, offset in deep_pages:
+            timings = []
+            for queryset in (keyset, offset):
+                t0 = time.perf_counter()
+                list(queryset[:args.page_size])
+                timings.append(1000 * (time.perf_counter() - t0))
+            print(f'         {name:16} 键集 {timings[0]:8.2f}ms   OFFSET {timings[1]:8.2f}ms')
+    if failures:
+        print(f'{failures} 个查询未能完全利用索引')
+        sys.exit(1)
+    print('全部查询均走索引')
+
+
+if __name__ == '__main__':
+    main()
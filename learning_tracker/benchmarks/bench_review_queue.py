@@ -0,0 +1,132 @@
+"""
+今日复习队列基准
+
+在临时库中构造大量未完成复习计划（默认100万条，约两成已到期），检查分组统计走覆盖索引，
+并计时队列第一页、连续翻页和按课程筛选；与“取出全部到期计划逐条计算保留率再排序”的做法对比。
+
+用法（在 learning_tracker 目录下）：
+    python benchmarks/bench_review_queue.py
+    python benchmarks/bench_review_queue.py --rows 500000 --limit 50
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import timedelta
+
+from common import setup_django, temp_database
+
+setup_django()
+
+from django.db import connection  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from tracker.models import ReviewSchedule  # noqa: E402
+from tracker.review_queue import due_reviews, get_due_queue  # noqa: E402
+from tracker.utils.forgetting_curve import get_retention_rate  # noqa: E402
+
+
+def seed(rows, courses=2000, past_days=100):
+    '''每个课程每天一条计划：复习日期从 past_days 天前开始逐日往后，上次学习/复习在复习日期前1~60天'''
+    rng = random.Random(42)
+    today = timezone.localdate()
+    created = timezone.now().strftime('%Y-%m-%d %H:%M:%S')
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            'INSERT INTO tracker_course (id, name, description, created_at) VALUES (%s, %s, %s, %s)',
+            [(i, f'课程{i}', '', created) for i in range(1, courses + 1)]
+        )
+        batch = []
+        for i in range(rows):
+            review_date = today + timedelta(days=i // courses - past_days)
+            seen = review_date - timedelta(days=rng.randrange(1, 61))
+            batch.append((review_date.isoformat(), False, rng.randrange(0, 7), created, created, i % courses + 1,
+                          seen.isoformat() if rng.random() < 0.9 else None))
+            if len(batch) == 50000 or i == rows - 1:
+                cursor.executemany(
+                    'INSERT INTO tracker_reviewschedule (review_date, completed, review_count, created_at, updated_at, '
+                    'course_id, last_reviewed) VALUES (%s, %s, %s, %s, %s, %s, %s)', batch
+                )
+                batch = []
+        cursor.execute('ANALYZE')
+
+
+def explain(queryset):
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def timed(func, repeat=3):
+    best, result = None, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def naive_queue(today, limit):
+    '''对照：取出全部到期计划，逐条调用 get_retention_rate 后排序'''
+    rows = ReviewSchedule.objects.filter(completed=False, review_date__lte=today).select_related('course', 'material')
+    ranked = sorted(
+        rows,
+        key=lambda r: (get_retention_rate((today - (r.last_reviewed or r.review_date)).days, r.review_count),
+                       r.last_reviewed or r.review_date, r.review_count, r.review_date, r.pk)
+    )
+    return [r.pk for r in ranked[:limit]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='今日复习队列基准')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='未完成复习计划条数（默认100万）')
+    parser.add_argument('--limit', type=int, default=20, help='每页条数')
+    parser.add_argument('--pages', type=int, default=10, help='连续翻页数')
+    args = parser.parse_args()
+
+    ok = True
+    with temp_database():
+        t0 = time.perf_counter()
+        seed(args.rows)
+        print(f'写入 {args.rows} 条复习计划用时 {time.perf_counter() - t0:.1f}s')
+        today = timezone.localdate()
+
+        bucket_query = due_reviews(today).order_by().values_list('seen', 'review_count')
+        plan = explain(bucket_query)
+        covering = any('COVERING INDEX review_due_queue_idx' in line for line in plan)
+        ok &= covering
+        print(f"[{'ok' if covering else 'FAIL':4}] 分组统计查询计划")
+        for line in plan:
+            print(f'         {line}')
+
+        elapsed, first = timed(lambda: get_due_queue(args.limit, today=today))
+        print(f'第一页：到期 {first.due_count} 条，取前 {len(first.items)} 条用时 {elapsed * 1000:.1f}ms')
+
+        def walk():
+            cursor, ids = None, []
+            for _ in range(args.pages):
+                page = get_due_queue(args.limit, cursor, today=today)
+                ids += [review.pk for review, _ in page.items]
+                cursor = page.next_cursor
+                if not cursor:
+                    break
+            return ids
+        elapsed, ids = timed(walk, repeat=1)
+        print(f'连续翻 {args.pages} 页用时 {elapsed * 1000:.1f}ms（每页 {elapsed * 1000 / args.pages:.1f}ms）')
+
+        elapsed, _ = timed(lambda: get_due_queue(args.limit, course_ids=[1, 2, 3], today=today))
+        print(f'按课程筛选用时 {elapsed * 1000:.1f}ms')
+
+        elapsed, expected = timed(lambda: naive_queue(today, args.limit * args.pages), repeat=1)
+        print(f'对照（逐条计算保留率后排序）用时 {elapsed * 1000:.1f}ms')
+        same = ids == expected
+        ok &= same
+        print(f"[{'ok' if same else 'FAIL':4}] 翻页结果与逐条排序一致")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+复习负载模拟基准（同时作为调度代码的性能回归基准）
+
+用 tracker/utils/review_simulation.py 模拟 N 个学习者 D 天的复习负载，输出每天的复习量、
+高峰日和积压情况，并计时；先在小规模数据上与逐条调用 get_next_review_date 的结果核对。
+超过 --max-seconds 时以非零状态退出，可放进CI检查调度代码的性能回退。
+
+用法（在 learning_tracker 目录下）：
+    python benchmarks/bench_review_simulation.py
+    python benchmarks/bench_review_simulation.py --learners 100000 --days 365 --rate 1.2 --capacity 8
+    python benchmarks/bench_review_simulation.py --weekly 1.2,1.2,1.2,1.2,1,0.5,0.5 --activity-shape 2
+"""
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+
+from common import PROJECT_DIR
+
+sys.path.insert(0, PROJECT_DIR)
+
+import numpy as np  # noqa: E402
+
+from tracker.utils.forgetting_curve import get_next_review_date  # noqa: E402
+from tracker.utils.review_simulation import review_load, simulate_reviews  # noqa: E402
+
+
+def scalar_review_load(studied):
+    '''对照：逐项内容逐次调用 get_next_review_date'''
+    learners, days = studied.shape
+    load = np.zeros((learners, days), dtype=np.int64)
+    base = datetime(2025, 1, 1)
+    for n in range(learners):
+        for day in range(days):
+            for _ in range(studied[n, day]):
+                count = 0
+                while True:
+                    due = (get_next_review_date(base + timedelta(days=day), count) - base).days
+                    if due >= days:
+                        break
+                    load[n, due] += 1
+                    count += 1
+    return load
+
+
+def main():
+    parser = argparse.ArgumentParser(description='复习负载模拟基准')
+    parser.add_argument('--learners', type=int, default=100_000, help='学习者数（默认10万）')
+    parser.add_argument('--days', type=int, default=365, help='模拟天数')
+    parser.add_argument('--rate', type=float, default=1.0, help='每人每天新学习内容数的均值')
+    parser.add_argument('--weekly', help='按星期一到星期日的7个均值，逗号分隔（覆盖 --rate）')
+    parser.add_argument('--capacity', type=int, default=10, help='每人每天最多完成的复习数，0 表示不限')
+    parser.add_argument('--activity-shape', type=float, help='学习者活跃度差异（伽马分布形状参数）')
+    parser.add_argument('--max-seconds', type=float, default=20.0, help='模拟耗时上限，超过则失败')
+    args = parser.parse_args()
+    rate = [float(x) for x in args.weekly.split(',')] if args.weekly else args.rate
+
+    sample = np.random.default_rng(1).poisson(1.0, size=(50, args.days))
+    t0 = time.perf_counter()
+    expected = scalar_review_load(sample)
+    scalar_time = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    same = np.array_equal(review_load(sample), expected)
+    vector_time = time.perf_counter() - t0
+    print(f"[{'ok' if same else 'FAIL':4}] 50人×{args.days}天 向量化与逐条计算一致："
+          f'逐条 {scalar_time * 1000:.1f}ms，向量化 {vector_time * 1000:.2f}ms')
+
+    t0 = time.perf_counter()
+    result = simulate_reviews(args.learners, args.days, rate, capacity=args.capacity or None,
+                              activity_shape=args.activity_shape)
+    elapsed = time.perf_counter() - t0
+    summary = result.summary()
+    print(f'模拟 {args.learners} 人×{args.days} 天用时 {elapsed:.2f}s')
+    print(f"  新学习内容 {summary['total_studied']}，到期复习 {summary['total_due']}")
+    print(f"  人均每天复习 {summary['mean_due_per_learner_day']}，最后30天 {summary['steady_due_per_learner_day']}")
+    print(f"  单人单日到期数P95峰值 {summary['learner_peak_p95']}")
+    print('  高峰日（第几天: 到期数）：' + '，'.join(f'{day}: {due}' for day, due in summary['peak_days']))
+    if args.capacity:
+        print(f"  每天上限 {args.capacity}：最多 {summary['max_overloaded_learners']} 人当天超出，"
+              f"积压最多 {summary['max_backlog']}，期末积压 {summary['final_backlog']}")
+    print('  每30天人均每天复习：' + ' '.join(
+        f'{chunk.mean() / args.learners:.2f}' for chunk in np.array_split(result.due, max(1, args.days // 30))
+    ))
+
+    fast = elapsed <= args.max_seconds
+    print(f"[{'ok' if fast else 'FAIL':4}] 耗时不超过 {args.max_seconds}s")
+    if not (same and fast):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
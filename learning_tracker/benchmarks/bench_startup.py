@@ -0,0 +1,111 @@
+"""
+启动耗时基准（基于 python -X importtime）
+
+在子进程中模拟两种启动：
+    web     —— django.setup() 并导入全部URL路由（Web工作进程启动）
+    manage  —— 执行 check 管理命令
+解析 -X importtime 的输出，统计总导入耗时和最耗时的顶层包，
+并检查 LangChain / OpenAI / FAISS / PyPDF / matplotlib 等重依赖没有在启动时被导入。
+附带给出开启 TRACKER_WARM_UP=1 时的启动耗时，便于对比预热的代价。
+
+用法（在 learning_tracker 目录下）：
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 5 --budget-ms 1500
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from common import PROJECT_DIR
+
+# 启动时不允许出现的顶层包（只应在首次使用AI助手或绘图时加载）
+LAZY_PACKAGES = {
+    'langchain', 'langchain_core', 'langchain_community', 'langchain_openai', 'langchain_text_splitters',
+    'openai', 'tiktoken', 'faiss', 'pypdf', 'matplotlib',
+}
+
+SETUP = (
+    "import os, sys; sys.path.insert(0, os.getcwd()); "
+    "os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'learning_tracker.settings'); "
+    "import django; django.setup(); "
+)
+# 结束时把已加载的顶层包名输出到stdout（-X importtime 的输出在stderr）
+REPORT_MODULES = "; print(' '.join(sorted({m.split('.')[0] for m in sys.modules})))"
+
+SCENARIOS = {
+    'web': SETUP + "from django.urls import get_resolver; get_resolver().url_patterns" + REPORT_MODULES,
+    'manage': SETUP + "from django.core.management import call_command; call_command('check')" + REPORT_MODULES,
+}
+
+LINE_RE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def run_importtime(command, env=None):
+    '''运行一次，返回 (总导入耗时ms, {顶层包: 累计耗时ms}, 已加载的全部顶层包名)'''
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', command],
+        cwd=PROJECT_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    total_us = 0
+    packages = defaultdict(int)
+    for line in result.stderr.splitlines():
+        match = LINE_RE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, module = int(match[1]), int(match[2]), match[3], match[4]
+        total_us += self_us
+        if len(indent) == 1:  # 顶层导入，累计耗时已包含其依赖
+            packages[module.split('.')[0]] += cumulative_us
+    lines = result.stdout.splitlines()
+    imported = set(lines[-1].split()) if lines else set()
+    return total_us / 1000, {name: us / 1000 for name, us in packages.items()}, imported
+
+
+def measure(command, runs, env=None):
+    '''多次运行取中位数；顶层包耗时取最后一次'''
+    totals = []
+    packages, imported = {}, set()
+    for _ in range(runs):
+        total, packages, imported = run_importtime(command, env)
+        totals.append(total)
+    return statistics.median(totals), packages, imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description='启动耗时基准')
+    parser.add_argument('--runs', type=int, default=3, help='每个场景运行次数（取中位数）')
+    parser.add_argument('--top', type=int, default=8, help='列出最耗时的顶层包个数')
+    parser.add_argument('--budget-ms', type=float, default=1500, help='web 场景导入耗时上限（毫秒）')
+    args = parser.parse_args()
+
+    failures = 0
+    env = dict(os.environ, TRACKER_WARM_UP='0')
+    for name, command in SCENARIOS.items():
+        total, packages, imported = measure(command, args.runs, env)
+        eager = sorted(LAZY_PACKAGES & imported)
+        status = 'FAIL' if eager else 'ok'
+        failures += bool(eager)
+        print(f'[{status:4}] {name:8} 导入耗时 {total:8.1f}ms')
+        for package, ms in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+            print(f'         {package:28} {ms:8.1f}ms')
+        if eager:
+            print(f'         启动时导入了应按需加载的包：{", ".join(eager)}')
+        if name == 'web' and total > args.budget_ms:
+            print(f'         超出预算 {args.budget_ms:.0f}ms')
+            failures += 1
+
+    warm_total, _, warm_imported = measure(SCENARIOS['web'], args.runs, dict(os.environ, TRACKER_WARM_UP='1'))
+    warmed = sorted(LAZY_PACKAGES & warm_imported)
+    print(f'[info] web+预热 导入耗时 {warm_total:8.1f}ms（预热加载：{", ".join(warmed) or "无"}）')
+
+    if failures:
+        sys.exit(1)
+    print('启动时未加载AI与绘图依赖')
+
+
+if __name__ == '__main__':
+    main()
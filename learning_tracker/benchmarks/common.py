@@ -0,0 +1,28 @@
+"""
+基准脚本公共部分：初始化Django环境、创建临时测试数据库
+"""
+import os
+import sys
+from contextlib import contextmanager
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup_django():
+    '''把项目目录加入sys.path并初始化Django'''
+    if PROJECT_DIR not in sys.path:
+        sys.path.insert(0, PROJECT_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'learning_tracker.settings')
+    import django
+    django.setup()
+
+
+@contextmanager
+def temp_database():
+    '''在临时测试库（SQLite为内存库）中执行迁移，退出时销毁，不影响 db.sqlite3'''
+    from django.db import connection
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
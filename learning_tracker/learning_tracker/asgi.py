@@ -5,6 +5,9 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+智能助手的流式聊天（agent/chat/stream/）在 ASGI 下边生成边推送，例如：
+    uvicorn learning_tracker.asgi:application
 """
 
 import os
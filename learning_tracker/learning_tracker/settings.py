@@ -125,6 +125,34 @@ STATICFILES_DIRS = [
 # 媒体文件（用于保存生成的图表）
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# 仪表板图表缓存目录（文件名含数据版本哈希，可随时清空）
+CHART_CACHE_DIR = os.path.join(MEDIA_ROOT, 'charts')
+# 图表渲染进程池：工作进程数（0 表示在请求进程内渲染）、排队上限、等待超时（秒）
+CHART_RENDER_WORKERS = int(os.environ.get('CHART_RENDER_WORKERS', 2))
+CHART_RENDER_QUEUE_SIZE = 8
+CHART_RENDER_TIMEOUT = 5.0
+# PDF向量索引缓存目录（按PDF内容哈希保存，可随时清空）和大小上限，超出时删除最久未使用的索引
+PDF_INDEX_CACHE_DIR = os.path.join(BASE_DIR, 'temp', 'pdf_index')
+PDF_INDEX_CACHE_MAX_BYTES = int(os.environ.get('PDF_INDEX_CACHE_MAX_MB', 512)) * 1024 * 1024
+# 分块嵌入缓存（SQLite，键为 模型+维度+分块文字 的哈希，可随时删除）
+EMBEDDING_CACHE_PATH = os.path.join(BASE_DIR, 'temp', 'embedding_cache.sqlite3')
+# PDF后台解析线程数（0 表示在上传请求内同步解析）；提问时解析仍在进行最多等待的秒数
+PDF_INGEST_WORKERS = int(os.environ.get('PDF_INGEST_WORKERS', 1))
+PDF_INGEST_CHAT_WAIT = 20
+
+# 增量导出只导出这么多秒之前更新的行，刚写入、事务可能尚未提交的行留到下次导出
+EXPORT_SETTLE_SECONDS = 5
+
+# 复习调度引擎：fixed（默认，固定间隔表）、fsrs（按复习评分自适应调整间隔）
+# 或 curve（按 fit_forgetting_curves 拟合的课程遗忘曲线，没有拟合参数的课程用固定间隔表）。
+# 拟合的遗忘曲线只在选择 curve 时用于安排复习（今日复习队列的排序始终使用），需要时显式开启
+REVIEW_SCHEDULER = os.environ.get('REVIEW_SCHEDULER', 'fixed')
+# 复习负载均衡：生成复习计划时在目标日期前后 REVIEW_LOAD_FUZZ_DAYS 天内挑待复习最少的一天
+REVIEW_LOAD_LEVELING = os.environ.get('REVIEW_LOAD_LEVELING') == '1'
+REVIEW_LOAD_FUZZ_DAYS = 3
+
+# 启动时预热AI与绘图依赖（适合 gunicorn --preload 等预派生部署），默认按需加载
+TRACKER_WARM_UP = os.environ.get('TRACKER_WARM_UP') == '1'
 
 
 # Default primary key field type
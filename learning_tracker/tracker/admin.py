@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Course,StudySession,KnowledgePoint,StudyMaterial,ReviewSchedule,PomodoroSession # 导入数据库模型
+from .models import Course,StudySession,KnowledgePoint,StudyMaterial,ReviewSchedule,PomodoroSession,CourseStudyStat,DailyStudyStat,DataVersion,ForgettingCurveFit,PdfIngestion # 导入数据库模型
 
 # Register your models here.
 # 注册模型
@@ -8,8 +8,30 @@ admin.site.register(StudySession)
 admin.site.register(KnowledgePoint)
 admin.site.register(ReviewSchedule)
 admin.site.register(PomodoroSession)
-admin.site.register(StudyMaterial)
+admin.site.register(CourseStudyStat)
+admin.site.register(DailyStudyStat)
+admin.site.register(DataVersion)
+admin.site.register(ForgettingCurveFit)
+admin.site.register(PdfIngestion)
 
 
+@admin.register(StudyMaterial)
+class StudyMaterialAdmin(admin.ModelAdmin):
+    '''学习资料：列表页通过with_study_stats()一次查询带出学习统计'''
+    list_display=('name','course','material_type','total_minutes','session_count','last_studied')
+    list_filter=('material_type',)
 
+    def get_queryset(self,request):
+        return super().get_queryset(request).select_related('course').with_study_stats()
 
+    @admin.display(description='已学时长（分钟）',ordering='total_minutes')
+    def total_minutes(self,obj):
+        return round(obj.total_minutes,2)
+
+    @admin.display(description='学习次数',ordering='session_count')
+    def session_count(self,obj):
+        return obj.session_count
+
+    @admin.display(description='最近学习',ordering='last_studied')
+    def last_studied(self,obj):
+        return obj.last_studied
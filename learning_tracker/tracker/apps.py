@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class TrackerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tracker'
+
+    def ready(self):
+        # 预派生部署（如 gunicorn --preload）可开启预热，在主进程中导入AI与绘图依赖，子进程fork后直接共享
+        if getattr(settings, 'TRACKER_WARM_UP', False):
+            from .llm import warm_up
+            warm_up()
@@ -0,0 +1,133 @@
+"""
+仪表板图表缓存
+
+图表按 (图表类型, 学习数据版本及其更新时间[, 本地日期]) 计算哈希作为文件名，保存在 CHART_CACHE_DIR。
+学习记录写入会递增数据版本，文件名随之变化；数据不变时直接返回已生成的图片，
+不查询趋势数据，也不做任何绘图。文件名即内容标识，因此可以长期缓存。
+缓存未命中时交给渲染进程池（tracker/utils/chart_render.py）绘制，
+队列已满或超时时本次页面不显示该图表，渲染完成后写入缓存供后续请求使用。
+"""
+import atexit
+import hashlib
+import logging
+import re
+import threading
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import Sum
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import DailyStudyStat
+from .utils.chart_render import (
+    DEFAULT_QUEUE_SIZE, DEFAULT_TIMEOUT, DEFAULT_WORKERS, BrokenProcessPool, ChartQueueFull, ChartRenderPool,
+    TimeoutError,
+)
+
+logger = logging.getLogger(__name__)
+
+CHART_NAME_RE = re.compile(r'^(trend|distribution)-[0-9a-f]{16}\.png$')
+KEEP_PER_KIND = 4  # 每种图表保留的历史版本数（旧页面上的图片链接短时间内仍然有效）
+CACHE_MAX_AGE = 365 * 24 * 3600
+
+_pool = None
+_pool_config = None
+_pool_lock = threading.Lock()
+
+
+def get_render_pool():
+    '''按配置返回渲染进程池（配置变化时重建）'''
+    global _pool, _pool_config
+    config = (
+        getattr(settings, 'CHART_RENDER_WORKERS', DEFAULT_WORKERS),
+        getattr(settings, 'CHART_RENDER_QUEUE_SIZE', DEFAULT_QUEUE_SIZE),
+        getattr(settings, 'CHART_RENDER_TIMEOUT', DEFAULT_TIMEOUT),
+    )
+    with _pool_lock:
+        if _pool is None or _pool_config != config:
+            if _pool is not None:
+                _pool.shutdown()
+            _pool, _pool_config = ChartRenderPool(*config), config
+        return _pool
+
+
+@atexit.register
+def _shutdown_pool():
+    if _pool is not None:
+        _pool.shutdown()
+
+
+def chart_dir():
+    path = Path(settings.CHART_CACHE_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def chart_name(kind, *key_parts):
+    '''由图表类型和缓存键计算文件名'''
+    digest = hashlib.sha256('|'.join(str(p) for p in (kind,) + key_parts).encode('utf-8')).hexdigest()
+    return f'{kind}-{digest[:16]}.png'
+
+
+def _prune(kind):
+    '''只保留最近生成的 KEEP_PER_KIND 个版本'''
+    files = sorted(chart_dir().glob(f'{kind}-*.png'), key=lambda p: p.stat().st_mtime, reverse=True)
+    for old in files[KEEP_PER_KIND:]:
+        try:
+            old.unlink()
+        except OSError:
+            pass
+
+
+def get_chart(kind, key_parts, load_data):
+    '''返回图表URL；缓存未命中时才调用 load_data() 并提交渲染。
+    无数据、渲染队列已满、超时或渲染出错时返回None，页面照常返回'''
+    name = chart_name(kind, *key_parts)
+    path = chart_dir() / name
+    if not path.exists():
+        data = load_data()
+        if not data:
+            return None
+        try:
+            get_render_pool().render(kind, data, str(path))
+        except ChartQueueFull:
+            logger.warning('图表渲染队列已满，跳过 %s', name)
+            return None
+        except TimeoutError:
+            logger.warning('图表渲染超时，稍后写入缓存 %s', name)
+            return None
+        except BrokenProcessPool:
+            logger.exception('图表渲染进程异常退出 %s', name)
+            return None
+        except Exception:
+            # 绘图或数据出错只影响这张图表，仪表板照常返回
+            logger.exception('图表渲染失败 %s', name)
+            return None
+        _prune(kind)
+    return reverse('dashboard_chart', args=[name])
+
+
+def load_trend(today):
+    '''最近30天（本地日期）每天的学习时长，读取每日汇总'''
+    rows = DailyStudyStat.objects.filter(
+        date__gt=today - timedelta(days=30),
+        session_count__gt=0
+    ).values('date').annotate(
+        total_duration=Sum('total_minutes')
+    ).order_by('date')
+    return [(row['date'], round(row['total_duration'] / 60, 2)) for row in rows]
+
+
+def trend_chart(version):
+    '''学习时长趋势图；窗口随本地日期移动，所以缓存键包含当天日期'''
+    today = timezone.localdate()
+    return get_chart('trend', (version, today), lambda: load_trend(today))
+
+
+def distribution_chart(version, course_stats):
+    '''课程时间分布饼图，course_stats 为带 total_time（分钟）的课程列表'''
+    def load():
+        return [(c.name, round(c.total_time / 60, 2)) for c in course_stats if c.total_time]
+    return get_chart('distribution', (version,), load)
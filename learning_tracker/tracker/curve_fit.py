@@ -0,0 +1,147 @@
+"""
+按复习记录拟合各课程（可选各学习资料）的遗忘曲线
+
+完成复习时记下距上次学习/复习的天数（elapsed_days）和评分，评分高于“忘记”算作记住。
+fit_forgetting_curves 用一次分组查询把所有已完成的复习汇总成 (课程, 资料, 间隔天数, 复习次数) 的条数，
+交给 fit_decay_curves 一次算出所有课程的参数（见 utils/forgetting_curve.py），
+样本不少于 min_reviews 的课程/资料整体替换写入 ForgettingCurveFit，并递增数据版本。
+
+get_fitted_curves() 返回按数据版本缓存的参数；今日复习队列和 curve 调度引擎用它估算保留率、
+安排间隔，没有拟合参数的课程仍用 get_retention_rate / 固定间隔表。
+"""
+import time
+from typing import Optional
+
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .models import DataVersion, ForgettingCurveFit, ReviewSchedule
+from .utils.forgetting_curve import DecayCurve, batch_decay_retention, batch_retention_rate, fit_decay_curves
+from .utils.schedulers import GRADE_AGAIN
+
+DEFAULT_MIN_REVIEWS = 30
+
+
+class CurveFitReport:
+    """一次拟合的统计"""
+
+    def __init__(self):
+        self.reviews = 0
+        self.courses = 0
+        self.materials = 0
+        self.skipped = 0
+        self.elapsed = 0.0
+
+    def summary(self):
+        return (
+            f'复习记录 {self.reviews} 条，拟合课程 {self.courses} 门、学习资料 {self.materials} 份，'
+            f'样本不足跳过 {self.skipped} 个，用时 {self.elapsed:.2f}s'
+        )
+
+
+def review_samples():
+    '''按 (课程, 资料, 间隔天数, 复习前已完成次数) 汇总已完成且有评分的复习：[(..., 条数, 记住条数)]'''
+    return list(
+        ReviewSchedule.objects.filter(completed=True, grade__isnull=False, elapsed_days__gt=0)
+        .order_by().values_list('course_id', 'material_id', 'elapsed_days', 'review_count')
+        .annotate(total=Count('id'), recalled=Count('id', filter=Q(grade__gt=GRADE_AGAIN)))
+    )
+
+
+def _fit_groups(keys, days, counts, totals, recalled, min_reviews):
+    '''按 keys 分组拟合，返回 ({key: (DecayCurve, 样本数)}, 样本不足的组数)'''
+    import numpy as np
+    unique, groups = np.unique(keys, return_inverse=True)
+    stability, growth, samples = fit_decay_curves(groups, days, counts, totals, recalled, len(unique))
+    fitted, skipped = {}, 0
+    for key, s, g, n in zip(unique.tolist(), stability.tolist(), growth.tolist(), samples.tolist()):
+        if n >= min_reviews:
+            fitted[key] = (DecayCurve(round(s, 4), round(g, 4)), n)
+        else:
+            skipped += 1
+    return fitted, skipped
+
+
+def fit_forgetting_curves(min_reviews=DEFAULT_MIN_REVIEWS, per_material=False, dry_run=False):
+    '''拟合并保存遗忘曲线参数，返回CurveFitReport；per_material 时另外为样本足够的学习资料单独拟合'''
+    import numpy as np
+    report = CurveFitReport()
+    started = time.perf_counter()
+    rows = review_samples()
+    fits = []
+    if rows:
+        course_ids = np.array([row[0] for row in rows], dtype=np.int64)
+        material_ids = np.array([row[1] or 0 for row in rows], dtype=np.int64)
+        data = np.array([row[2:] for row in rows], dtype=np.int64)
+        # 已完成的计划上 review_count 是完成后的次数，样本取复习前的次数
+        days, counts, totals, recalled = data[:, 0], np.maximum(data[:, 1] - 1, 0), data[:, 2], data[:, 3]
+        report.reviews = int(totals.sum())
+
+        courses, skipped = _fit_groups(course_ids, days, counts, totals, recalled, min_reviews)
+        report.courses, report.skipped = len(courses), skipped
+        fits += [ForgettingCurveFit(course_id=course_id, stability=curve.stability, growth=curve.growth,
+                                    sample_count=n) for course_id, (curve, n) in courses.items()]
+        if per_material:
+            has_material = material_ids > 0
+            course_of = dict(zip(material_ids[has_material].tolist(), course_ids[has_material].tolist()))
+            materials, skipped = _fit_groups(
+                material_ids[has_material], days[has_material], counts[has_material], totals[has_material],
+                recalled[has_material], min_reviews
+            )
+            report.materials, report.skipped = len(materials), report.skipped + skipped
+            fits += [ForgettingCurveFit(course_id=course_of[material_id], material_id=material_id,
+                                        stability=curve.stability, growth=curve.growth, sample_count=n)
+                     for material_id, (curve, n) in materials.items()]
+    if not dry_run:
+        with transaction.atomic():
+            ForgettingCurveFit.objects.all().delete()
+            ForgettingCurveFit.objects.bulk_create(fits, batch_size=1000)
+            DataVersion.bump(DataVersion.CURVES)
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+class FittedCurves:
+    """已拟合的遗忘曲线参数，资料参数优先于课程参数"""
+
+    def __init__(self, courses=None, materials=None):
+        self.courses = courses or {}      # {course_id: DecayCurve}
+        self.materials = materials or {}  # {material_id: DecayCurve}
+
+    def __bool__(self):
+        return bool(self.courses or self.materials)
+
+    def get(self, course_id, material_id=None) -> Optional[DecayCurve]:
+        '''该课程/资料的曲线，没有拟合参数时返回None'''
+        return self.materials.get(material_id) or self.courses.get(course_id)
+
+    def batch_retention(self, days_since_study, review_counts, course_ids, material_ids=None):
+        '''批量估算保留率：有拟合参数的用 DecayCurve，其余用 get_retention_rate'''
+        import numpy as np
+        days = np.asarray(days_since_study, dtype=np.int64)
+        fallback = batch_retention_rate(days, review_counts)
+        if not self:
+            return fallback
+        if material_ids is None:
+            material_ids = [None] * len(days)
+        curves = [self.get(c, m) for c, m in zip(course_ids, material_ids)]
+        stability = np.array([curve.stability if curve else np.nan for curve in curves], dtype=np.float64)
+        growth = np.array([curve.growth if curve else np.nan for curve in curves], dtype=np.float64)
+        fitted = batch_decay_retention(days, review_counts, stability, growth)
+        return np.where(np.isnan(stability), fallback, fitted)
+
+
+_cache = (None, FittedCurves())
+
+
+def get_fitted_curves():
+    '''当前的拟合参数，数据版本不变时复用进程内缓存'''
+    global _cache
+    current = DataVersion.current(DataVersion.CURVES)
+    key = (current.version, current.updated_at)
+    if _cache[0] != key:
+        courses, materials = {}, {}
+        for fit in ForgettingCurveFit.objects.all():
+            (materials if fit.material_id else courses)[fit.material_id or fit.course_id] = fit.curve()
+        _cache = (key, FittedCurves(courses, materials))
+    return _cache[1]
@@ -0,0 +1,141 @@
+"""
+分块嵌入缓存（按内容寻址）
+
+重新上传略有修改的PDF、或几份PDF有相同章节时，大部分分块的文字没有变化。
+CachedEmbeddings 包装嵌入模型：以 SHA-256(模型名, 维度, 分块文字) 为键，向量以 float32 字节串
+保存在独立的 SQLite 文件（EMBEDDING_CACHE_PATH，可随时删除）中，只有没见过的分块才调用嵌入接口。
+同一批内重复的文字也只请求一次。命中与未命中的向量都按 float32 返回，同一段文字结果一致。
+
+stats 记录本次包装以来的分块数、命中数和节省的接口调用次数（嵌入接口按 chunk_size 条一次请求）。
+提问时的 embed_query 不缓存。
+"""
+import hashlib
+import math
+import sqlite3
+import threading
+from pathlib import Path
+
+from langchain_core.embeddings import Embeddings
+
+LOOKUP_BATCH = 500  # 每次 IN 查询的键数
+
+
+class EmbeddingStats:
+    """嵌入缓存统计"""
+
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.texts = 0
+        self.hits = 0
+        self.requested = 0  # 实际交给嵌入接口的文字条数（去重后）
+        self.api_calls = 0
+        self.api_calls_saved = 0
+
+    @property
+    def hit_ratio(self):
+        return self.hits / self.texts if self.texts else 0.0
+
+    def add(self, texts, hits, requested):
+        calls = math.ceil(requested / self.batch_size)
+        self.texts += texts
+        self.hits += hits
+        self.requested += requested
+        self.api_calls += calls
+        self.api_calls_saved += math.ceil(texts / self.batch_size) - calls
+
+    def summary(self):
+        return (
+            f'分块 {self.texts} 个，缓存命中 {self.hits} 个（{self.hit_ratio:.1%}），'
+            f'请求嵌入 {self.requested} 个，接口调用 {self.api_calls} 次，节省 {self.api_calls_saved} 次'
+        )
+
+
+class EmbeddingStore:
+    """SQLite 中的 键 → float32 向量"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS embedding (key BLOB PRIMARY KEY, vector BLOB NOT NULL) WITHOUT ROWID')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=30)
+        return conn
+
+    def get_many(self, keys):
+        '''{键: 向量字节串}，不存在的键不返回'''
+        conn = self._connect()
+        found = {}
+        for start in range(0, len(keys), LOOKUP_BATCH):
+            batch = keys[start:start + LOOKUP_BATCH]
+            rows = conn.execute(
+                f'SELECT key, vector FROM embedding WHERE key IN ({",".join("?" * len(batch))})', batch
+            )
+            found.update(rows)
+        return found
+
+    def put_many(self, items):
+        conn = self._connect()
+        with conn:
+            conn.executemany('INSERT OR IGNORE INTO embedding (key, vector) VALUES (?, ?)', items)
+
+    def count(self):
+        return self._connect().execute('SELECT COUNT(*) FROM embedding').fetchone()[0]
+
+
+class CachedEmbeddings(Embeddings):
+    """带内容寻址缓存的嵌入模型"""
+
+    def __init__(self, embeddings, store, model_name=None, dimensions=None):
+        self.embeddings = embeddings
+        self.store = store
+        self.model_name = model_name or getattr(embeddings, 'model', None) or type(embeddings).__name__
+        self.dimensions = dimensions or getattr(embeddings, 'dimensions', None) or getattr(embeddings, 'size', None)
+        self.stats = EmbeddingStats(getattr(embeddings, 'chunk_size', None) or 1000)
+
+    def key(self, text):
+        return hashlib.sha256(f'{self.model_name}\0{self.dimensions}\0{text}'.encode('utf-8')).digest()
+
+    def embed_documents(self, texts):
+        return self.embed_array(texts).tolist()
+
+    def embed_array(self, texts):
+        '''同 embed_documents，返回 float32 的二维数组（每行一个向量，比浮点数列表省内存）'''
+        import numpy as np
+        keys = [self.key(text) for text in texts]
+        vectors = self.store.get_many(list(set(keys)))
+        hits = sum(1 for key in keys if key in vectors)
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                missing.setdefault(key, text)
+        if missing:
+            embedded = self.embeddings.embed_documents(list(missing.values()))
+            new = [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in zip(missing, embedded)]
+            self.store.put_many(new)
+            vectors.update(new)
+        self.stats.add(len(texts), hits, len(missing))
+        if not keys:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.vstack([np.frombuffer(vectors[key], dtype=np.float32) for key in keys])
+
+    def embed_query(self, text):
+        return self.embeddings.embed_query(text)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_embedding_store(path):
+    '''同一路径在进程内共用一个 EmbeddingStore'''
+    with _stores_lock:
+        store = _stores.get(str(path))
+        if store is None:
+            store = _stores[str(path)] = EmbeddingStore(path)
+        return store
@@ -0,0 +1,182 @@
+"""
+学习数据流式导出（CSV / JSONL，可选gzip）
+
+使用 values_list 投影加 .iterator(chunk_size=...) 分块读取，逐块编码输出，
+内存占用与表大小无关；since 水位线用于增量导出。
+
+水位线是 (updated_at, 主键)：按更新时间导出，复习完成、番茄钟结束、修改学习记录后会再次导出；
+更新时间相同的行按主键区分，不会遗漏。每次导出的上界是 EXPORT_SETTLE_SECONDS 秒之前最后更新的一行，
+刚写入、事务可能尚未提交的行留到下次导出，避免晚提交的行落在已发出的水位线之前。
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import PomodoroSession, ReviewSchedule, StudySession
+
+DEFAULT_CHUNK_SIZE = 2000
+DEFAULT_SETTLE_SECONDS = 5
+EXPORT_FORMATS = ('csv', 'jsonl')
+
+# 表名: (模型, 导出列)，水位线字段均为 updated_at
+EXPORT_TABLES = {
+    'sessions': (
+        StudySession,
+        ['id', 'course_id', 'course__name', 'material_id', 'start_time', 'end_time', 'duration', 'notes', 'created_at',
+         'updated_at'],
+    ),
+    'pomodoros': (
+        PomodoroSession,
+        ['id', 'course_id', 'course__name', 'session_date', 'start_time', 'end_time', 'focus_time', 'break_time', 'completed',
+         'updated_at'],
+    ),
+    'reviews': (
+        ReviewSchedule,
+        ['id', 'course_id', 'course__name', 'material_id', 'review_date', 'completed', 'review_count', 'created_at',
+         'updated_at'],
+    ),
+}
+
+
+class Watermark(NamedTuple):
+    """增量导出水位线：导出 updated_at 更晚、或相同但主键更大的行；文本形式为 “ISO时间,主键”"""
+    updated_at: datetime
+    pk: int = 0
+
+    def __str__(self):
+        # 用UTC的Z后缀，放进URL时不会因为“+”被解码成空格而失效
+        return f"{self.updated_at.astimezone(dt_timezone.utc).isoformat().replace('+00:00', 'Z')},{self.pk}"
+
+    def after(self):
+        return Q(updated_at__gt=self.updated_at) | Q(updated_at=self.updated_at, pk__gt=self.pk)
+
+
+class ExportStats:
+    """导出过程统计：行数与本次导出的水位线（供下次增量导出使用）"""
+
+    def __init__(self):
+        self.rows = 0
+        self.watermark = None
+
+
+def parse_since(value):
+    '''解析水位线：“ISO时间,主键”（上次导出返回的水位线），或YYYY-MM-DD（本地零点）/ISO 8601时间，
+    未带时区按本地时区；无法解析时抛出ValueError'''
+    value = (value or '').strip()
+    if not value:
+        return None
+    value, sep, pk = value.rpartition(',') if ',' in value else (value, '', '0')
+    try:
+        pk = int(pk)
+    except ValueError:
+        raise ValueError(f'无法解析的水位线：{value}{sep}{pk}')
+    dt = parse_datetime(value)
+    if dt is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'无法解析的时间：{value}')
+        dt = datetime.combine(day, time.min)
+    if timezone.is_naive(dt):
+        dt = timezone.make_aware(dt)
+    return Watermark(dt, pk)
+
+
+def next_watermark(table, since=None):
+    '''本次导出的上界：EXPORT_SETTLE_SECONDS 秒之前最后更新的一行；没有新数据时返回 since'''
+    model = EXPORT_TABLES[table][0]
+    settle = getattr(settings, 'EXPORT_SETTLE_SECONDS', DEFAULT_SETTLE_SECONDS)
+    queryset = model.objects.filter(updated_at__lte=timezone.now() - timedelta(seconds=settle))
+    if since is not None:
+        queryset = queryset.filter(since.after())
+    last = queryset.order_by('-updated_at', '-pk').values_list('updated_at', 'pk').first()
+    return Watermark(*last) if last else since
+
+
+def _to_text(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def iter_records(table, since=None, until=None, chunk_size=DEFAULT_CHUNK_SIZE, stats=None):
+    '''按 (updated_at, 主键) 顺序分块读取水位线 since 之后、until（含）之前的行，逐行产出 values_list 元组'''
+    if until is None:
+        return
+    model, columns = EXPORT_TABLES[table]
+    queryset = model.objects.order_by('updated_at', 'pk').exclude(until.after())
+    if since is not None:
+        queryset = queryset.filter(since.after())
+    for row in queryset.values_list(*columns).iterator(chunk_size=chunk_size):
+        if stats is not None:
+            stats.rows += 1
+        yield row
+
+
+def _header(table):
+    return [c.replace('__', '_') for c in EXPORT_TABLES[table][1]]
+
+
+def iter_csv(table, since=None, until=None, chunk_size=DEFAULT_CHUNK_SIZE, stats=None):
+    '''产出CSV文本块，每 chunk_size 行输出一次'''
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(_header(table))
+    for i, row in enumerate(iter_records(table, since, until, chunk_size, stats), 1):
+        writer.writerow([_to_text(v) for v in row])
+        if i % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_jsonl(table, since=None, until=None, chunk_size=DEFAULT_CHUNK_SIZE, stats=None):
+    '''产出JSONL文本块，每 chunk_size 行输出一次'''
+    header = _header(table)
+    lines = []
+    for row in iter_records(table, since, until, chunk_size, stats):
+        lines.append(json.dumps(dict(zip(header, map(_to_text, row))), ensure_ascii=False))
+        if len(lines) >= chunk_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def gzip_chunks(chunks):
+    '''流式gzip压缩（wbits=31 输出gzip格式），不缓存整份数据'''
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(table, fmt='csv', since=None, compress=False, chunk_size=DEFAULT_CHUNK_SIZE, stats=None,
+                  until=None):
+    '''返回导出字节流的迭代器；until 为本次导出的上界，不指定时按 next_watermark 计算（记在 stats.watermark）'''
+    if table not in EXPORT_TABLES:
+        raise ValueError(f'不支持导出的表：{table}')
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f'不支持的格式：{fmt}')
+    if until is None:
+        until = next_watermark(table, since)
+    if stats is not None:
+        stats.watermark = until
+    text_chunks = (iter_csv if fmt == 'csv' else iter_jsonl)(table, since, until, chunk_size, stats)
+    chunks = (chunk.encode('utf-8') for chunk in text_chunks)
+    return gzip_chunks(chunks) if compress else chunks
+
+
+def export_filename(table, fmt, compress=False):
+    name = f"{table}-{datetime.now().strftime('%Y%m%d%H%M%S')}.{fmt}"
+    return name + '.gz' if compress else name
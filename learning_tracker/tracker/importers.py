@@ -0,0 +1,164 @@
+"""
+学习记录批量导入（CSV / JSONL）
+
+逐行流式读取文件，课程名通过一次查询建立的映射表解析，
+时长直接由起止时间计算（不经过 StudySession.save()），
+按批次在事务内 bulk_create，并同步累加课程汇总和每日汇总。
+
+字段：course（课程名称，必填）、start_time、end_time（必填）、
+material（资料名称，可选）、notes（可选）
+时间格式：YYYY-MM-DD HH:MM[:SS] 或 ISO 8601，未带时区的按本地时区处理
+"""
+import csv
+import json
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Course, StudyMaterial, StudySession, apply_study_deltas
+
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+IMPORT_FORMATS = ('csv', 'jsonl')
+
+
+class ImportReport:
+    """导入结果：总行数、成功条数、逐行错误、速度"""
+
+    def __init__(self, max_errors=MAX_REPORTED_ERRORS):
+        self.rows = 0
+        self.created = 0
+        self.error_count = 0
+        self.errors = []  # [(行号, 错误信息)]，最多保留 max_errors 条
+        self.max_errors = max_errors
+        self.elapsed = 0.0
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((line, message))
+
+    @property
+    def rows_per_sec(self):
+        return round(self.rows / self.elapsed, 1) if self.elapsed else 0.0
+
+    def summary(self):
+        return (f'共读取 {self.rows} 行，导入 {self.created} 条，错误 {self.error_count} 行，'
+                f'用时 {self.elapsed:.2f}s（{self.rows_per_sec} 行/秒）')
+
+
+def guess_format(filename):
+    '''根据文件扩展名判断格式，默认CSV'''
+    return 'jsonl' if filename.lower().endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+def iter_rows(stream, fmt):
+    '''逐行读取，产出 (行号, 行数据, 错误信息)'''
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row, None
+        return
+    for line_no, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_no, None, f'JSON格式错误：{e.msg}'
+            continue
+        if not isinstance(row, dict):
+            yield line_no, None, '每行必须是一个JSON对象'
+            continue
+        yield line_no, row, None
+
+
+def parse_time(value, tz=None):
+    '''解析时间字符串，未带时区的视为本地时间（tz 由调用方预先取出，避免逐行查找时区）'''
+    value = str(value or '').strip()
+    if not value:
+        raise ValueError('时间为空')
+    dt = datetime.fromisoformat(value)
+    if timezone.is_naive(dt):
+        dt = timezone.make_aware(dt, tz)
+    return dt
+
+
+def build_session(row, courses, materials, tz=None):
+    '''把一行数据转换为未保存的StudySession，返回 (session, 错误信息)'''
+    course_name = str(row.get('course') or '').strip()
+    if not course_name:
+        return None, '缺少课程名称'
+    course_id = courses.get(course_name) or courses.get(course_name.replace('（', '(').replace('）', ')'))
+    if not course_id:
+        return None, f"找不到课程'{course_name}'"
+    try:
+        start = parse_time(row.get('start_time'), tz)
+        end = parse_time(row.get('end_time'), tz)
+    except (TypeError, ValueError):
+        return None, '时间格式错误，应为 YYYY-MM-DD HH:MM'
+    if end <= start:
+        return None, '结束时间必须晚于开始时间'
+    material_id = None
+    material_name = str(row.get('material') or '').strip()
+    if material_name:
+        material_id = materials.get((course_id, material_name))
+        if not material_id:
+            return None, f"课程'{course_name}'下找不到资料'{material_name}'"
+    return StudySession(
+        course_id=course_id,
+        material_id=material_id,
+        start_time=start,
+        end_time=end,
+        duration=(end - start).total_seconds() / 60,
+        notes=str(row.get('notes') or ''),
+    ), None
+
+
+def _flush(batch, report, tz=None):
+    '''在一个事务内批量插入，并累加课程汇总和每日汇总'''
+    deltas = defaultdict(lambda: [0.0, 0])
+    for session in batch:
+        delta = deltas[(session.course_id, timezone.localdate(session.start_time, tz))]
+        delta[0] += session.duration
+        delta[1] += 1
+    with transaction.atomic():
+        StudySession.objects.bulk_create(batch)
+        apply_study_deltas(deltas)
+    report.created += len(batch)
+
+
+def import_sessions(stream, fmt='csv', batch_size=DEFAULT_BATCH_SIZE, max_errors=MAX_REPORTED_ERRORS):
+    '''从文本流导入学习记录，返回ImportReport；错误行跳过，不影响其它行'''
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f'不支持的格式：{fmt}')
+    report = ImportReport(max_errors=max_errors)
+    started = time.perf_counter()
+    # 课程、资料各一次查询建立查找表，避免逐行查询
+    courses = {}
+    for name, pk in Course.objects.order_by('id').values_list('name', 'id'):
+        if name:
+            courses.setdefault(name, pk)  # 重名时与 find_course_by_name 一致，取最早创建的课程
+    materials = {(course_id, name): pk for course_id, name, pk in StudyMaterial.objects.values_list('course_id', 'name', 'id')}
+    tz = timezone.get_current_timezone()
+    batch = []
+    for line_no, row, error in iter_rows(stream, fmt):
+        report.rows += 1
+        session = None
+        if error is None:
+            session, error = build_session(row, courses, materials, tz)
+        if error:
+            report.add_error(line_no, error)
+            continue
+        batch.append(session)
+        if len(batch) >= batch_size:
+            _flush(batch, report, tz)
+            batch = []
+    if batch:
+        _flush(batch, report, tz)
+    report.elapsed = time.perf_counter() - started
+    return report
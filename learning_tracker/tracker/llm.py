@@ -0,0 +1,82 @@
+"""
+大模型客户端（按需加载）
+
+LangChain / OpenAI / FAISS / PyPDF 的导入耗时以秒计，这里的函数只在第一次调用时才导入，
+普通页面、manage.py 命令和测试都不会加载这些依赖。
+预派生（prefork）部署可以在主进程里调用 warm_up()，让子进程 fork 后直接共享已导入的模块：
+设置环境变量 TRACKER_WARM_UP=1 后，应用启动（AppConfig.ready）时会自动调用。
+"""
+import os
+import time
+
+# 兼容 OpenAI 的接口地址（可用环境变量指向其他服务，如基准测试的本地假模型）
+BASE_URL = os.environ.get('SCHOOL_LLM_BASE_URL', "https://chat.ecnu.edu.cn/open/api/v1")
+CHAT_MODEL = "ecnu-max"
+EMBEDDING_MODEL = "ecnu-embedding-small"
+EMBEDDING_DIMENSIONS = 1024  # 学校模型返回1024维向量
+
+# warm_up() 预先导入的模块
+WARM_UP_MODULES = (
+    'langchain_openai',
+    'langchain.chains',
+    'langchain.memory',
+    'langchain_community.chat_message_histories',
+    'langchain_community.vectorstores',
+    'langchain_community.document_loaders',
+    'langchain_text_splitters',
+    'faiss',
+    'pypdf',
+    'tracker.tools',
+    'matplotlib.figure',
+    'matplotlib.backends.backend_agg',
+)
+
+
+def get_api_key():
+    api_key = os.environ.get('SCHOOL_LLM_API_KEY', '')
+    if not api_key:
+        raise ValueError("未配置API密钥，请设置环境变量 SCHOOL_LLM_API_KEY")
+    return api_key
+
+
+def get_chat_model(api_key=None, temperature=0.7):
+    '''创建对话模型（首次调用时导入 langchain_openai）'''
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(
+        model=CHAT_MODEL,
+        api_key=api_key or get_api_key(),
+        base_url=BASE_URL,
+        temperature=temperature
+    )
+
+
+def get_embeddings(api_key=None):
+    '''创建嵌入模型
+
+    LangChain 在 OpenAIEmbedding 模式下，默认会将 input 的字符串按 openai 的模型进行 Tokenize，
+    提交接口的 input 将不再是字符串而是 token 数组，非 openai 的兼容接口无法支持，
+    因此需要设置 check_embedding_ctx_length=False 关闭 Tokenize 行为。
+    '''
+    from langchain_openai import OpenAIEmbeddings
+    return OpenAIEmbeddings(
+        base_url=BASE_URL,  # 不要加/embeddings，LangChain会自动添加
+        model=EMBEDDING_MODEL,
+        api_key=api_key or get_api_key(),
+        dimensions=EMBEDDING_DIMENSIONS,
+        check_embedding_ctx_length=False
+    )
+
+
+def warm_up(modules=WARM_UP_MODULES):
+    '''预先导入AI与绘图相关模块，返回 {模块名: 耗时秒数}；导入失败的模块跳过'''
+    import importlib
+    os.environ.setdefault('MPLBACKEND', 'Agg')  # 服务端绘图，不尝试GUI后端
+    timings = {}
+    for name in modules:
+        started = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            continue
+        timings[name] = time.perf_counter() - started
+    return timings
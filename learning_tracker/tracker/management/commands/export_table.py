@@ -0,0 +1,50 @@
+"""
+流式导出学习记录、番茄钟、复习计划
+用法：python manage.py export_table sessions [--format csv|jsonl] [--gzip] [--since 2025-01-01] [-o sessions.csv]
+不指定 -o 或为 - 时输出到标准输出；结束时提示本次的水位线（更新时间,主键），下次用 --since 增量导出
+"""
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.exporters import DEFAULT_CHUNK_SIZE, EXPORT_FORMATS, EXPORT_TABLES, ExportStats, export_stream, parse_since
+
+
+class Command(BaseCommand):
+    help = '以CSV或JSONL流式导出数据表（可选gzip压缩、按水位线增量导出）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('table', choices=sorted(EXPORT_TABLES), help='要导出的表')
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv', help='导出格式')
+        parser.add_argument('--gzip', action='store_true', help='gzip压缩输出')
+        parser.add_argument('--since', help='只导出水位线之后新增或修改的数据（上次导出的水位线，或 YYYY-MM-DD / ISO 8601时间）')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='每次从数据库读取的行数')
+        parser.add_argument('-o', '--output', default='-', help='输出文件路径，- 表示标准输出')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size 必须大于0')
+        try:
+            since = parse_since(options['since'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        stats = ExportStats()
+        chunks = export_stream(options['table'], options['format'], since, options['gzip'], options['chunk_size'], stats)
+        path = options['output']
+        if path == '-':
+            out = sys.stdout.buffer
+            for chunk in chunks:
+                out.write(chunk)
+            out.flush()
+        else:
+            try:
+                out = open(path, 'wb')
+            except OSError as e:
+                raise CommandError(f'无法写入文件：{e}')
+            with out:
+                for chunk in chunks:
+                    out.write(chunk)
+        # 数据写到stdout时，提示信息走stderr，避免混入导出内容
+        self.stderr.write(self.style.SUCCESS(f'共导出 {stats.rows} 行'))
+        if stats.watermark is not None:
+            self.stderr.write(f'下次增量导出可使用 --since {stats.watermark}')
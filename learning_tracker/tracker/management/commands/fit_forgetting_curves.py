@@ -0,0 +1,30 @@
+"""
+按已完成的复习记录拟合各课程的遗忘曲线（适合每晚定时执行）
+用法：python manage.py fit_forgetting_curves [--min-reviews 30] [--per-material] [--dry-run]
+每次整体替换已保存的参数；样本不足 --min-reviews 的课程/资料不保存，继续使用默认遗忘曲线
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.curve_fit import DEFAULT_MIN_REVIEWS, fit_forgetting_curves
+
+
+class Command(BaseCommand):
+    help = '按复习记录批量拟合各课程（可选各学习资料）的遗忘曲线参数'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-reviews', type=int, default=DEFAULT_MIN_REVIEWS, help='至少有多少条复习记录才保存拟合参数'
+        )
+        parser.add_argument('--per-material', action='store_true', help='另外为复习记录足够的学习资料单独拟合')
+        parser.add_argument('--dry-run', action='store_true', help='只计算不写入')
+
+    def handle(self, *args, **options):
+        if options['min_reviews'] < 1:
+            raise CommandError('--min-reviews 必须大于0')
+        report = fit_forgetting_curves(
+            min_reviews=options['min_reviews'],
+            per_material=options['per_material'],
+            dry_run=options['dry_run'],
+        )
+        prefix = '（试运行，未写入）' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(prefix + report.summary()))
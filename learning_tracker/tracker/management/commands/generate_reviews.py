@@ -0,0 +1,61 @@
+"""
+批量生成复习计划（适合每晚定时执行）
+用法：python manage.py generate_reviews [--days 7] [--chunk-size 5000] [--max-reviews 3] [--after 课程id:资料id]
+      [--level-load | --no-level-load] [--dry-run]
+每批结束后输出当前位置，中断后用 --after 从该位置继续；重复执行不会生成重复计划
+"""
+from argparse import BooleanOptionalAction
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.review_load import leveling_enabled
+
+from tracker.review_plans import (
+    DEFAULT_CHUNK_SIZE, DEFAULT_DAYS, DEFAULT_MAX_REVIEWS, format_key, generate_reviews, parse_key,
+)
+
+
+class Command(BaseCommand):
+    help = '为最近有学习记录的全部课程/资料批量生成复习计划（遗忘曲线）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=DEFAULT_DAYS, help='只处理最近多少天内学习过的课程/资料')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='每批处理的学习项数')
+        parser.add_argument('--max-reviews', type=int, default=DEFAULT_MAX_REVIEWS, help='每个学习项生成的复习次数（最多5）')
+        parser.add_argument('--after', help='从该位置之后继续（课程id 或 课程id:资料id）')
+        parser.add_argument(
+            '--level-load', action=BooleanOptionalAction, default=None,
+            help='在浮动窗口内挑待复习计划最少的一天（默认取 settings.REVIEW_LOAD_LEVELING）'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='只计算不写入')
+
+    def handle(self, *args, **options):
+        if options['days'] < 1 or options['chunk_size'] < 1:
+            raise CommandError('--days 和 --chunk-size 必须大于0')
+        if not 1 <= options['max_reviews'] <= 5:
+            raise CommandError('--max-reviews 必须在1到5之间')
+        try:
+            after = parse_key(options['after']) if options['after'] else None
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        def progress(report):
+            self.stdout.write(
+                f'第 {report.chunks} 批：累计 {report.items} 项，新建 {report.created} 条，'
+                f'位置 {format_key(report.last_key)}'
+            )
+
+        try:
+            report = generate_reviews(
+                days=options['days'],
+                chunk_size=options['chunk_size'],
+                max_reviews=options['max_reviews'],
+                after=after,
+                dry_run=options['dry_run'],
+                level_load=leveling_enabled() if options['level_load'] is None else options['level_load'],
+                progress=progress if options['verbosity'] >= 1 else None,
+            )
+        except KeyboardInterrupt:
+            raise CommandError('已中断，已完成的批次已提交，可使用上面最后输出的位置配合 --after 继续')
+        prefix = '（试运行，未写入）' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(prefix + report.summary()))
@@ -0,0 +1,39 @@
+"""
+批量导入学习记录
+用法：python manage.py import_sessions sessions.csv [--format csv|jsonl] [--batch-size 1000]
+文件为 - 时从标准输入读取
+"""
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.importers import DEFAULT_BATCH_SIZE, IMPORT_FORMATS, guess_format, import_sessions
+
+
+class Command(BaseCommand):
+    help = '从CSV或JSONL文件流式批量导入学习记录'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='文件路径，- 表示标准输入')
+        parser.add_argument('--format', choices=IMPORT_FORMATS, help='文件格式（默认按扩展名判断）')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='每批插入条数')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or guess_format(path)
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size 必须大于0')
+        if path == '-':
+            report = import_sessions(sys.stdin, fmt, options['batch_size'])
+        else:
+            try:
+                stream = open(path, encoding='utf-8-sig', newline='')
+            except OSError as e:
+                raise CommandError(f'无法打开文件：{e}')
+            with stream:
+                report = import_sessions(stream, fmt, options['batch_size'])
+        for line, message in report.errors:
+            self.stderr.write(f'第 {line} 行：{message}')
+        if report.error_count > len(report.errors):
+            self.stderr.write(f'……另有 {report.error_count - len(report.errors)} 行错误未列出')
+        self.stdout.write(self.style.SUCCESS(report.summary()))
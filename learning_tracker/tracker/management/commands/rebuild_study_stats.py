@@ -0,0 +1,17 @@
+"""
+重建学习统计汇总（课程汇总 + 每日汇总）
+用法：python manage.py rebuild_study_stats
+"""
+from django.core.management.base import BaseCommand
+
+from tracker.models import CourseStudyStat, DailyStudyStat
+
+
+class Command(BaseCommand):
+    help = '根据全部学习记录重建课程学习汇总和每日学习汇总（总时长、记录数）'
+
+    def handle(self, *args, **options):
+        count = CourseStudyStat.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'已重建 {count} 门课程的学习汇总'))
+        days = DailyStudyStat.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'已重建 {days} 条每日学习汇总'))
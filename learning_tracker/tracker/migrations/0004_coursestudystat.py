@@ -0,0 +1,42 @@
+# Generated by Django 4.2.27 on 2026-10-18 04:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_course_stats(apps, schema_editor):
+    '''根据已有学习记录初始化课程汇总'''
+    StudySession = apps.get_model('tracker', 'StudySession')
+    CourseStudyStat = apps.get_model('tracker', 'CourseStudyStat')
+    rows = StudySession.objects.order_by().values('course_id').annotate(
+        minutes=models.Sum('duration'),
+        count=models.Count('id'),
+    )
+    CourseStudyStat.objects.bulk_create([
+        CourseStudyStat(course_id=row['course_id'], total_minutes=row['minutes'] or 0, session_count=row['count'])
+        for row in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0003_alter_course_options_alter_knowledgepoint_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseStudyStat',
+            fields=[
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='study_stat', serialize=False, to='tracker.course', verbose_name='课程')),
+                ('total_minutes', models.FloatField(default=0, verbose_name='总学习时长（分钟）')),
+                ('session_count', models.IntegerField(default=0, verbose_name='学习记录数')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '课程学习汇总',
+                'verbose_name_plural': '课程学习汇总',
+            },
+        ),
+        migrations.RunPython(populate_course_stats, migrations.RunPython.noop),
+    ]
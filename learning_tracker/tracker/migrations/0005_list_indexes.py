@@ -0,0 +1,49 @@
+# Generated by Django 4.2.27 on 2026-10-18 04:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0004_coursestudystat'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pomodorosession',
+            index=models.Index(fields=['course', 'session_date', 'id'], name='pomodoro_course_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pomodorosession',
+            index=models.Index(fields=['session_date', 'id'], name='pomodoro_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reviewschedule',
+            index=models.Index(condition=models.Q(('completed', False)), fields=['review_date', 'id'], name='review_pending_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reviewschedule',
+            index=models.Index(condition=models.Q(('completed', False)), fields=['course', 'review_date', 'id'], name='review_course_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reviewschedule',
+            index=models.Index(fields=['review_date', 'id'], name='review_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reviewschedule',
+            index=models.Index(fields=['course', 'review_date', 'id'], name='review_course_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studymaterial',
+            index=models.Index(fields=['course', 'created_at', 'id'], name='material_course_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studysession',
+            index=models.Index(fields=['course', 'start_time', 'id'], name='session_course_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studysession',
+            index=models.Index(fields=['start_time', 'id'], name='session_start_idx'),
+        ),
+    ]
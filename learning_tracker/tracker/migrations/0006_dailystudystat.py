@@ -0,0 +1,51 @@
+# Generated by Django 4.2.27 on 2026-10-18 04:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models.functions import TruncDate
+
+
+def populate_daily_stats(apps, schema_editor):
+    '''根据已有学习记录按本地日期初始化每日汇总'''
+    StudySession = apps.get_model('tracker', 'StudySession')
+    DailyStudyStat = apps.get_model('tracker', 'DailyStudyStat')
+    rows = StudySession.objects.order_by().values('course_id', day=TruncDate('start_time')).annotate(
+        minutes=models.Sum('duration'),
+        count=models.Count('id'),
+    )
+    DailyStudyStat.objects.bulk_create([
+        DailyStudyStat(date=row['day'], course_id=row['course_id'], total_minutes=row['minutes'] or 0,
+                       session_count=row['count'])
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0005_list_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyStudyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='日期')),
+                ('total_minutes', models.FloatField(default=0, verbose_name='学习时长（分钟）')),
+                ('session_count', models.IntegerField(default=0, verbose_name='学习记录数')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='tracker.course', verbose_name='课程')),
+            ],
+            options={
+                'verbose_name': '每日学习汇总',
+                'verbose_name_plural': '每日学习汇总',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailystudystat',
+            constraint=models.UniqueConstraint(fields=('date', 'course'), name='daily_stat_date_course_uniq'),
+        ),
+        migrations.RunPython(populate_daily_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.27 on 2026-10-18 04:48
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0006_dailystudystat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False, verbose_name='名称')),
+                ('version', models.PositiveBigIntegerField(default=0, verbose_name='版本号')),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '数据版本',
+                'verbose_name_plural': '数据版本',
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.27 on 2026-10-18 05:00
+
+from django.db import migrations, models
+
+
+def dedupe_reviews(apps, schema_editor):
+    '''同一 (课程, 资料, 复习日期) 只保留一条：优先已完成的、复习次数最大的，其余删除'''
+    ReviewSchedule = apps.get_model('tracker', 'ReviewSchedule')
+    groups = ReviewSchedule.objects.order_by().values('course_id', 'material_id', 'review_date').annotate(
+        n=models.Count('id')
+    ).filter(n__gt=1)
+    duplicate_ids = []
+    for group in groups.iterator():
+        ids = list(ReviewSchedule.objects.filter(
+            course_id=group['course_id'],
+            material_id=group['material_id'],  # None 时 Django 会转成 IS NULL
+            review_date=group['review_date'],
+        ).order_by('-completed', '-review_count', 'id').values_list('id', flat=True))
+        duplicate_ids.extend(ids[1:])
+    for start in range(0, len(duplicate_ids), 500):
+        ReviewSchedule.objects.filter(id__in=duplicate_ids[start:start + 500]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0007_dataversion'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_reviews, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='reviewschedule',
+            constraint=models.UniqueConstraint(condition=models.Q(('material__isnull', False)), fields=('course', 'material', 'review_date'), name='review_course_material_date_uniq', violation_error_message='该课程/资料在这一天已有复习计划'),
+        ),
+        migrations.AddConstraint(
+            model_name='reviewschedule',
+            constraint=models.UniqueConstraint(condition=models.Q(('material__isnull', True)), fields=('course', 'review_date'), name='review_course_date_uniq', violation_error_message='该课程在这一天已有复习计划'),
+        ),
+    ]
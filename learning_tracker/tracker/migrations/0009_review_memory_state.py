@@ -0,0 +1,33 @@
+# Generated by Django 4.2.27 on 2026-10-18 05:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0008_review_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reviewschedule',
+            name='difficulty',
+            field=models.FloatField(blank=True, null=True, verbose_name='难度（1-10）'),
+        ),
+        migrations.AddField(
+            model_name='reviewschedule',
+            name='grade',
+            field=models.PositiveSmallIntegerField(blank=True, choices=[(1, '忘记'), (2, '困难'), (3, '良好'), (4, '简单')], null=True, verbose_name='复习评分'),
+        ),
+        migrations.AddField(
+            model_name='reviewschedule',
+            name='last_reviewed',
+            field=models.DateField(blank=True, null=True, verbose_name='上次复习日期'),
+        ),
+        migrations.AddField(
+            model_name='reviewschedule',
+            name='stability',
+            field=models.FloatField(blank=True, null=True, verbose_name='记忆稳定性（天）'),
+        ),
+    ]
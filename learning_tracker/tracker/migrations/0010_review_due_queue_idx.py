@@ -0,0 +1,17 @@
+# Generated by Django 4.2.27 on 2026-10-18 05:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0009_review_memory_state'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reviewschedule',
+            index=models.Index(condition=models.Q(('completed', False)), fields=['review_date', 'review_count', 'last_reviewed', 'completed'], name='review_due_queue_idx'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.2.27 on 2026-10-18 05:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0010_review_due_queue_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ForgettingCurveFit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stability', models.FloatField(verbose_name='初始稳定性（天）')),
+                ('growth', models.FloatField(verbose_name='每次复习稳定性倍数')),
+                ('sample_count', models.IntegerField(default=0, verbose_name='复习记录数')),
+                ('fitted_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='拟合时间')),
+            ],
+            options={
+                'verbose_name': '遗忘曲线参数',
+                'verbose_name_plural': '遗忘曲线参数',
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='reviewschedule',
+            name='review_due_queue_idx',
+        ),
+        migrations.AddField(
+            model_name='reviewschedule',
+            name='elapsed_days',
+            field=models.IntegerField(blank=True, null=True, verbose_name='距上次学习/复习天数'),
+        ),
+        migrations.AddIndex(
+            model_name='reviewschedule',
+            index=models.Index(condition=models.Q(('completed', False)), fields=['review_date', 'review_count', 'last_reviewed', 'completed', 'course'], name='review_due_queue_idx'),
+        ),
+        migrations.AddField(
+            model_name='forgettingcurvefit',
+            name='course',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tracker.course', verbose_name='课程'),
+        ),
+        migrations.AddField(
+            model_name='forgettingcurvefit',
+            name='material',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='tracker.studymaterial', verbose_name='学习资料（为空表示整门课程）'),
+        ),
+        migrations.AddConstraint(
+            model_name='forgettingcurvefit',
+            constraint=models.UniqueConstraint(condition=models.Q(('material__isnull', False)), fields=('course', 'material'), name='curve_fit_material_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='forgettingcurvefit',
+            constraint=models.UniqueConstraint(condition=models.Q(('material__isnull', True)), fields=('course',), name='curve_fit_course_uniq'),
+        ),
+    ]
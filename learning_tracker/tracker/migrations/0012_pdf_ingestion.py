@@ -0,0 +1,38 @@
+# Generated by Django 4.2.27 on 2026-10-18 05:32
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0011_forgetting_curve_fit'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PdfIngestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100, unique=True, verbose_name='索引键')),
+                ('file_name', models.CharField(blank=True, max_length=255, verbose_name='文件名')),
+                ('file_path', models.CharField(max_length=500, verbose_name='文件路径')),
+                ('status', models.CharField(choices=[('pending', '排队中'), ('running', '解析中'), ('done', '已完成'), ('failed', '失败')], default='pending', max_length=10, verbose_name='状态')),
+                ('pages_total', models.IntegerField(default=0, verbose_name='总页数')),
+                ('pages_done', models.IntegerField(default=0, verbose_name='已加载页数')),
+                ('chunks_total', models.IntegerField(default=0, verbose_name='分块数')),
+                ('chunks_embedded', models.IntegerField(default=0, verbose_name='已嵌入分块数')),
+                ('cache_hits', models.IntegerField(default=0, verbose_name='命中嵌入缓存的分块数')),
+                ('error', models.TextField(blank=True, verbose_name='错误信息')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='开始时间')),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='更新时间')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='完成时间')),
+            ],
+            options={
+                'verbose_name': 'PDF解析任务',
+                'verbose_name_plural': 'PDF解析任务',
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.27 on 2026-10-18 06:34
+
+from django.db import migrations, models
+
+
+def backfill_updated_at(apps, schema_editor):
+    '''已有数据的更新时间取创建时间，原来按创建时间得到的导出水位线仍然可用'''
+    for model_name, created_field in (
+        ('StudySession', 'created_at'), ('PomodoroSession', 'session_date'), ('ReviewSchedule', 'created_at')
+    ):
+        apps.get_model('tracker', model_name).objects.update(updated_at=models.F(created_field))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0012_pdf_ingestion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pomodorosession',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='更新时间'),
+        ),
+        migrations.AddField(
+            model_name='reviewschedule',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='更新时间'),
+        ),
+        migrations.AddField(
+            model_name='studysession',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='更新时间'),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='pomodorosession',
+            index=models.Index(fields=['updated_at', 'id'], name='pomodoro_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reviewschedule',
+            index=models.Index(fields=['updated_at', 'id'], name='review_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studysession',
+            index=models.Index(fields=['updated_at', 'id'], name='session_updated_idx'),
+        ),
+    ]
@@ -1,5 +1,12 @@
-from django.db import models
+from collections import Counter
+
+from django.db import models, transaction
+from django.db.models import Count, F, Max, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
 from django.utils import timezone
+
+from .utils.forgetting_curve import DecayCurve
+from .utils.schedulers import GRADE_CHOICES, ReviewState
 # Create your models here.
 '''
 created by:刘思扬
@@ -11,10 +18,18 @@ Course（课程）
    │      ├── StudySession（学习记录）可选关联
    │      └── ReviewSchedule（复习计划）可选关联
    │
+   ├── ForgettingCurveFit（遗忘曲线参数）按复习记录批量拟合，可细分到学习资料
+   │
    ├── PomodoroSession（番茄钟）只关联课程
    │
-   └── KnowledgePoint（知识点）
+   ├── KnowledgePoint（知识点）
+   │
+   ├── CourseStudyStat（课程学习汇总）随学习记录增删改同步维护
+   │
+   └── DailyStudyStat（每日学习汇总，日期×课程）随学习记录增删改同步维护
 
+DataVersion（数据版本号）学习数据变化时递增，用作图表等缓存的键
+PdfIngestion（PDF后台解析任务）上传PDF时创建，记录加载/分块/嵌入的进度
 '''
 
 class Course(models.Model):
@@ -27,11 +42,71 @@ class Course(models.Model):
         verbose_name_plural = '课程'
     def __str__(self):
         return self.name
+    def save(self, *args, **kwargs):
+        '''课程名称出现在统计图表中，修改课程时递增学习数据版本'''
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            DataVersion.bump(DataVersion.STUDY)
+    def delete(self, *args, **kwargs):
+        '''删除课程会级联删除其学习记录和汇总，同样递增学习数据版本；
+        级联删除的待复习计划同步从负载均衡索引中扣减'''
+        from .review_load import release_reviews
+        with transaction.atomic():
+            days=pending_review_days(ReviewSchedule.objects.filter(course_id=self.pk))
+            result=super().delete(*args, **kwargs)
+            DataVersion.bump(DataVersion.STUDY)
+            release_reviews(days)
+        return result
     def get_total_study_time(self):
-        '''计算总学习时长（h)'''
-        total_minutes=sum(session.duration for session in self.studysession_set.all())
+        '''计算总学习时长（h)，直接读取课程汇总，不再遍历学习记录'''
+        try:
+            total_minutes=self.study_stat.total_minutes
+        except CourseStudyStat.DoesNotExist:
+            total_minutes=0
         return round(total_minutes/60,2)
 
+class StudyMaterialQuerySet(models.QuerySet):
+    def with_study_stats(self):
+        '''一次分组查询附带学习统计：总时长（分钟）、学习次数、最近学习时间'''
+        return self.annotate(
+            total_minutes=Coalesce(Sum('studysession__duration'),Value(0.0)),
+            session_count=Count('studysession'),
+            last_studied=Max('studysession__start_time'),
+        )
+
+    def delete(self):
+        '''批量删除资料（如后台）时先处理会重复的复习计划'''
+        with transaction.atomic():
+            release_material_reviews(self.values_list('id',flat=True))
+            return super().delete()
+
+
+def release_material_reviews(material_ids):
+    '''资料删除时其复习计划会被置为无资料（SET_NULL）。
+    先删掉置空后会与同课程同日的无资料计划（或彼此）重复的行，避免违反唯一约束；
+    SET_NULL 是批量更新，不会刷新 auto_now，这里一并刷新复习计划和学习记录的 updated_at，供增量导出'''
+    material_ids=list(material_ids)
+    now=timezone.now()
+    StudySession.objects.filter(material_id__in=material_ids).update(updated_at=now)
+    ReviewSchedule.objects.filter(material_id__in=material_ids).update(updated_at=now)
+    reviews=ReviewSchedule.objects.filter(material_id__in=material_ids)
+    seen=set(
+        ReviewSchedule.objects.filter(
+            material__isnull=True,course_id__in=reviews.order_by().values('course_id')
+        ).values_list('course_id','review_date')
+    )
+    duplicate_ids=[]
+    for pk,course_id,review_date in reviews.order_by('-completed','-review_count','id').values_list(
+        'id','course_id','review_date'
+    ):
+        if (course_id,review_date) in seen:
+            duplicate_ids.append(pk)
+        else:
+            seen.add((course_id,review_date))
+    if duplicate_ids:
+        ReviewSchedule.objects.filter(id__in=duplicate_ids).delete()
+
+
 class StudyMaterial(models.Model):
     '''学习资料模型'''
     MATERIAL_TYPES = [
@@ -58,20 +133,80 @@ class StudyMaterial(models.Model):
     file_path=models.CharField(max_length=500, blank=True, verbose_name='文件路径或链接')
     estimated_time=models.IntegerField(default=0, verbose_name='预计学习时长（分钟）')
     created_at=models.DateTimeField(auto_now_add=True, verbose_name='添加时间')
+
+    objects=StudyMaterialQuerySet.as_manager()
+
     class Meta:
         verbose_name = '学习资料'
         verbose_name_plural = '学习资料'
         ordering = ['-created_at']
+        indexes = [
+            # material_list：按课程筛选 + 按添加时间排序
+            models.Index(fields=['course', 'created_at', 'id'], name='material_course_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.course.name} - {self.name}"
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            release_material_reviews([self.pk])
+            return super().delete(*args, **kwargs)
     
     def get_total_study_time(self):
-        '''计算该资料的总学习时长（分钟）'''
-        total = sum(session.duration for session in self.studysession_set.all())
+        '''计算该资料的总学习时长（分钟），优先使用with_study_stats()的注解结果'''
+        total = getattr(self, 'total_minutes', None)
+        if total is None:
+            total = self.studysession_set.aggregate(total=Sum('duration'))['total'] or 0
         return round(total, 2)
 
 
+def _upsert_increment(model, lookup, **deltas):
+    '''把 lookup 对应行的各字段加上增量并刷新 updated_at，行不存在时先创建
+
+    使用F表达式在数据库里累加，避免并发写入互相覆盖'''
+    values={field: F(field)+delta for field, delta in deltas.items()}
+    values['updated_at']=timezone.now()
+    if not model.objects.filter(**lookup).update(**values):
+        model.objects.get_or_create(**lookup)
+        model.objects.filter(**lookup).update(**values)
+
+
+def apply_study_deltas(deltas):
+    '''把学习记录的增量同步到课程汇总和每日汇总，并递增学习数据版本
+
+    deltas: {(课程id, 本地日期): [分钟数, 记录数]}，需在调用方的事务内执行
+    '''
+    course_deltas={}
+    for (course_id, day), (minutes, count) in deltas.items():
+        if not count and not minutes:
+            continue
+        DailyStudyStat.apply_delta(day,course_id,minutes,count)
+        total=course_deltas.setdefault(course_id,[0.0,0])
+        total[0]+=minutes
+        total[1]+=count
+    for course_id, (minutes, count) in course_deltas.items():
+        CourseStudyStat.apply_delta(course_id,minutes,count)
+    if course_deltas:
+        DataVersion.bump(DataVersion.STUDY)
+
+
+class StudySessionQuerySet(models.QuerySet):
+    def delete(self):
+        '''批量删除学习记录时，同步扣减课程汇总和每日汇总'''
+        with transaction.atomic():
+            rows=list(
+                self.order_by().values('course_id',day=TruncDate('start_time')).annotate(
+                    minutes=Sum('duration'),count=Count('id')
+                )
+            )
+            result=super().delete()
+            apply_study_deltas({
+                (row['course_id'],row['day']): [-(row['minutes'] or 0),-row['count']] for row in rows
+            })
+        return result
+
+
 class StudySession(models.Model):
     '''学习记录模型'''
     course = models.ForeignKey(
@@ -90,22 +225,174 @@ class StudySession(models.Model):
     end_time=models.DateTimeField(verbose_name='结束时间')
     duration=models.FloatField(verbose_name='学习时长（分钟）')
     created_at=models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+    updated_at=models.DateTimeField(auto_now=True, verbose_name='更新时间')
     notes=models.TextField(blank=True, verbose_name='学习笔记')
+
+    objects=StudySessionQuerySet.as_manager()
     
     class Meta:
         verbose_name = '学习记录'
         verbose_name_plural = '学习记录'
         ordering = ['-start_time']
+        indexes = [
+            # session_list：按课程筛选 + 按开始时间排序
+            models.Index(fields=['course', 'start_time', 'id'], name='session_course_start_idx'),
+            # session_list 无筛选/按日期筛选，dashboard 的 start_time__gte
+            models.Index(fields=['start_time', 'id'], name='session_start_idx'),
+            # 增量导出按 (updated_at, id) 水位线读取
+            models.Index(fields=['updated_at', 'id'], name='session_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.course.name} - {self.start_time.strftime('%Y-%m-%d')}"
     
     def save(self, *args, **kwargs):
-        '''自动计算学习时长'''
+        '''自动计算学习时长，并在同一事务内更新课程汇总和每日汇总'''
         if self.start_time and self.end_time:
             delta=self.end_time - self.start_time
             self.duration=delta.total_seconds() / 60
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            old=None
+            if self.pk:
+                old=StudySession.objects.filter(pk=self.pk).values('course_id','start_time','duration').first()
+            super().save(*args, **kwargs)
+            deltas={}
+            if old:
+                deltas[(old['course_id'],timezone.localdate(old['start_time']))]=[-old['duration'],-1]
+            current=deltas.setdefault((self.course_id,timezone.localdate(self.start_time)),[0.0,0])
+            current[0]+=self.duration
+            current[1]+=1
+            apply_study_deltas(deltas)
+
+    def delete(self, *args, **kwargs):
+        '''删除学习记录，并在同一事务内扣减课程汇总和每日汇总'''
+        with transaction.atomic():
+            result=super().delete(*args, **kwargs)
+            apply_study_deltas({(self.course_id,timezone.localdate(self.start_time)): [-self.duration,-1]})
+        return result
+
+
+class CourseStudyStat(models.Model):
+    '''课程学习汇总：总时长与记录数，由StudySession的增删改增量维护'''
+    course=models.OneToOneField(
+        Course,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='study_stat',
+        verbose_name='课程'
+    )
+    total_minutes=models.FloatField(default=0, verbose_name='总学习时长（分钟）')
+    session_count=models.IntegerField(default=0, verbose_name='学习记录数')
+    updated_at=models.DateTimeField(auto_now=True, verbose_name='更新时间')
+
+    class Meta:
+        verbose_name = '课程学习汇总'
+        verbose_name_plural = '课程学习汇总'
+
+    def __str__(self):
+        return f"{self.course.name} - {round(self.total_minutes/60,2)}h"
+
+    @classmethod
+    def apply_delta(cls, course_id, minutes, count):
+        '''累加汇总增量（使用F表达式，避免并发写入互相覆盖）'''
+        _upsert_increment(cls,{'course_id':course_id},total_minutes=minutes,session_count=count)
+
+    @classmethod
+    def rebuild(cls):
+        '''根据全部学习记录重建汇总，返回重建的课程数'''
+        with transaction.atomic():
+            cls.objects.all().delete()
+            rows=StudySession.objects.order_by().values('course_id').annotate(
+                minutes=Sum('duration'),
+                count=Count('id')
+            )
+            stats=[
+                cls(course_id=row['course_id'],total_minutes=row['minutes'] or 0,session_count=row['count'])
+                for row in rows
+            ]
+            cls.objects.bulk_create(stats)
+            # 汇总可能被修正，递增版本号让图表缓存和统计接口的ETag失效
+            DataVersion.bump(DataVersion.STUDY)
+        return len(stats)
+
+class DailyStudyStat(models.Model):
+    '''每日学习汇总：按本地日期（学习开始时间所在日）和课程累计，由StudySession的增删改增量维护'''
+    date=models.DateField(verbose_name='日期')
+    course=models.ForeignKey(
+        Course,
+        on_delete=models.CASCADE,
+        related_name='daily_stats',
+        verbose_name='课程'
+    )
+    total_minutes=models.FloatField(default=0, verbose_name='学习时长（分钟）')
+    session_count=models.IntegerField(default=0, verbose_name='学习记录数')
+    updated_at=models.DateTimeField(auto_now=True, verbose_name='更新时间')
+
+    class Meta:
+        verbose_name = '每日学习汇总'
+        verbose_name_plural = '每日学习汇总'
+        ordering = ['-date']
+        constraints = [
+            # 同时作为 dashboard 按日期范围查询的索引
+            models.UniqueConstraint(fields=['date', 'course'], name='daily_stat_date_course_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.course.name} - {round(self.total_minutes/60,2)}h"
+
+    @classmethod
+    def apply_delta(cls, day, course_id, minutes, count):
+        '''累加某天某课程的汇总增量（使用F表达式，避免并发写入互相覆盖）'''
+        _upsert_increment(cls,{'date':day,'course_id':course_id},total_minutes=minutes,session_count=count)
+
+    @classmethod
+    def rebuild(cls):
+        '''根据全部学习记录按本地日期重建每日汇总，返回重建的行数'''
+        with transaction.atomic():
+            cls.objects.all().delete()
+            rows=StudySession.objects.order_by().values('course_id',day=TruncDate('start_time')).annotate(
+                minutes=Sum('duration'),
+                count=Count('id')
+            )
+            stats=[
+                cls(date=row['day'],course_id=row['course_id'],total_minutes=row['minutes'] or 0,session_count=row['count'])
+                for row in rows
+            ]
+            cls.objects.bulk_create(stats,batch_size=1000)
+            DataVersion.bump(DataVersion.STUDY)
+        return len(stats)
+
+class DataVersion(models.Model):
+    '''数据版本号：相关数据每次写入递增，缓存以 (名称, 版本) 为键，数据不变时直接复用'''
+    STUDY='study'  # 学习记录及课程汇总
+    CURVES='forgetting_curve'  # 拟合的遗忘曲线参数
+
+    name=models.CharField(max_length=50, primary_key=True, verbose_name='名称')
+    version=models.PositiveBigIntegerField(default=0, verbose_name='版本号')
+    updated_at=models.DateTimeField(default=timezone.now, verbose_name='更新时间')
+
+    class Meta:
+        verbose_name = '数据版本'
+        verbose_name_plural = '数据版本'
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+    @classmethod
+    def bump(cls, name):
+        '''版本号加一（使用F表达式，并发写入不会丢失递增）'''
+        _upsert_increment(cls,{'name':name},version=1)
+
+    @property
+    def cache_key(self):
+        '''缓存键：版本号加更新时间，数据库重置或重建后版本号从头计数，也不会与旧缓存重名'''
+        stamp=self.updated_at.isoformat() if self.updated_at else '-'
+        return f'{self.version}@{stamp}'
+
+    @classmethod
+    def current(cls, name):
+        '''返回当前版本，从未写入过时版本号为0、updated_at为None'''
+        return cls.objects.filter(name=name).first() or cls(name=name, version=0, updated_at=None)
 
 class PomodoroSession(models.Model):
     '''番茄钟模型'''
@@ -116,16 +403,56 @@ class PomodoroSession(models.Model):
     focus_time=models.IntegerField(default=25, verbose_name='专注时长（分钟）')
     break_time=models.IntegerField(default=5, verbose_name='休息时长（分钟）')
     completed=models.BooleanField(default=False, verbose_name='是否完成')
+    updated_at=models.DateTimeField(auto_now=True, verbose_name='更新时间')
     
     class Meta:
         verbose_name = '番茄钟'
         verbose_name_plural = '番茄钟'
         ordering = ['-session_date']
+        indexes = [
+            # pomodoro_list：按课程筛选 + 按会话时间排序
+            models.Index(fields=['course', 'session_date', 'id'], name='pomodoro_course_date_idx'),
+            models.Index(fields=['session_date', 'id'], name='pomodoro_date_idx'),
+            models.Index(fields=['updated_at', 'id'], name='pomodoro_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.course.name} - {self.session_date.strftime('%Y-%m-%d %H:%M')}"
 
 
+def pending_review_days(reviews):
+    '''复习计划中未完成的按复习日期计数：[(复习日期, 条数)]'''
+    return list(reviews.filter(completed=False).order_by().values_list('review_date').annotate(n=Count('id')))
+
+
+class ReviewScheduleQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        '''批量插入复习计划，实际插入的待复习计划计入负载均衡索引（被唯一约束忽略的不计入）'''
+        from .review_load import add_reviews, shared_index_loaded
+        objs=list(objs)
+        wanted={(obj.course_id,obj.material_id,obj.review_date) for obj in objs if not obj.completed}
+        if not wanted or not shared_index_loaded():
+            return super().bulk_create(objs,*args,**kwargs)
+        with transaction.atomic():
+            rows=self.filter(
+                course_id__in={c for c,_,_ in wanted},review_date__in={d for _,_,d in wanted}
+            ).values_list('course_id','material_id','review_date')
+            before=set(rows)
+            result=super().bulk_create(objs,*args,**kwargs)
+            inserted=(set(rows.filter(completed=False))-before)&wanted
+            add_reviews(Counter(day for _,_,day in inserted).items())
+        return result
+
+    def delete(self):
+        '''批量删除复习计划时，同步扣减负载均衡索引中每天的待复习计划数'''
+        from .review_load import release_reviews
+        with transaction.atomic():
+            days=pending_review_days(self)
+            result=super().delete()
+            release_reviews(days)
+        return result
+
+
 class ReviewSchedule(models.Model):
     '''复习计划模型'''
     course = models.ForeignKey(
@@ -144,17 +471,173 @@ class ReviewSchedule(models.Model):
     completed=models.BooleanField(default=False, verbose_name='是否完成')
     review_count=models.IntegerField(default=0, verbose_name='复习次数')
     created_at=models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+    updated_at=models.DateTimeField(auto_now=True, verbose_name='更新时间')
+    # 自适应调度引擎的记忆状态（见 utils/schedulers.py），完成复习时写入下一条复习计划；
+    # 按学习记录生成的计划把学习日期记在 last_reviewed，供今日复习队列估算保留率
+    stability=models.FloatField(null=True, blank=True, verbose_name='记忆稳定性（天）')
+    difficulty=models.FloatField(null=True, blank=True, verbose_name='难度（1-10）')
+    last_reviewed=models.DateField(null=True, blank=True, verbose_name='上次复习日期')
+    grade=models.PositiveSmallIntegerField(null=True, blank=True, choices=GRADE_CHOICES, verbose_name='复习评分')
+    # 完成复习时距上次学习/复习的天数，与评分一起作为拟合遗忘曲线的样本
+    elapsed_days=models.IntegerField(null=True, blank=True, verbose_name='距上次学习/复习天数')
+
+    objects=ReviewScheduleQuerySet.as_manager()
     
     class Meta:
         verbose_name = '复习计划'
         verbose_name_plural = '复习计划'
         ordering = ['review_date']
-    
+        indexes = [
+            # review_list：未完成 + 按复习日期排序（可选按课程筛选）
+            # Django 把 completed=False 编译为 NOT completed，普通复合索引无法定位，这里用部分索引
+            models.Index(fields=['review_date', 'id'], condition=models.Q(completed=False), name='review_pending_date_idx'),
+            models.Index(
+                fields=['course', 'review_date', 'id'], condition=models.Q(completed=False), name='review_course_pending_idx'
+            ),
+            # review_list?show_completed=true
+            models.Index(fields=['review_date', 'id'], name='review_date_idx'),
+            models.Index(fields=['course', 'review_date', 'id'], name='review_course_date_idx'),
+            models.Index(fields=['updated_at', 'id'], name='review_updated_idx'),
+            # 今日复习队列：按 (复习次数, 上次学习/复习日期[, 有拟合曲线的课程]) 分组统计到期计划并取前N条的id，
+            # 覆盖索引不回表。completed 看似与部分索引条件重复，但 SQLite（3.40 实测）不把部分索引条件里的列
+            # 算作已覆盖，去掉后查询会改走 review_date_idx 回表，所以保留
+            models.Index(
+                fields=['review_date', 'review_count', 'last_reviewed', 'completed', 'course'],
+                condition=models.Q(completed=False), name='review_due_queue_idx'
+            ),
+        ]
+        constraints = [
+            # 同一课程/资料同一天只有一条复习计划；生成计划时用 bulk_create(ignore_conflicts=True) 直接插入，
+            # 不再先查询是否存在。NULL 在唯一索引中互不相等，无资料的计划单独用部分唯一索引约束
+            models.UniqueConstraint(
+                fields=['course', 'material', 'review_date'], condition=models.Q(material__isnull=False),
+                name='review_course_material_date_uniq', violation_error_message='该课程/资料在这一天已有复习计划'
+            ),
+            models.UniqueConstraint(
+                fields=['course', 'review_date'], condition=models.Q(material__isnull=True),
+                name='review_course_date_uniq', violation_error_message='该课程在这一天已有复习计划'
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        '''新建的待复习计划（表单、后台）计入负载均衡索引，与 delete 的扣减对应'''
+        from .review_load import add_reviews
+        adding=self._state.adding and not self.completed
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                add_reviews([(self.review_date,1)])
+
+    def delete(self, *args, **kwargs):
+        from .review_load import release_reviews
+        with transaction.atomic():
+            result=super().delete(*args, **kwargs)
+            if not self.completed:
+                release_reviews([(self.review_date,1)])
+        return result
+
+    def memory_state(self):
+        '''当前的记忆状态，交给调度引擎计算下次复习'''
+        return ReviewState(self.review_count, self.stability, self.difficulty, self.last_reviewed)
+
     def __str__(self):
         if self.material:
             return f"{self.course.name} - {self.material.name} - {self.review_date}"
         return f"{self.course.name} - {self.review_date}"
 
+class ForgettingCurveFit(models.Model):
+    '''按复习记录拟合的遗忘曲线：保留率 R = exp(-t / (stability * growth^n))，见 tracker/curve_fit.py'''
+    course=models.ForeignKey(Course, on_delete=models.CASCADE, verbose_name='课程')
+    material=models.ForeignKey(
+        StudyMaterial, on_delete=models.CASCADE, null=True, blank=True, verbose_name='学习资料（为空表示整门课程）'
+    )
+    stability=models.FloatField(verbose_name='初始稳定性（天）')
+    growth=models.FloatField(verbose_name='每次复习稳定性倍数')
+    sample_count=models.IntegerField(default=0, verbose_name='复习记录数')
+    fitted_at=models.DateTimeField(default=timezone.now, verbose_name='拟合时间')
+
+    class Meta:
+        verbose_name = '遗忘曲线参数'
+        verbose_name_plural = '遗忘曲线参数'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['course', 'material'], condition=models.Q(material__isnull=False), name='curve_fit_material_uniq'
+            ),
+            models.UniqueConstraint(
+                fields=['course'], condition=models.Q(material__isnull=True), name='curve_fit_course_uniq'
+            ),
+        ]
+
+    def __str__(self):
+        target = f"{self.course.name} - {self.material.name}" if self.material else self.course.name
+        return f"{target}：稳定性 {self.stability:.1f} 天 ×{self.growth:.2f}/次"
+
+    def curve(self):
+        return DecayCurve(self.stability, self.growth)
+
+class PdfIngestion(models.Model):
+    '''PDF后台解析任务：加载→分块→嵌入→建索引，按索引键（PDF内容哈希）唯一，同一份PDF只解析一次'''
+    PENDING='pending'
+    RUNNING='running'
+    DONE='done'
+    FAILED='failed'
+    STATUS_CHOICES=[(PENDING,'排队中'),(RUNNING,'解析中'),(DONE,'已完成'),(FAILED,'失败')]
+
+    key=models.CharField(max_length=100, unique=True, verbose_name='索引键')
+    file_name=models.CharField(max_length=255, blank=True, verbose_name='文件名')
+    file_path=models.CharField(max_length=500, verbose_name='文件路径')
+    status=models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING, verbose_name='状态')
+    pages_total=models.IntegerField(default=0, verbose_name='总页数')
+    pages_done=models.IntegerField(default=0, verbose_name='已加载页数')
+    chunks_total=models.IntegerField(default=0, verbose_name='分块数')  # 逐页解析，为已分出的分块数
+    chunks_embedded=models.IntegerField(default=0, verbose_name='已嵌入分块数')
+    cache_hits=models.IntegerField(default=0, verbose_name='命中嵌入缓存的分块数')
+    error=models.TextField(blank=True, verbose_name='错误信息')
+    created_at=models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+    started_at=models.DateTimeField(null=True, blank=True, verbose_name='开始时间')
+    updated_at=models.DateTimeField(default=timezone.now, verbose_name='更新时间')
+    finished_at=models.DateTimeField(null=True, blank=True, verbose_name='完成时间')
+
+    class Meta:
+        verbose_name = 'PDF解析任务'
+        verbose_name_plural = 'PDF解析任务'
+
+    def __str__(self):
+        return f"{self.file_name or self.key[:12]} - {self.get_status_display()}"
+
+    @property
+    def progress(self):
+        '''0~1 的完成比例：边加载边嵌入，按已加载页数的比例，再乘以已分出的分块中已嵌入的比例'''
+        if self.status==self.DONE:
+            return 1.0
+        pages=self.pages_done/self.pages_total if self.pages_total else 0.0
+        chunks=self.chunks_embedded/self.chunks_total if self.chunks_total else 0.0
+        return pages*chunks
+
+    @property
+    def eta_seconds(self):
+        '''按已用时间和完成比例估算的剩余秒数，尚无法估算时为None'''
+        if self.status!=self.RUNNING or not self.started_at or self.progress<=0:
+            return None
+        elapsed=(timezone.now()-self.started_at).total_seconds()
+        return round(elapsed*(1-self.progress)/self.progress, 1)
+
+    def as_dict(self):
+        return {
+            'id': self.pk,
+            'file_name': self.file_name,
+            'status': self.status,
+            'status_display': self.get_status_display(),
+            'progress': round(self.progress, 4),
+            'pages_done': self.pages_done,
+            'pages_total': self.pages_total,
+            'chunks_embedded': self.chunks_embedded,
+            'chunks_total': self.chunks_total,
+            'cache_hits': self.cache_hits,
+            'eta_seconds': self.eta_seconds,
+            'error': self.error,
+        }
+
 class KnowledgePoint(models.Model):
     course=models.ForeignKey(
     Course,
@@ -0,0 +1,342 @@
+"""
+PDF 向量索引缓存
+
+解析PDF（加载、分块、逐块调用嵌入接口、建立 FAISS 索引）耗时以分钟计，而同一份PDF的结果不会变。
+这里按 PDF 内容的 SHA-256（加上分块参数和嵌入模型，改动后自动失效）作为键，把建好的 FAISS 索引
+和分块内容（FAISS.save_local 写出的 index.faiss / index.pkl）保存在 PDF_INDEX_CACHE_DIR/<键>/ 下，
+之后的提问直接读取，不再调用嵌入接口建索引。
+建索引时分块的嵌入另有按文字内容寻址的缓存（embedding_cache.py），内容相同的分块跨PDF复用。
+
+- 写入先保存到临时目录再重命名，其他进程不会读到一半的索引
+- 每次命中更新目录的修改时间，总大小超过 PDF_INDEX_CACHE_MAX_BYTES 时按最近最少使用删除
+- 进程内另外保留最近用过的 MEMORY_ENTRIES 个索引，同一份PDF连续提问不再读盘
+- 同一进程内同一份PDF同时只建一次索引
+"""
+import gc
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from functools import lru_cache
+from itertools import islice
+from pathlib import Path
+from typing import NamedTuple
+
+from django.conf import settings
+
+from .llm import EMBEDDING_DIMENSIONS, EMBEDDING_MODEL
+
+logger = logging.getLogger(__name__)
+
+# 分块参数（属于缓存键的一部分）
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+SEPARATORS = ['\n\n', '\n', '.', '。', '!', '?', '；', '；', '：', '，', '、', '']
+# 每批嵌入的分块数（批越小进度越细，接口请求次数越多）；每隔多少页报告一次进度
+EMBED_BATCH = 256
+PROGRESS_PAGES = 10
+PAGES_PER_READER = 50  # 每读这么多页换一个 PdfReader（见 iter_pages）
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+MEMORY_ENTRIES = 2
+TMP_PREFIX = '.tmp-'
+
+
+@lru_cache(maxsize=64)
+def _file_digest(path, size, mtime_ns):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def pdf_digest(path):
+    '''PDF内容的SHA-256（文件未变化时不重复计算）'''
+    stat = os.stat(path)
+    return _file_digest(os.fspath(path), stat.st_size, stat.st_mtime_ns)
+
+
+def index_key(digest):
+    '''缓存键：内容哈希 + 分块参数与嵌入模型的哈希'''
+    config = f'{CHUNK_SIZE}|{CHUNK_OVERLAP}|{"".join(SEPARATORS)}|{EMBEDDING_MODEL}|{EMBEDDING_DIMENSIONS}'
+    return f'{digest}-{hashlib.sha256(config.encode("utf-8")).hexdigest()[:8]}'
+
+
+class IndexProgress(NamedTuple):
+    '''建索引进度'''
+    pages_done: int
+    pages_total: int
+    chunks_embedded: int = 0
+    chunks_total: int = 0   # 全部页面分块完成前为0
+    cache_hits: int = 0     # 命中嵌入缓存的分块数
+
+
+def text_splitter():
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    return RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, separators=SEPARATORS)
+
+
+def iter_pages(pdf_path):
+    """
+    逐页读取PDF的文字（每页一个 Document，文字和页码信息与 PyPDFLoader 一致）
+
+    PdfReader 会一直缓存解析过的对象（解压后的页面内容等），用一个 PdfReader 读完整本时内存随页数增长；
+    这里每 PAGES_PER_READER 页换一个新的 PdfReader，并立即回收旧的（对象之间有循环引用，
+    不主动回收会堆积到下一次完整的垃圾回收）。传给 PdfReader 的是打开的文件而不是路径，不会把整个文件读入内存。
+    """
+    from langchain_core.documents import Document
+    from pypdf import PdfReader
+    start = 0
+    with open(pdf_path, 'rb') as f:
+        while True:
+            reader = PdfReader(f)
+            total = len(reader.pages)
+            if start >= total:
+                return
+            labels = reader.page_labels
+            for number in range(start, min(start + PAGES_PER_READER, total)):
+                text = reader.pages[number].extract_text(extraction_mode='plain').strip()
+                yield Document(page_content=text, metadata={
+                    'source': os.fspath(pdf_path), 'total_pages': total, 'page': number, 'page_label': labels[number],
+                })
+            start += PAGES_PER_READER
+            del reader, labels
+            gc.collect()
+
+
+def iter_chunks(pages, splitter=None):
+    '''逐页分块：一次只持有一页的文字'''
+    splitter = splitter or text_splitter()
+    for page in pages:
+        yield from splitter.split_documents([page])
+
+
+def iter_batches(items, size):
+    '''每 size 个一批'''
+    items = iter(items)
+    while batch := list(islice(items, size)):
+        yield batch
+
+
+def _dir_size(path):
+    return sum(f.stat().st_size for f in path.iterdir() if f.is_file())
+
+
+class PdfIndexCache:
+    """按内容哈希保存在磁盘上的 FAISS 索引，按最近使用时间淘汰"""
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES, memory_entries=MEMORY_ENTRIES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._building = {}
+        self.hits = 0
+        self.misses = 0
+
+    def entry_path(self, key):
+        return self.directory / key
+
+    def contains(self, key):
+        return (self.entry_path(key) / 'index.faiss').exists()
+
+    def _remember(self, key, store):
+        with self._lock:
+            self._memory[key] = store
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def load(self, key, embeddings):
+        '''读取已缓存的索引，未缓存时返回None'''
+        with self._lock:
+            store = self._memory.get(key)
+            if store is not None:
+                self._memory.move_to_end(key)
+                store.embedding_function = embeddings  # 问题的嵌入用本次传入的模型（API密钥可能已更换）
+        path = self.entry_path(key)
+        if store is None:
+            if not self.contains(key):
+                return None
+            from langchain_community.vectorstores import FAISS
+            try:
+                # index.pkl 由本模块写出，可以反序列化
+                store = FAISS.load_local(str(path), embeddings, allow_dangerous_deserialization=True)
+            except (OSError, RuntimeError, ValueError, EOFError):
+                logger.exception('PDF索引缓存损坏，重新建立 %s', key)
+                shutil.rmtree(path, ignore_errors=True)
+                return None
+            self._remember(key, store)
+        try:
+            os.utime(path)  # 记录最近使用时间
+        except OSError:
+            pass
+        return store
+
+    def save(self, key, store):
+        '''写入索引（先写临时目录再重命名），然后按大小预算淘汰'''
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = self.directory / f'{TMP_PREFIX}{key}-{uuid.uuid4().hex[:8]}'
+        store.save_local(str(tmp))
+        try:
+            os.rename(tmp, self.entry_path(key))
+        except OSError:
+            # 其他进程已经写入了同一个键
+            shutil.rmtree(tmp, ignore_errors=True)
+        self._remember(key, store)
+        self.evict(keep=key)
+
+    def entries(self):
+        '''[(路径, 大小, 最近使用时间)]，按最近使用时间从旧到新'''
+        if not self.directory.exists():
+            return []
+        found = []
+        for path in self.directory.iterdir():
+            if not path.is_dir() or path.name.startswith(TMP_PREFIX):
+                continue
+            try:
+                found.append((path, _dir_size(path), path.stat().st_mtime))
+            except OSError:
+                continue
+        return sorted(found, key=lambda entry: entry[2])
+
+    def evict(self, keep=None):
+        '''总大小超过 max_bytes 时从最久未使用的开始删除，返回删除的个数（keep 不删除）'''
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if path.name == keep:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            with self._lock:
+                self._memory.pop(path.name, None)
+            total -= size
+            removed += 1
+        return removed
+
+    def get_or_build(self, key, embeddings, build):
+        '''返回 key 对应的索引，未缓存时调用 build() 建立并保存'''
+        store = self.load(key, embeddings)
+        if store is not None:
+            self.hits += 1
+            return store
+        with self._lock:
+            key_lock = self._building.setdefault(key, threading.Lock())
+        try:
+            with key_lock:
+                # 等待期间可能已由其他线程建好
+                store = self.load(key, embeddings)
+                if store is not None:
+                    self.hits += 1
+                    return store
+                self.misses += 1
+                store = build()
+                self.save(key, store)
+                return store
+        finally:
+            with self._lock:
+                self._building.pop(key, None)
+
+
+_cache = None
+_cache_config = None
+_cache_lock = threading.Lock()
+
+
+def get_pdf_index_cache():
+    '''按配置返回进程内共享的缓存（配置变化时重建）'''
+    global _cache, _cache_config
+    config = (
+        settings.PDF_INDEX_CACHE_DIR,
+        getattr(settings, 'PDF_INDEX_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES),
+    )
+    with _cache_lock:
+        if _cache is None or _cache_config != config:
+            _cache, _cache_config = PdfIndexCache(*config), config
+        return _cache
+
+
+def build_pdf_index(pdf_path, embeddings, progress=None, batch_size=EMBED_BATCH):
+    """
+    流式建立PDF的 FAISS 索引：逐页加载 → 分块 → 每 batch_size 个分块一批嵌入 → 追加到索引
+
+    加载、分块和嵌入的中间结果只保留当前一批，内存占用随 batch_size 而不是PDF页数增长
+    （索引本身的向量和分块内容除外）。分块嵌入经过内容寻址缓存（见 embedding_cache.py）；
+    progress(IndexProgress) 在每 PROGRESS_PAGES 页和每批嵌入后调用（后台解析任务用它更新进度），
+    其中 chunks_total 为已分出的分块数。
+
+    Returns:
+        (FAISS索引, EmbeddingStats)
+    """
+    from langchain_community.vectorstores import FAISS
+    from pypdf import PdfReader
+
+    from .embedding_cache import CachedEmbeddings, get_embedding_store
+    with open(pdf_path, 'rb') as f:
+        pages_total = len(PdfReader(f).pages)
+    cached = CachedEmbeddings(
+        embeddings, get_embedding_store(settings.EMBEDDING_CACHE_PATH),
+        model_name=getattr(embeddings, 'model', None), dimensions=getattr(embeddings, 'dimensions', None),
+    )
+    pages_done = chunks_split = chunks_embedded = 0
+
+    def report():
+        if progress:
+            progress(IndexProgress(pages_done, pages_total, chunks_embedded, chunks_split, cached.stats.hits))
+
+    def pages():
+        nonlocal pages_done
+        for page in iter_pages(pdf_path):
+            yield page
+            pages_done += 1
+            if pages_done % PROGRESS_PAGES == 0:
+                report()
+
+    def chunks():
+        nonlocal chunks_split
+        for chunk in iter_chunks(pages()):
+            chunks_split += 1
+            yield chunk
+
+    store = None
+
+    def add(batch):
+        # 一批的文字和向量只在这里引用，返回后即释放
+        nonlocal store, chunks_embedded
+        texts = [chunk.page_content for chunk in batch]
+        pairs = list(zip(texts, cached.embed_array(texts)))
+        metadatas = [chunk.metadata for chunk in batch]
+        if store is None:
+            store = FAISS.from_embeddings(pairs, embeddings, metadatas=metadatas)
+        else:
+            store.add_embeddings(pairs, metadatas=metadatas)
+        chunks_embedded += len(batch)
+
+    for batch in iter_batches(chunks(), batch_size):
+        add(batch)
+        report()
+    if not pages_done:
+        raise ValueError("PDF文件为空或无法解析，请检查PDF文件是否有效")
+    if store is None:
+        raise ValueError("PDF文本提取失败，请检查PDF文件内容")
+    report()
+    return store, cached.stats
+
+
+def load_pdf_index(pdf_path, embeddings):
+    '''返回PDF的 FAISS 索引：已缓存时直接读取，否则分块、嵌入并建立索引后缓存'''
+    key = index_key(pdf_digest(pdf_path))
+
+    def build():
+        store, stats = build_pdf_index(pdf_path, embeddings)
+        logger.info('建立PDF索引 %s：%s', key[:12], stats.summary())
+        return store
+
+    return get_pdf_index_cache().get_or_build(key, embeddings, build)
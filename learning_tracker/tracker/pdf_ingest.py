@@ -0,0 +1,201 @@
+"""
+PDF后台解析
+
+上传PDF时 start_ingestion 按索引键（PDF内容哈希，见 pdf_index.py）创建或复用一条 PdfIngestion，
+交给后台线程池执行 加载→分块→嵌入→建索引，进度（页数、已嵌入分块数、预计剩余时间）写回这条记录，
+智能助手页面轮询 agent/pdf/<id>/status/ 显示。索引写入 PDF 索引缓存后，提问直接复用；
+提问时解析仍在进行则最多等待 PDF_INGEST_CHAT_WAIT 秒，仍未完成就提示稍后再问。
+
+- 同一份PDF（无论谁上传、上传几次）同时只有一个任务；已完成且索引仍在缓存中的不再解析
+- 任务超过 STALE_SECONDS 秒没有更新视为已中断（如进程重启），再次上传时重新开始，
+  提问时不再等待而是按原方式当场建索引；本进程排队中或解析中的任务由心跳线程每 HEARTBEAT_SECONDS 秒
+  刷新 updated_at，排在别的任务后面或一批嵌入耗时较长时不会被误判为中断
+- PDF_INGEST_WORKERS 为后台线程数，0 表示在上传请求内同步执行（测试用）
+"""
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, connections
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import PdfIngestion
+from .pdf_index import build_pdf_index, get_pdf_index_cache, index_key, pdf_digest
+
+logger = logging.getLogger(__name__)
+
+STALE_SECONDS = 120
+HEARTBEAT_SECONDS = 30
+POLL_SECONDS = 0.5
+DEFAULT_WORKERS = 1
+
+_executor = None
+_executor_workers = None
+_executor_lock = threading.Lock()
+# 已提交到本进程线程池、尚未结束的任务，由心跳线程定时刷新
+_held = set()
+_heartbeat_thread = None
+
+
+def is_active(ingestion):
+    '''排队中或解析中，且最近仍在更新进度'''
+    return (
+        ingestion.status in (PdfIngestion.PENDING, PdfIngestion.RUNNING)
+        and timezone.now() - ingestion.updated_at < timedelta(seconds=STALE_SECONDS)
+    )
+
+
+def _submit(pk):
+    global _executor, _executor_workers
+    workers = getattr(settings, 'PDF_INGEST_WORKERS', DEFAULT_WORKERS)
+    if workers <= 0:
+        run_ingestion(pk)
+        return
+    with _executor_lock:
+        if _executor is None or _executor_workers != workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='pdf-ingest')
+            _executor_workers = workers
+        _held.add(pk)
+        _ensure_heartbeat()
+        _executor.submit(_run_in_thread, pk)
+
+
+def _run_in_thread(pk):
+    try:
+        run_ingestion(pk)
+    finally:
+        with _executor_lock:
+            _held.discard(pk)
+        connections.close_all()
+
+
+def _ensure_heartbeat():
+    '''调用方持有 _executor_lock'''
+    global _heartbeat_thread
+    if _heartbeat_thread is None or not _heartbeat_thread.is_alive():
+        _heartbeat_thread = threading.Thread(target=_heartbeat_loop, name='pdf-ingest-heartbeat', daemon=True)
+        _heartbeat_thread.start()
+
+
+def _heartbeat_loop():
+    global _heartbeat_thread
+    try:
+        while True:
+            time.sleep(HEARTBEAT_SECONDS)
+            with _executor_lock:
+                if not _held:
+                    _heartbeat_thread = None
+                    return
+            try:
+                heartbeat()
+            except Exception:
+                logger.exception('PDF解析心跳更新失败')
+    finally:
+        connections.close_all()
+
+
+def heartbeat():
+    '''刷新本进程排队中或解析中任务的 updated_at，返回更新的条数'''
+    with _executor_lock:
+        pks = list(_held)
+    if not pks:
+        return 0
+    return PdfIngestion.objects.filter(
+        pk__in=pks, status__in=[PdfIngestion.PENDING, PdfIngestion.RUNNING]
+    ).update(updated_at=timezone.now())
+
+
+def start_ingestion(pdf_path, file_name=''):
+    '''为上传的PDF启动后台解析，返回 PdfIngestion（已完成或正在解析时直接返回已有记录）'''
+    key = index_key(pdf_digest(pdf_path))
+    try:
+        ingestion, created = PdfIngestion.objects.get_or_create(
+            key=key, defaults={'file_name': file_name, 'file_path': pdf_path}
+        )
+    except IntegrityError:
+        ingestion, created = PdfIngestion.objects.get(key=key), False
+    if created:
+        _submit(ingestion.pk)
+    elif ingestion.status == PdfIngestion.DONE and get_pdf_index_cache().contains(key):
+        pass
+    elif not is_active(ingestion):
+        # 失败、中断或索引已被淘汰：重新开始；条件更新保证并发上传时只有一个请求提交任务
+        stale = timezone.now() - timedelta(seconds=STALE_SECONDS)
+        restarted = PdfIngestion.objects.filter(pk=ingestion.pk).filter(
+            Q(status__in=[PdfIngestion.DONE, PdfIngestion.FAILED]) | Q(updated_at__lt=stale)
+        ).update(
+            status=PdfIngestion.PENDING, file_name=file_name, file_path=pdf_path, pages_done=0, pages_total=0,
+            chunks_embedded=0, chunks_total=0, cache_hits=0, error='', started_at=None, finished_at=None,
+            updated_at=timezone.now(),
+        )
+        if restarted:
+            _submit(ingestion.pk)
+    ingestion.refresh_from_db()
+    return ingestion
+
+
+def run_ingestion(pk):
+    '''执行一条解析任务：加载→分块→嵌入→建索引并写入PDF索引缓存'''
+    from .llm import get_embeddings
+
+    ingestion = PdfIngestion.objects.get(pk=pk)
+    now = timezone.now()
+    PdfIngestion.objects.filter(pk=pk).update(status=PdfIngestion.RUNNING, started_at=now, updated_at=now)
+
+    def progress(p):
+        PdfIngestion.objects.filter(pk=pk).update(
+            pages_done=p.pages_done, pages_total=p.pages_total, chunks_embedded=p.chunks_embedded,
+            chunks_total=p.chunks_total, cache_hits=p.cache_hits, updated_at=timezone.now(),
+        )
+
+    try:
+        cache = get_pdf_index_cache()
+        if not cache.contains(ingestion.key):
+            started = time.perf_counter()
+            store, stats = build_pdf_index(ingestion.file_path, get_embeddings(), progress)
+            cache.save(ingestion.key, store)
+            logger.info('PDF解析完成 %s（%.1fs）：%s', ingestion.file_name, time.perf_counter() - started,
+                        stats.summary())
+    except Exception as e:
+        logger.exception('PDF解析失败 %s', ingestion.file_name)
+        PdfIngestion.objects.filter(pk=pk).update(
+            status=PdfIngestion.FAILED, error=str(e)[:1000], updated_at=timezone.now(), finished_at=timezone.now()
+        )
+    else:
+        now = timezone.now()
+        PdfIngestion.objects.filter(pk=pk).update(status=PdfIngestion.DONE, updated_at=now, finished_at=now)
+
+
+def wait_for_ingestion(pdf_path, timeout=None):
+    '''PDF的解析任务仍在进行时最多等待 timeout 秒，返回最新的 PdfIngestion；没有任务时返回None'''
+    if timeout is None:
+        timeout = getattr(settings, 'PDF_INGEST_CHAT_WAIT', 0)
+    key = index_key(pdf_digest(pdf_path))
+    deadline = time.monotonic() + timeout
+    while True:
+        ingestion = PdfIngestion.objects.filter(key=key).first()
+        if ingestion is None or not is_active(ingestion) or time.monotonic() >= deadline:
+            return ingestion
+        time.sleep(POLL_SECONDS)
+
+
+async def await_ingestion(pdf_path, timeout=None):
+    '''wait_for_ingestion 的异步版本：用异步ORM轮询，等待期间不占用线程'''
+    if timeout is None:
+        timeout = getattr(settings, 'PDF_INGEST_CHAT_WAIT', 0)
+    # 第一次计算大文件的哈希要读完整个文件，放到线程池
+    key = index_key(await sync_to_async(pdf_digest, thread_sensitive=False)(pdf_path))
+    deadline = time.monotonic() + timeout
+    while True:
+        ingestion = await PdfIngestion.objects.filter(key=key).afirst()
+        if ingestion is None or not is_active(ingestion) or time.monotonic() >= deadline:
+            return ingestion
+        await asyncio.sleep(POLL_SECONDS)
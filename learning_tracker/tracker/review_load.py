@@ -0,0 +1,169 @@
+"""
+复习负载均衡（可选，settings.REVIEW_LOAD_LEVELING）
+
+遗忘曲线把同一天学习的内容排到完全相同的复习日期，集中学习的日子之后会形成复习高峰。
+开启后生成复习计划时，在目标日期前后的浮动窗口内挑待复习计划最少的一天；
+窗口为 min(REVIEW_LOAD_FUZZ_DAYS, 间隔天数 // 4)，1天、3天这样的短间隔不挪动。
+同一学习项在窗口内已有待复习计划时视为已经安排过，重复生成不会多出计划。
+
+每天的待复习计划数保存在进程内的 DayLoadIndex 中：按 BLOCK_DAYS 天一段，第一次用到时用一次分组查询
+（覆盖索引 review_due_queue_idx 的日期范围）读入，挑选日期时不查询数据库。新建待复习计划（ReviewSchedule.save、
+bulk_create 实际插入的行）由 add_reviews() 在事务提交时加1，复习完成或计划删除（含随课程级联删除）由
+release_reviews() 减1，只调整已读入的段。
+多进程部署时各进程的计数会有偏差，超过 RELOAD_SECONDS 秒后重新读取。
+"""
+import sys
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from .models import ReviewSchedule
+
+DEFAULT_FUZZ_DAYS = 3
+BLOCK_DAYS = 64
+RELOAD_SECONDS = 600
+
+
+def leveling_enabled():
+    return getattr(settings, 'REVIEW_LOAD_LEVELING', False)
+
+
+def fuzz_window(interval_days, fuzz_days=None):
+    '''目标日期前后可挪动的天数'''
+    if fuzz_days is None:
+        fuzz_days = getattr(settings, 'REVIEW_LOAD_FUZZ_DAYS', DEFAULT_FUZZ_DAYS)
+    return max(0, min(fuzz_days, interval_days // 4))
+
+
+class DayLoadIndex:
+    """每天待复习计划数的内存索引"""
+
+    def __init__(self, fuzz_days=None):
+        self.fuzz_days = fuzz_days
+        self.counts = {}
+        self.blocks = set()
+        self.loaded_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self.counts.clear()
+            self.blocks.clear()
+            self.loaded_at = time.monotonic()
+
+    def _ensure(self, start, end):
+        '''读入 [start, end] 所在的各段'''
+        for block in range(start.toordinal() // BLOCK_DAYS, end.toordinal() // BLOCK_DAYS + 1):
+            if block in self.blocks:
+                continue
+            first = start.fromordinal(block * BLOCK_DAYS)
+            rows = ReviewSchedule.objects.filter(
+                completed=False, review_date__gte=first, review_date__lt=first + timedelta(days=BLOCK_DAYS)
+            ).order_by().values_list('review_date').annotate(n=Count('id'))
+            self.counts.update(rows)
+            self.blocks.add(block)
+
+    def _adjust(self, day, n):
+        with self._lock:
+            # 还没读入的段第一次用到时从数据库读取，已经包含这次变化
+            if day.toordinal() // BLOCK_DAYS in self.blocks:
+                self.counts[day] = max(0, self.counts.get(day, 0) + n)
+
+    def add(self, day, n=1):
+        '''记入已确认插入的待复习计划'''
+        self._adjust(day, n)
+
+    def release(self, day, n=1):
+        '''待复习计划完成或删除后扣减当天的计数'''
+        self._adjust(day, -n)
+
+    def max_window(self):
+        '''浮动窗口最多的天数'''
+        return fuzz_window(sys.maxsize, self.fuzz_days)
+
+    def load(self, day):
+        with self._lock:
+            self._ensure(day, day)
+            return self.counts.get(day, 0)
+
+    def place(self, target, interval_days, scheduled=(), earliest=None, blocked=()):
+        """
+        为一条复习计划挑选日期；不改变计数，插入成功后由调用方 add(复习日期)
+
+        Args:
+            target: 遗忘曲线给出的目标日期
+            interval_days: 距上次学习/复习的间隔天数，决定浮动窗口大小
+            scheduled: 同一学习项已有的待复习日期（集合，会加入新挑选的日期）
+            earliest: 最早可以安排的日期
+            blocked: 不能安排的日期（同一学习项已完成复习的日期，唯一约束不允许再插入）
+
+        Returns:
+            (复习日期, 是否为已有计划)
+        """
+        window = fuzz_window(interval_days, self.fuzz_days)
+        low, high = target - timedelta(days=window), target + timedelta(days=window)
+        for day in sorted(scheduled):
+            if low <= day <= high:
+                return day, True
+        candidates = [low + timedelta(days=i) for i in range(2 * window + 1)]
+        candidates = [
+            day for day in candidates if (earliest is None or day >= earliest) and day not in blocked
+        ]
+        if not candidates:
+            # 窗口内没有可用日期：从目标日期（不早于 earliest）往后顺延到第一个未被占用的日期
+            day = max(target, earliest) if earliest is not None else target
+            while day in blocked:
+                day += timedelta(days=1)
+            candidates = [day]
+        with self._lock:
+            self._ensure(candidates[0], candidates[-1])
+            # 计划数相同时取离目标日期最近的，再取较早的
+            day = min(candidates, key=lambda d: (self.counts.get(d, 0), abs((d - target).days), d))
+        if isinstance(scheduled, set):
+            scheduled.add(day)
+        return day, False
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_day_load_index():
+    '''进程内共享的索引，超过 RELOAD_SECONDS 后清空重新读取'''
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = DayLoadIndex()
+        elif time.monotonic() - _index.loaded_at > RELOAD_SECONDS:
+            _index.clear()
+        return _index
+
+
+def shared_index_loaded():
+    '''进程内共享的索引是否已经创建（未创建时无需维护计数）'''
+    return _index is not None
+
+
+def _on_commit(apply, counts):
+    counts = [(day, n) for day, n in counts if n]
+
+    def run():
+        if _index is not None:
+            for day, n in counts:
+                apply(_index, day, n)
+    if counts:
+        transaction.on_commit(run)
+
+
+def add_reviews(counts):
+    '''新插入的待复习计划 [(复习日期, 条数)]，事务提交后计入进程内共享的索引'''
+    _on_commit(DayLoadIndex.add, counts)
+
+
+def release_reviews(counts):
+    '''完成或删除的待复习计划 [(复习日期, 条数)]，事务提交后从进程内共享的索引中扣减'''
+    _on_commit(DayLoadIndex.release, counts)
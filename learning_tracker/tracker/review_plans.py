@@ -0,0 +1,185 @@
+"""
+批量生成复习计划（夜间任务）
+
+学习项 = (课程, 资料)，未关联资料的学习记录归为 (课程, 无资料)。
+对最近有学习记录的每个学习项，与 review_auto_generate 视图采用相同规则：
+以最近一次学习的开始时间为学习日期、已完成的复习计划条数为复习次数，
+用遗忘曲线生成接下来的复习日期，跳过该学习项已存在的日期，其余写入。
+开启负载均衡（level_load）时改为在浮动窗口内挑待复习计划最少的一天，见 review_load.py。
+
+实现上按 (课程id, 资料id) 顺序流式读取分组结果，每 chunk_size 个学习项为一批：
+已完成次数、已有日期各一次分组查询，复习日期用 batch_generate_review_schedule 一次算出，
+缺失的行 bulk_create(ignore_conflicts=True)，每批一个事务；与视图或另一个进程并发写入同一天时
+由唯一约束忽略，不会产生重复计划（此时报告的新建条数可能略多于实际）。每批结束后报告游标 (课程id, 资料id)，
+中断后可用 after 参数从该位置继续；重复执行也不会生成重复计划。
+"""
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from .models import ReviewSchedule, StudySession
+from .review_load import DayLoadIndex
+from .utils.forgetting_curve import batch_generate_review_schedule
+
+DEFAULT_CHUNK_SIZE = 5000
+DEFAULT_DAYS = 7
+DEFAULT_MAX_REVIEWS = 3  # 与 review_auto_generate 一致
+
+
+class ReviewGenerationReport:
+    """生成结果：处理的学习项数、新建计划数、最后处理到的位置"""
+
+    def __init__(self):
+        self.items = 0
+        self.created = 0
+        self.chunks = 0
+        self.last_key = None
+        self.elapsed = 0.0
+
+    def summary(self):
+        rate = round(self.items / self.elapsed, 1) if self.elapsed else 0.0
+        return (f'处理 {self.items} 个学习项（{self.chunks} 批），新建复习计划 {self.created} 条，'
+                f'用时 {self.elapsed:.2f}s（{rate} 项/秒）')
+
+
+def format_key(key):
+    '''游标格式：课程id:资料id，无资料时为 课程id:'''
+    course_id, material_id = key
+    return f"{course_id}:{'' if material_id is None else material_id}"
+
+
+def parse_key(value):
+    '''解析 format_key 的结果，只有课程id时表示从该课程之后开始'''
+    course, _, material = value.partition(':')
+    if not course.isdigit() or (material and not material.isdigit()):
+        raise ValueError(f'无效的位置：{value}，应为 课程id 或 课程id:资料id')
+    if ':' not in value:
+        return int(course), None, True
+    return int(course), int(material) if material else None, False
+
+
+def _after_filter(after):
+    '''按 (course_id, material_id) 排在 after 之后；SQLite 中 NULL 排在最前'''
+    course_id, material_id, whole_course = after
+    if whole_course:
+        return Q(course_id__gt=course_id)
+    same_course = Q(course_id=course_id, material_id__isnull=False)
+    if material_id is not None:
+        same_course &= Q(material_id__gt=material_id)
+    return Q(course_id__gt=course_id) | same_course
+
+
+def iter_learning_items(since, after=None):
+    '''流式产出 (课程id, 资料id, 最近学习时间)，按 (课程id, 资料id) 排序'''
+    sessions = StudySession.objects.filter(start_time__gte=since)
+    if after is not None:
+        sessions = sessions.filter(_after_filter(after))
+    rows = sessions.order_by().values('course_id', 'material_id').annotate(
+        last_studied=Max('start_time')
+    ).order_by('course_id', 'material_id').values_list('course_id', 'material_id', 'last_studied')
+    return rows.iterator(chunk_size=DEFAULT_CHUNK_SIZE)
+
+
+def _process_chunk(items, max_reviews, dry_run=False, load_index=None):
+    '''为一批学习项生成复习计划，返回新建条数；load_index 为 DayLoadIndex 时做负载均衡'''
+    import numpy as np
+
+    course_ids = sorted({course_id for course_id, _, _ in items})
+    completed = {
+        (row['course_id'], row['material_id']): row['count']
+        for row in ReviewSchedule.objects.filter(course_id__in=course_ids, completed=True).order_by()
+        .values('course_id', 'material_id').annotate(count=Count('id'))
+    }
+    counts = np.array([completed.get((c, m), 0) for c, m, _ in items], dtype=np.int64)
+    # 与视图一致：学习日期取本地日期（与每日汇总相同，Asia/Shanghai 零点到八点的学习不会算到前一天）
+    study_dates = np.array(
+        [timezone.localtime(studied).replace(tzinfo=None) for _, _, studied in items], dtype='datetime64[s]'
+    )
+    schedule_dates, _ = batch_generate_review_schedule(study_dates, counts, max_reviews)
+    schedule_days = schedule_dates.astype('datetime64[D]')
+
+    first_day = schedule_days.min().astype(object)
+    if load_index is not None:
+        first_day -= timedelta(days=load_index.max_window())
+    existing = set()
+    scheduled, blocked = {}, {}
+    for course_id, material_id, day, done in ReviewSchedule.objects.filter(
+        course_id__in=course_ids, review_date__gte=first_day
+    ).values_list('course_id', 'material_id', 'review_date', 'completed'):
+        existing.add((course_id, material_id, day))
+        (blocked if done else scheduled).setdefault((course_id, material_id), set()).add(day)
+
+    new_reviews = []
+    studied_days = study_dates.astype('datetime64[D]').astype(object).tolist()
+    for (course_id, material_id, _), count, studied, days in zip(
+        items, counts.tolist(), studied_days, schedule_days.astype(object).tolist()
+    ):
+        key = (course_id, material_id)
+        for day in days:
+            if load_index is not None:
+                day, exists = load_index.place(
+                    day, (day - studied).days, scheduled.setdefault(key, set()), studied + timedelta(days=1),
+                    blocked.get(key, ())
+                )
+                if exists:
+                    continue
+                # 同一批后面的学习项要看到这条计划；插入被忽略时在下面扣回
+                load_index.add(day)
+            elif (course_id, material_id, day) in existing:
+                continue
+            existing.add((course_id, material_id, day))
+            new_reviews.append(ReviewSchedule(
+                course_id=course_id,
+                material_id=material_id,
+                review_date=day,
+                review_count=count,
+                completed=False,
+                last_reviewed=studied,
+            ))
+    if new_reviews and not dry_run:
+        with transaction.atomic():
+            ReviewSchedule.objects.bulk_create(new_reviews, batch_size=1000, ignore_conflicts=True)
+        if load_index is not None:
+            pending = set(ReviewSchedule.objects.filter(
+                course_id__in=course_ids, review_date__gte=first_day, completed=False
+            ).values_list('course_id', 'material_id', 'review_date'))
+            for review in new_reviews:
+                if (review.course_id, review.material_id, review.review_date) not in pending:
+                    load_index.release(review.review_date)
+    return len(new_reviews)
+
+
+def generate_reviews(days=DEFAULT_DAYS, chunk_size=DEFAULT_CHUNK_SIZE, max_reviews=DEFAULT_MAX_REVIEWS,
+                     after=None, dry_run=False, progress=None, level_load=False):
+    '''为最近 days 天内学习过的学习项批量生成复习计划，返回ReviewGenerationReport
+
+    after: parse_key 的结果，从该位置之后继续；progress(report) 在每批结束后调用；
+    level_load: 在浮动窗口内挑待复习计划最少的一天（见 review_load.py），本次执行单独维护每天的计数
+    '''
+    load_index = DayLoadIndex() if level_load else None
+    report = ReviewGenerationReport()
+    started = time.perf_counter()
+    since = timezone.now() - timedelta(days=days)
+    chunk = []
+    for item in iter_learning_items(since, after):
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            _finish_chunk(chunk, max_reviews, dry_run, load_index, report, started, progress)
+            chunk = []
+    if chunk:
+        _finish_chunk(chunk, max_reviews, dry_run, load_index, report, started, progress)
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+def _finish_chunk(chunk, max_reviews, dry_run, load_index, report, started, progress):
+    report.created += _process_chunk(chunk, max_reviews, dry_run, load_index)
+    report.items += len(chunk)
+    report.chunks += 1
+    report.last_key = chunk[-1][:2]
+    report.elapsed = time.perf_counter() - started
+    if progress:
+        progress(report)
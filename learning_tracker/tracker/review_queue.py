@@ -0,0 +1,152 @@
+"""
+今日复习队列：到期（含逾期）的未完成复习计划，按预测保留率从低到高排列
+
+保留率由 get_retention_rate(距上次学习/复习的天数, 已完成复习次数) 估算，只取决于
+(上次学习/复习日期, 复习次数)，因此先用一次分组查询统计到期计划在各组合上的条数
+（部分覆盖索引 review_due_queue_idx，不回表），用 batch_retention_rate 批量算出每组的保留率并排序，
+再只在前 N 条所在的几组中取 id（同一索引），最后按 id 取明细。上次学习/复习日期缺失的旧计划按复习日期估算。
+组内按 (复习日期, id) 排序；游标记录上一页最后一条的位置，跨天后失效并回到第一页。
+
+有拟合遗忘曲线（见 curve_fit.py）的课程按各自的曲线估算，分组时再按课程细分（curve 为课程id，
+其余课程为0，课程也在覆盖索引中）；学习资料单独拟合的参数只用于调度，队列按课程参数排序。
+"""
+from datetime import date
+
+from django.core import signing
+from django.db.models import Case, Count, F, IntegerField, Q, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .curve_fit import FittedCurves, get_fitted_curves
+from .models import ReviewSchedule
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 200
+CURSOR_SALT = 'tracker.review-queue'
+
+
+class DueQueue:
+    """一页到期复习计划"""
+
+    def __init__(self, today, due_count, items, next_cursor=None):
+        self.today = today
+        self.due_count = due_count
+        self.items = items  # [(复习计划, 保留率)]
+        self.next_cursor = next_cursor
+
+    def as_dict(self):
+        return {
+            'date': self.today.isoformat(),
+            'due_count': self.due_count,
+            'items': [
+                {
+                    'id': review.pk,
+                    'course_id': review.course_id,
+                    'course': review.course.name,
+                    'material_id': review.material_id,
+                    'material': review.material.name if review.material else None,
+                    'review_date': review.review_date.isoformat(),
+                    'overdue_days': (self.today - review.review_date).days,
+                    'review_count': review.review_count,
+                    'retention': round(retention, 4),
+                }
+                for review, retention in self.items
+            ],
+            'next_cursor': self.next_cursor,
+        }
+
+
+def due_reviews(today, course_ids=None, curves=None):
+    '''到期（复习日期不晚于今天）的未完成复习计划；curve 为有拟合曲线的课程id，其余为0'''
+    reviews = ReviewSchedule.objects.filter(completed=False, review_date__lte=today)
+    if course_ids:
+        reviews = reviews.filter(course_id__in=course_ids)
+    fitted = sorted(curves.courses) if curves else []
+    curve = Case(
+        When(course_id__in=fitted, then=F('course_id')), default=Value(0), output_field=IntegerField()
+    ) if fitted else Value(0, output_field=IntegerField())
+    return reviews.annotate(seen=Coalesce('last_reviewed', 'review_date'), curve=curve)
+
+
+def retention_buckets(reviews, today, curves=None):
+    '''按 (上次学习/复习日期, 复习次数, 曲线) 分组，返回按 (保留率, 日期, 次数, 曲线) 排序的 [(日期, 次数, 曲线, 条数, 保留率)]'''
+    curves = curves or FittedCurves()
+    fields = ('seen', 'review_count', 'curve') if curves.courses else ('seen', 'review_count')
+    rows = [
+        row if len(row) == 4 else (row[0], row[1], 0, row[2])
+        for row in reviews.order_by().values_list(*fields).annotate(n=Count('id'))
+    ]
+    if not rows:
+        return []
+    retention = curves.batch_retention(
+        [(today - seen).days for seen, _, _, _ in rows], [count for _, count, _, _ in rows],
+        [curve for _, _, curve, _ in rows]
+    )
+    buckets = [(seen, count, curve, n, r) for (seen, count, curve, n), r in zip(rows, retention.tolist())]
+    buckets.sort(key=lambda b: (b[4], b[0], b[1], b[2]))
+    return buckets
+
+
+def _bucket_q(seen, count, curve):
+    return Q(seen=seen, review_count=count, curve=curve)
+
+
+def encode_queue_cursor(today, review):
+    return signing.dumps(
+        [today.isoformat(), review.seen.isoformat(), review.review_count, review.curve, review.review_date.isoformat(),
+         review.pk],
+        salt=CURSOR_SALT
+    )
+
+
+def decode_queue_cursor(token, today):
+    '''返回 ((日期, 次数, 曲线), (复习日期, id))；游标无效或不是今天的返回None'''
+    try:
+        day, seen, count, curve, review_date, pk = signing.loads(token, salt=CURSOR_SALT)
+        if day != today.isoformat():
+            return None
+        return (date.fromisoformat(seen), int(count), int(curve)), (date.fromisoformat(review_date), int(pk))
+    except (signing.BadSignature, TypeError, ValueError):
+        return None
+
+
+def get_due_queue(limit=DEFAULT_LIMIT, cursor=None, course_ids=None, today=None):
+    '''今日复习队列的一页'''
+    today = today or timezone.localdate()
+    limit = max(1, min(limit, MAX_LIMIT))
+    curves = get_fitted_curves()
+    reviews = due_reviews(today, course_ids, curves)
+    buckets = retention_buckets(reviews, today, curves)
+    due_count = sum(n for _, _, _, n, _ in buckets)
+
+    position = decode_queue_cursor(cursor, today) if cursor else None
+    whens, retention_by_rank, wanted = [], [], limit + 1
+    if position is not None:
+        # 从游标所在组的剩余部分开始，之后是排在该组后面的组（该组可能已全部完成而不存在）
+        (seen, count, curve), (review_date, pk) = position
+        retention = curves.batch_retention([(today - seen).days], [count], [curve]).tolist()[0]
+        after = _bucket_q(seen, count, curve) & (Q(review_date__gt=review_date) | Q(review_date=review_date, pk__gt=pk))
+        whens.append(When(after, then=Value(0)))
+        retention_by_rank.append(retention)
+        wanted -= reviews.filter(after).count()
+        buckets = [b for b in buckets if (b[4], b[0], b[1], b[2]) > (retention, seen, count, curve)]
+    for seen, count, curve, n, retention in buckets:
+        if wanted <= 0:
+            break
+        whens.append(When(_bucket_q(seen, count, curve), then=Value(len(whens))))
+        retention_by_rank.append(retention)
+        wanted -= n
+    if not whens:
+        return DueQueue(today, due_count, [])
+
+    # 先在覆盖索引上取前 limit+1 条的 id 和排名，再按 id 取明细
+    ranked = list(
+        reviews.annotate(rank=Case(*whens, default=None, output_field=IntegerField()))
+        .filter(rank__isnull=False)
+        .order_by('rank', 'review_date', 'id')
+        .values_list('id', 'rank')[:limit + 1]
+    )
+    details = due_reviews(today, curves=curves).select_related('course', 'material').in_bulk([pk for pk, _ in ranked])
+    items = [(details[pk], retention_by_rank[rank]) for pk, rank in ranked if pk in details]
+    next_cursor = encode_queue_cursor(today, items[limit - 1][0]) if len(items) > limit else None
+    return DueQueue(today, due_count, items[:limit], next_cursor)
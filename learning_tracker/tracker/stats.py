@@ -0,0 +1,126 @@
+"""
+学习统计数据（供 JSON 接口使用，与仪表板口径一致）
+
+全部读取汇总表：每日数据和区间内课程分布来自 DailyStudyStat，累计总量来自 CourseStudyStat。
+日期均为本地日期（Asia/Shanghai）。
+条件请求：ETag 由 (学习数据版本及其更新时间, 当天日期, 查询参数) 计算，Last-Modified 取数据版本的更新时间
+（不早于本地当天零点，因为“今日”数据在跨天时会变化），数据未变时返回 304。
+"""
+import hashlib
+from datetime import datetime, timedelta
+
+from django.db.models import Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import CourseStudyStat, DailyStudyStat, DataVersion
+
+DEFAULT_DAYS = 30
+MAX_DAYS = 3660  # 单次最多查询约十年
+
+
+class StatsQuery:
+    """解析后的查询参数：起止日期（含）与课程id列表"""
+
+    def __init__(self, start, end, course_ids):
+        self.start = start
+        self.end = end
+        self.course_ids = course_ids
+
+    @classmethod
+    def from_params(cls, params, today=None):
+        '''从 GET 参数解析：start、end 为 YYYY-MM-DD，course 可重复或逗号分隔；参数无效时抛出ValueError'''
+        today = today or timezone.localdate()
+        end = _parse_day(params.get('end'), 'end') or today
+        start = _parse_day(params.get('start'), 'start') or end - timedelta(days=DEFAULT_DAYS - 1)
+        if start > end:
+            raise ValueError('start 不能晚于 end')
+        if (end - start).days >= MAX_DAYS:
+            raise ValueError(f'查询区间不能超过 {MAX_DAYS} 天')
+        course_ids = set()
+        for value in params.getlist('course'):
+            for part in value.split(','):
+                part = part.strip()
+                if not part:
+                    continue
+                if not part.isdigit():
+                    raise ValueError(f'无效的课程id：{part}')
+                course_ids.add(int(part))
+        return cls(start, end, sorted(course_ids))
+
+    def cache_key(self):
+        return f"{self.start}|{self.end}|{','.join(map(str, self.course_ids))}"
+
+
+def _parse_day(value, name):
+    if not value:
+        return None
+    day = parse_date(value)
+    if day is None:
+        raise ValueError(f'{name} 日期格式应为 YYYY-MM-DD')
+    return day
+
+
+def stats_etag(query, version, today):
+    digest = hashlib.sha1(f'{version.cache_key}|{today}|{query.cache_key()}'.encode('utf-8')).hexdigest()
+    return f'"{digest[:20]}"'
+
+
+def stats_last_modified(version, today):
+    midnight = timezone.make_aware(datetime.combine(today, datetime.min.time()))
+    return max(version.updated_at, midnight) if version.updated_at else midnight
+
+
+def compute_stats(query, today=None):
+    '''返回统计字典：区间内每日数据、课程分布、区间合计、累计总量、今日时长'''
+    today = today or timezone.localdate()
+    daily_stats = DailyStudyStat.objects.filter(date__gte=query.start, date__lte=query.end)
+    course_stats = CourseStudyStat.objects.all()
+    today_stats = DailyStudyStat.objects.filter(date=today)
+    if query.course_ids:
+        daily_stats = daily_stats.filter(course_id__in=query.course_ids)
+        course_stats = course_stats.filter(course_id__in=query.course_ids)
+        today_stats = today_stats.filter(course_id__in=query.course_ids)
+
+    daily = [
+        {'date': row['date'].isoformat(), 'minutes': round(row['minutes'], 2), 'sessions': row['sessions']}
+        for row in daily_stats.values('date').annotate(
+            minutes=Sum('total_minutes'), sessions=Sum('session_count')
+        ).filter(sessions__gt=0).order_by('date')
+    ]
+    distribution = [
+        {'course_id': row['course_id'], 'course': row['course__name'],
+         'minutes': round(row['minutes'], 2), 'sessions': row['sessions']}
+        for row in daily_stats.values('course_id', 'course__name').annotate(
+            minutes=Sum('total_minutes'), sessions=Sum('session_count')
+        ).filter(sessions__gt=0).order_by('-minutes', 'course_id')
+    ]
+    all_time = course_stats.aggregate(minutes=Sum('total_minutes'), sessions=Sum('session_count'))
+    today_minutes = today_stats.aggregate(minutes=Sum('total_minutes'))['minutes'] or 0
+    range_minutes = sum(item['minutes'] for item in daily)
+    return {
+        'start': query.start.isoformat(),
+        'end': query.end.isoformat(),
+        'courses': query.course_ids,
+        'daily': daily,
+        'distribution': distribution,
+        'range_total': {
+            'minutes': round(range_minutes, 2),
+            'hours': round(range_minutes / 60, 2),
+            'sessions': sum(item['sessions'] for item in daily),
+        },
+        'total': {
+            'minutes': round(all_time['minutes'] or 0, 2),
+            'hours': round((all_time['minutes'] or 0) / 60, 2),
+            'sessions': all_time['sessions'] or 0,
+        },
+        'today': {
+            'date': today.isoformat(),
+            'minutes': round(today_minutes, 2),
+            'hours': round(today_minutes / 60, 2),
+        },
+    }
+
+
+def current_version():
+    return DataVersion.current(DataVersion.STUDY)
@@ -1,3 +1,1174 @@
-from django.test import TestCase
+from datetime import date, datetime, timedelta
+import gzip
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stderr
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.db.models import Count
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .curve_fit import fit_forgetting_curves, get_fitted_curves
+from .exporters import ExportStats, Watermark, export_stream, parse_since
+from .importers import import_sessions
+from .review_load import DayLoadIndex, get_day_load_index
+from .review_plans import generate_reviews, parse_key
+from .models import (
+    Course, CourseStudyStat, DailyStudyStat, DataVersion, PdfIngestion, ReviewSchedule, StudyMaterial, StudySession,
+)
+from .utils import chart_render
+from .utils import forgetting_curve as fc
+from .utils import review_simulation
+from .utils import schedulers
 
 # Create your tests here.
+
+
+def make_session(course, start, minutes, **kwargs):
+    '''创建一条指定时长的学习记录'''
+    return StudySession.objects.create(
+        course=course,
+        start_time=start,
+        end_time=start + timedelta(minutes=minutes),
+        duration=0,
+        **kwargs
+    )
+
+
+class CourseStudyStatTests(TestCase):
+    '''课程学习汇总随学习记录增删改同步'''
+
+    def setUp(self):
+        self.course = Course.objects.create(name='高等数学')
+        self.other = Course.objects.create(name='线性代数')
+        self.start = timezone.make_aware(datetime(2025, 12, 1, 9, 0))
+
+    def stat(self, course):
+        return CourseStudyStat.objects.get(course=course)
+
+    def test_create_update_delete(self):
+        session = make_session(self.course, self.start, 90)
+        make_session(self.course, self.start, 30)
+        self.assertEqual(self.stat(self.course).session_count, 2)
+        self.assertAlmostEqual(self.course.get_total_study_time(), 2.0)
+
+        # 修改时长并换课程：旧课程扣减、新课程累加
+        session.course = self.other
+        session.end_time = self.start + timedelta(minutes=60)
+        session.save()
+        self.assertAlmostEqual(self.stat(self.course).total_minutes, 30)
+        self.assertAlmostEqual(self.stat(self.other).total_minutes, 60)
+
+        session.delete()
+        self.assertEqual(self.stat(self.other).session_count, 0)
+        self.assertAlmostEqual(self.stat(self.other).total_minutes, 0)
+
+    def test_queryset_delete(self):
+        make_session(self.course, self.start, 45)
+        make_session(self.course, self.start, 15)
+        StudySession.objects.filter(course=self.course).delete()
+        self.assertEqual(self.stat(self.course).session_count, 0)
+        self.assertAlmostEqual(self.stat(self.course).total_minutes, 0)
+
+    def test_rebuild_command(self):
+        make_session(self.course, self.start, 120)
+        CourseStudyStat.objects.all().delete()
+        self.assertEqual(Course.objects.get(pk=self.course.pk).get_total_study_time(), 0)
+        version = DataVersion.current(DataVersion.STUDY).version
+        call_command('rebuild_study_stats', stdout=StringIO())
+        self.assertAlmostEqual(self.stat(self.course).total_minutes, 120)
+        self.assertEqual(self.stat(self.course).session_count, 1)
+        # 重建后的汇总可能不同，图表缓存和统计接口的ETag随版本失效
+        self.assertGreater(DataVersion.current(DataVersion.STUDY).version, version)
+
+
+class DailyStudyStatTests(TestCase):
+    '''每日学习汇总按本地日期（Asia/Shanghai）同步维护'''
+
+    def setUp(self):
+        self.course = Course.objects.create(name='高等数学')
+
+    def daily(self):
+        return {
+            (row.date.isoformat(), row.course_id): (round(row.total_minutes, 2), row.session_count)
+            for row in DailyStudyStat.objects.all()
+        }
+
+    def test_local_day_boundaries_and_moves(self):
+        # 本地 00:30 对应 UTC 前一天 16:30，应计入本地当天
+        late = make_session(self.course, timezone.make_aware(datetime(2025, 12, 1, 23, 30)), 20)
+        make_session(self.course, timezone.make_aware(datetime(2025, 12, 2, 0, 30)), 40)
+        self.assertEqual(self.daily(), {
+            ('2025-12-01', self.course.pk): (20, 1),
+            ('2025-12-02', self.course.pk): (40, 1),
+        })
+        # 改到另一天：旧日期扣减、新日期累加
+        late.start_time = timezone.make_aware(datetime(2025, 12, 2, 8, 0))
+        late.end_time = late.start_time + timedelta(minutes=30)
+        late.save()
+        self.assertEqual(self.daily()[('2025-12-01', self.course.pk)], (0, 0))
+        self.assertEqual(self.daily()[('2025-12-02', self.course.pk)], (70, 2))
+
+        StudySession.objects.filter(course=self.course).delete()
+        self.assertEqual(self.daily()[('2025-12-02', self.course.pk)], (0, 0))
+
+    def test_import_and_rebuild_agree(self):
+        data = (
+            'course,start_time,end_time\n'
+            '高等数学,2025-12-01 23:50,2025-12-02 00:20\n'
+            '高等数学,2025-12-02 07:00,2025-12-02 08:00\n'
+        )
+        import_sessions(StringIO(data), 'csv')
+        incremental = self.daily()
+        self.assertEqual(incremental, {
+            ('2025-12-01', self.course.pk): (30, 1),
+            ('2025-12-02', self.course.pk): (60, 1),
+        })
+        DailyStudyStat.objects.all().delete()
+        call_command('rebuild_study_stats', stdout=StringIO())
+        self.assertEqual(self.daily(), incremental)
+
+
+class MaterialStudyStatsTests(TestCase):
+    '''学习资料列表通过with_study_stats()一次查询带出统计'''
+
+    def setUp(self):
+        self.course = Course.objects.create(name='Python基础')
+        self.start = timezone.make_aware(datetime(2025, 12, 1, 9, 0))
+        for i in range(5):
+            material = StudyMaterial.objects.create(course=self.course, name=f'资料{i}')
+            make_session(self.course, self.start + timedelta(days=i), 30, material=material)
+            make_session(self.course, self.start + timedelta(days=i + 1), 15, material=material)
+
+    def test_with_study_stats(self):
+        material = StudyMaterial.objects.with_study_stats().get(name='资料0')
+        self.assertAlmostEqual(material.total_minutes, 45)
+        self.assertEqual(material.session_count, 2)
+        self.assertEqual(material.last_studied, self.start + timedelta(days=1))
+        self.assertAlmostEqual(material.get_total_study_time(), 45)
+
+    def test_material_list_query_count(self):
+        # 资料列表 + 课程下拉框，查询数与资料数量无关
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('material_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '45.0 min', count=5)
+
+
+class KeysetPaginationTests(TestCase):
+    '''列表视图键集分页：相同开始时间的记录也不会重复或遗漏'''
+
+    def setUp(self):
+        self.course = Course.objects.create(name='数据结构')
+        other = Course.objects.create(name='操作系统')
+        start = timezone.make_aware(datetime(2025, 12, 1, 9, 0))
+        for i in range(7):
+            # 每两条记录开始时间相同，检验 id 作为次级排序键
+            make_session(self.course, start + timedelta(hours=i // 2), 30)
+            make_session(other, start, 30)
+
+    def walk(self, params):
+        seen, pages, query = [], 0, params
+        while True:
+            response = self.client.get(reverse('session_list') + '?' + query)
+            page = response.context['page']
+            seen.extend(s.pk for s in page.object_list)
+            pages += 1
+            if not page.has_next:
+                return seen, pages, page
+            query = page.next_query
+
+    def test_walk_pages_with_filter(self):
+        seen, pages, last_page = self.walk(f'course={self.course.pk}&page_size=3')
+        expected = list(
+            StudySession.objects.filter(course=self.course).order_by('-start_time', '-id').values_list('pk', flat=True)
+        )
+        self.assertEqual(seen, expected)
+        self.assertEqual(pages, 3)
+        # 从最后一页向前翻，得到上一页的内容
+        response = self.client.get(reverse('session_list') + '?' + last_page.previous_query)
+        self.assertEqual([s.pk for s in response.context['page'].object_list], expected[3:6])
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        response = self.client.get(reverse('session_list'), {'cursor': 'bogus', 'page_size': 2})
+        self.assertEqual(len(response.context['page'].object_list), 2)
+        self.assertFalse(response.context['page'].has_previous)
+
+
+class SessionImportTests(TestCase):
+    '''批量导入：分批插入、逐行报错、同步课程汇总'''
+
+    def setUp(self):
+        self.course = Course.objects.create(name='Python基础')
+        StudyMaterial.objects.create(course=self.course, name='官方教程')
+
+    def test_import_csv_with_errors(self):
+        data = (
+            'course,start_time,end_time,material,notes\n'
+            'Python基础,2025-12-01 09:00,2025-12-01 10:30,官方教程,第一章\n'
+            'Python基础,2025-12-02 09:00,2025-12-02 09:45,,\n'
+            '不存在的课程,2025-12-02 09:00,2025-12-02 09:45,,\n'
+            'Python基础,2025-12-03 10:00,2025-12-03 09:00,,\n'
+            'Python基础,2025-12-04 09:00,2025-12-04 09:30,,\n'
+        )
+        report = import_sessions(StringIO(data), 'csv', batch_size=2)
+        self.assertEqual((report.rows, report.created, report.error_count), (5, 3, 2))
+        self.assertEqual([line for line, _ in report.errors], [4, 5])
+        stat = CourseStudyStat.objects.get(course=self.course)
+        self.assertEqual(stat.session_count, 3)
+        self.assertAlmostEqual(stat.total_minutes, 90 + 45 + 30)
+        self.assertEqual(StudySession.objects.filter(material__name='官方教程').count(), 1)
+
+    def test_import_view_jsonl(self):
+        data = (
+            '{"course": "Python基础", "start_time": "2025-12-01 09:00", "end_time": "2025-12-01 10:00"}\n'
+            'not json\n'
+        )
+        upload = SimpleUploadedFile('sessions.jsonl', data.encode('utf-8'))
+        response = self.client.post(reverse('session_import'), {'file': upload})
+        self.assertEqual(response.context['report'].created, 1)
+        self.assertEqual(response.context['report'].errors[0][0], 2)
+
+
+@override_settings(EXPORT_SETTLE_SECONDS=0)
+class ExportTests(TestCase):
+    '''流式导出：CSV/JSONL、gzip、since水位线'''
+
+    def setUp(self):
+        self.course = Course.objects.create(name='Python基础')
+        start = timezone.make_aware(datetime(2025, 12, 1, 9, 0))
+        self.sessions = [make_session(self.course, start + timedelta(days=i), 30) for i in range(3)]
+
+    def test_csv_export_in_chunks_with_watermark(self):
+        stats = ExportStats()
+        body = b''.join(export_stream('sessions', 'csv', chunk_size=2, stats=stats)).decode('utf-8')
+        lines = body.strip().splitlines()
+        self.assertTrue(lines[0].startswith('id,course_id,course_name'))
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(stats.rows, 3)
+        # 水位线之后没有新数据
+        self.assertEqual(b''.join(export_stream('sessions', 'jsonl', since=stats.watermark)), b'')
+
+    def test_export_view_gzip_jsonl_since(self):
+        StudySession.objects.filter(pk=self.sessions[0].pk).update(updated_at=parse_since('2025-01-01').updated_at)
+        response = self.client.get(reverse('export_data', args=['sessions']),
+                                   {'format': 'jsonl', 'gzip': '1', 'since': '2025-06-01'})
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        rows = [json.loads(line) for line in gzip.decompress(b''.join(response.streaming_content)).splitlines()]
+        self.assertEqual([r['id'] for r in rows], [s.pk for s in self.sessions[1:]])
+        self.assertEqual(rows[0]['course_name'], 'Python基础')
+        self.assertEqual(self.client.get(reverse('export_data', args=['users'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('export_data', args=['sessions']), {'since': 'x'}).status_code, 400)
+
+    def test_watermark_exports_updated_rows_and_ties(self):
+        response = self.client.get(reverse('export_data', args=['sessions']), {'format': 'jsonl'})
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 3)
+        watermark = response['X-Export-Watermark']
+        self.assertEqual(parse_since(watermark), (StudySession.objects.get(pk=self.sessions[-1].pk).updated_at,
+                                                  self.sessions[-1].pk))
+        # 修改已导出的记录后会再次导出
+        session = self.sessions[0]
+        session.notes = '补充笔记'
+        session.save()
+        response = self.client.get(reverse('export_data', args=['sessions']), {'format': 'jsonl', 'since': watermark})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([(r['id'], r['notes']) for r in rows], [(session.pk, '补充笔记')])
+        # 更新时间相同的行按主键接着导出
+        same = timezone.now() - timedelta(minutes=1)
+        StudySession.objects.update(updated_at=same)
+        rows = b''.join(export_stream('sessions', 'jsonl', since=Watermark(same, self.sessions[0].pk))).splitlines()
+        self.assertEqual([json.loads(r)['id'] for r in rows], [s.pk for s in self.sessions[1:]])
+
+    def test_recent_writes_wait_for_next_export(self):
+        StudySession.objects.update(updated_at=timezone.now() - timedelta(minutes=5))
+        stats = ExportStats()
+        b''.join(export_stream('sessions', 'csv', stats=stats))
+        make_session(self.course, timezone.now(), 20)
+        with override_settings(EXPORT_SETTLE_SECONDS=60):
+            # 刚写入的行可能还没提交，不导出，水位线不前移
+            again = ExportStats()
+            self.assertEqual(b''.join(export_stream('sessions', 'jsonl', since=stats.watermark, stats=again)), b'')
+            self.assertEqual(again.watermark, stats.watermark)
+        self.assertEqual(len(b''.join(export_stream('sessions', 'jsonl', since=stats.watermark)).splitlines()), 1)
+
+
+class DashboardChartCacheTests(TestCase):
+    '''仪表板图表按数据版本缓存'''
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        override = override_settings(CHART_CACHE_DIR=tmp.name, CHART_RENDER_WORKERS=0)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.course = Course.objects.create(name='高等数学')
+        make_session(self.course, timezone.now() - timedelta(hours=2), 60)
+
+    def test_cached_until_data_changes(self):
+        with mock.patch('tracker.utils.chart_render.render_trend', wraps=chart_render.render_trend) as render:
+            first = self.client.get(reverse('dashboard')).context['trend_chart']
+            second = self.client.get(reverse('dashboard')).context['trend_chart']
+            self.assertEqual(first, second)
+            self.assertEqual(render.call_count, 1)
+
+            version = DataVersion.current(DataVersion.STUDY).version
+            make_session(self.course, timezone.now() - timedelta(hours=1), 30)
+            self.assertEqual(DataVersion.current(DataVersion.STUDY).version, version + 1)
+            third = self.client.get(reverse('dashboard')).context['trend_chart']
+            self.assertNotEqual(first, third)
+            self.assertEqual(render.call_count, 2)
+
+        response = self.client.get(third)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(self.client.get(reverse('dashboard_chart', args=['trend-0123456789abcdef.png'])).status_code, 404)
+
+    def test_render_error_falls_back_to_no_chart(self):
+        with mock.patch('tracker.utils.chart_render.render_trend', side_effect=ValueError('bad data')), \
+                self.assertLogs('tracker.charts', 'ERROR'):
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.context['trend_chart'])
+        self.assertIsNotNone(response.context['distribution_chart'])
+
+    def test_reset_database_does_not_reuse_charts(self):
+        first = self.client.get(reverse('dashboard')).context['trend_chart']
+        # 数据库重建后版本号从头计数，同一版本号不能命中旧数据库留下的图片
+        version = DataVersion.current(DataVersion.STUDY)
+        DataVersion.objects.filter(pk=version.pk).update(updated_at=version.updated_at + timedelta(seconds=1))
+        self.assertNotEqual(self.client.get(reverse('dashboard')).context['trend_chart'], first)
+
+
+class ChartRenderPoolTests(TestCase):
+    '''渲染进程池：有界队列、超时后仍写入缓存'''
+
+    def test_queue_timeout_and_late_write(self):
+        pool = chart_render.ChartRenderPool(workers=1, queue_size=1, timeout=0.001)
+        self.addCleanup(pool.shutdown)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, 'trend.png')
+        points = [(datetime(2025, 12, 1).date(), 1.5), (datetime(2025, 12, 2).date(), 0.5)]
+        # 工作进程启动需要时间，首个任务必然超时；唯一的排队名额被占用，第二个任务直接拒绝
+        with self.assertRaises(chart_render.TimeoutError):
+            pool.render('trend', points, path)
+        with self.assertRaises(chart_render.ChartQueueFull):
+            pool.render('distribution', [('高等数学', 1.0)])
+        deadline = time.monotonic() + 60
+        while not os.path.exists(path) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(8), b'\x89PNG\r\n\x1a\n')
+        pool.timeout = 30
+        self.assertTrue(pool.render('distribution', [('高等数学', 1.0)]).startswith(b'\x89PNG'))
+
+
+class BatchForgettingCurveTests(SimpleTestCase):
+    '''向量化复习计划与逐条函数结果一致'''
+
+    def test_batch_matches_scalar(self):
+        dates = [datetime(2025, 1, 1, 8, 30) + timedelta(days=d, minutes=d * 7) for d in range(20)]
+        counts = list(range(20))
+        batch = fc.batch_calculate_review_dates(dates, counts)
+        next_dates = fc.batch_next_review_dates(dates, counts)
+        schedule_dates, schedule_counts = fc.batch_generate_review_schedule(dates, counts, max_reviews=3)
+        for i, (date, count) in enumerate(zip(dates, counts)):
+            self.assertEqual(batch[i].astype(object).tolist(), fc.calculate_review_dates(date, count))
+            self.assertEqual(next_dates[i].astype(object), fc.get_next_review_date(date, count))
+            self.assertEqual(
+                list(zip(schedule_dates[i].astype(object), schedule_counts[i].tolist())),
+                fc.generate_review_schedule(date, count, max_reviews=3)
+            )
+
+    def test_batch_retention_matches_scalar(self):
+        days = list(range(-2, 400, 3)) * 3
+        counts = [0] * 134 + [1] * 134 + [6] * 134
+        batch = fc.batch_retention_rate(days, counts).tolist()
+        self.assertEqual(batch, [fc.get_retention_rate(d, c) for d, c in zip(days, counts)])
+
+    def test_fit_recovers_decay_curves(self):
+        truth = [fc.DecayCurve(4.0, 2.0), fc.DecayCurve(20.0, 1.5)]
+        rows = [
+            (group, days, count, 1000, round(1000 * curve.retention(days, count)))
+            for group, curve in enumerate(truth) for days in (1, 3, 7, 15, 30) for count in range(4)
+        ]
+        stability, growth, samples = fc.fit_decay_curves(*zip(*rows), group_count=3)
+        for i, curve in enumerate(truth):
+            self.assertAlmostEqual(stability[i], curve.stability, delta=curve.stability * 0.1)
+            self.assertAlmostEqual(growth[i], curve.growth, delta=0.05)
+        self.assertEqual(samples.tolist(), [20000, 20000, 0])
+        retention = fc.batch_decay_retention([0, 5, 40], [0, 2, 9], 4.0, 2.0).tolist()
+        self.assertEqual(retention, [truth[0].retention(d, c) for d, c in [(0, 0), (5, 2), (40, 9)]])
+
+
+
+class ReviewSimulationTests(SimpleTestCase):
+    '''复习负载模拟：到期数与逐条计算一致，积压守恒'''
+
+    def test_review_load_matches_scalar(self):
+        studied = [[2, 0, 1] + [0] * 57 + [1] * 40, [0] * 99 + [3]]
+        load = review_simulation.review_load(studied).tolist()
+        base = datetime(2025, 1, 1)
+        for n, row in enumerate(studied):
+            expected = [0] * 100
+            for day, items in enumerate(row):
+                count = 0
+                while (due := (fc.get_next_review_date(base + timedelta(days=day), count) - base).days) < 100:
+                    expected[due] += items
+                    count += 1
+            self.assertEqual(load[n], expected)
+        # 只复习两次（学习后第1、3天）：前3天的3项各2次，第60~98天的1项各有第1次、第60~96天的还有第2次
+        self.assertEqual(review_simulation.review_load(studied, max_review_count=2).sum(), 3 * 2 + 39 + 37)
+
+    def test_capacity_backlog(self):
+        result = review_simulation.simulate_reviews(500, 120, [2, 2, 2, 2, 2, 0, 0], capacity=4, chunk_size=128)
+        self.assertEqual(int(result.completed.sum() + result.backlog[-1]), int(result.due.sum()))
+        self.assertTrue((result.completed <= 500 * 4).all())
+        self.assertEqual(len(result.learner_peak), 500)
+        self.assertEqual(result.summary()['peak_days'][0][1], int(result.due.max()))
+
+class GenerateReviewsTests(TestCase):
+    '''批量生成复习计划：与视图规则一致、可重复执行、可断点续跑'''
+
+    def setUp(self):
+        self.course = Course.objects.create(name='高等数学')
+        self.other = Course.objects.create(name='线性代数')
+        self.material = StudyMaterial.objects.create(course=self.course, name='教材')
+        now = timezone.now()
+        make_session(self.course, now - timedelta(days=3), 30, material=self.material)
+        make_session(self.course, now - timedelta(days=1), 30, material=self.material)
+        make_session(self.other, now - timedelta(hours=5), 45)
+        # 已完成两次复习
+        for day in (1, 2):
+            ReviewSchedule.objects.create(course=self.course, material=self.material,
+                                          review_date=timezone.localdate() - timedelta(days=day), completed=True)
+
+    def plans(self):
+        return sorted(ReviewSchedule.objects.filter(completed=False).values_list(
+            'course_id', 'material_id', 'review_date', 'review_count'))
+
+    def test_matches_view_and_is_idempotent(self):
+        self.client.post(reverse('review_auto_generate'), {'course_id': self.course.pk, 'material_id': self.material.pk})
+        self.client.post(reverse('review_auto_generate'), {'course_id': self.other.pk})
+        expected = self.plans()
+        self.assertEqual(len(expected), 6)
+        ReviewSchedule.objects.filter(completed=False).delete()
+
+        report = generate_reviews(chunk_size=1)
+        self.assertEqual((report.items, report.created, report.chunks), (2, 6, 2))
+        self.assertEqual(self.plans(), expected)
+        self.assertEqual(generate_reviews().created, 0)
+
+    def test_resume_after_position(self):
+        report = generate_reviews(after=parse_key(f'{self.course.pk}:{self.material.pk}'))
+        self.assertEqual(report.items, 1)
+        self.assertEqual({c for c, _, _, _ in self.plans()}, {self.other.pk})
+        out = StringIO()
+        call_command('generate_reviews', '--dry-run', stdout=out)
+        self.assertIn('新建复习计划 3 条', out.getvalue())
+
+    def test_study_date_is_local_day(self):
+        course = Course.objects.create(name='大学英语')
+        day = timezone.localdate() - timedelta(days=2)
+        # 本地零点半（UTC 仍是前一天）的学习按本地日期安排复习
+        make_session(course, timezone.make_aware(datetime.combine(day, datetime.min.time()) + timedelta(minutes=30)), 30)
+        self.client.post(reverse('review_auto_generate'), {'course_id': course.pk})
+        from_view = sorted(ReviewSchedule.objects.filter(course=course).values_list('review_date', 'last_reviewed'))
+        self.assertEqual(from_view[0], (day + timedelta(days=1), day))
+        ReviewSchedule.objects.filter(course=course).delete()
+        generate_reviews()
+        self.assertEqual(
+            sorted(ReviewSchedule.objects.filter(course=course).values_list('review_date', 'last_reviewed')), from_view
+        )
+
+
+
+
+@override_settings(REVIEW_LOAD_LEVELING=True, REVIEW_LOAD_FUZZ_DAYS=2)
+class ReviewLoadLevelingTests(TestCase):
+    '''负载均衡：在浮动窗口内挑待复习计划最少的一天'''
+
+    def setUp(self):
+        get_day_load_index().clear()
+        self.course = Course.objects.create(name='高等数学')
+        self.target = date(2026, 3, 16)
+
+    def test_place_picks_least_loaded_day(self):
+        for offset in (-1, 0, 1):
+            ReviewSchedule.objects.create(course=self.course, material=StudyMaterial.objects.create(
+                course=self.course, name='资料'), review_date=self.target + timedelta(days=offset))
+        index = DayLoadIndex()
+        # 间隔15天，窗口 min(2, 15 // 4) = 2；空闲的两天中取较早的，确认插入后才计数
+        self.assertEqual(index.place(self.target, 15), (self.target - timedelta(days=2), False))
+        self.assertEqual(index.place(self.target, 15), (self.target - timedelta(days=2), False))
+        index.add(self.target - timedelta(days=2))
+        self.assertEqual(index.place(self.target, 15), (self.target + timedelta(days=2), False))
+        index.add(self.target + timedelta(days=2))
+        self.assertEqual(index.place(self.target, 3), (self.target, False))  # 短间隔不挪动
+        index.add(self.target)
+        self.assertEqual(index.place(self.target, 15, {self.target + timedelta(days=1)}),
+                         (self.target + timedelta(days=1), True))
+        # 目标日已有2条，之后只剩第+1天可选（第+2天被同一学习项已完成的复习占用）
+        self.assertEqual(index.place(self.target, 15, earliest=self.target, blocked={self.target + timedelta(days=2)}),
+                         (self.target + timedelta(days=1), False))
+        # 窗口内没有可用日期时顺延到第一个空闲日期，不返回被占用或早于 earliest 的日期
+        self.assertEqual(index.place(self.target, 3, blocked={self.target, self.target + timedelta(days=1)}),
+                         (self.target + timedelta(days=2), False))
+        self.assertEqual(index.place(self.target, 3, earliest=self.target + timedelta(days=3)),
+                         (self.target + timedelta(days=3), False))
+        with self.assertNumQueries(0):
+            index.place(self.target + timedelta(days=10), 30)
+
+    def test_bulk_generation_spreads_and_is_idempotent(self):
+        studied = timezone.now() - timedelta(hours=2)
+        for i in range(6):
+            make_session(self.course, studied, 30, material=StudyMaterial.objects.create(course=self.course, name=f'资料{i}'))
+        self.assertEqual(generate_reviews(level_load=True).created, 18)
+        self.assertEqual(generate_reviews(level_load=True).created, 0)
+        # 第1、3天的复习不挪动；第7天的复习（窗口1天）分散到第6~8天
+        study_day = timezone.localdate(studied)
+        per_day = {(day - study_day).days: n for day, n in ReviewSchedule.objects.values_list('review_date').annotate(
+            n=Count('id'))}
+        self.assertEqual(per_day, {1: 6, 3: 6, 6: 2, 7: 2, 8: 2})
+
+        self.client.post(reverse('review_auto_generate'), {'course_id': self.course.pk})
+        self.assertEqual(ReviewSchedule.objects.filter(material__isnull=True).count(), 3)
+
+    def test_shared_counts_follow_completion_and_deletion(self):
+        index = get_day_load_index()
+        today = timezone.localdate()
+        reviews = [
+            ReviewSchedule.objects.create(course=self.course, material=StudyMaterial.objects.create(
+                course=self.course, name=f'资料{i}'), review_date=today)
+            for i in range(4)
+        ]
+        self.assertEqual(index.load(today), 4)
+        # 手动新建的计划同样计入
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('review_create'), {'course': self.course.pk, 'review_date': today})
+        self.assertEqual(index.load(today), 5)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse('review_complete', args=[reviews[0].pk]))
+        next_review = ReviewSchedule.objects.get(material=reviews[0].material, completed=False)
+        self.assertEqual((index.load(today), index.load(next_review.review_date)), (4, 1))
+        with self.captureOnCommitCallbacks(execute=True):
+            reviews[1].delete()
+            ReviewSchedule.objects.filter(pk=reviews[2].pk).delete()
+        self.assertEqual(index.load(today), 2)
+        # 随课程级联删除的计划同样扣减
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.delete()
+        self.assertEqual((index.load(today), index.load(next_review.review_date)), (0, 0))
+
+class ReviewUniqueTests(TestCase):
+    '''复习计划唯一约束：同一课程/资料同一天只有一条'''
+
+    def setUp(self):
+        self.course = Course.objects.create(name='高等数学')
+        self.material = StudyMaterial.objects.create(course=self.course, name='教材')
+        self.day = timezone.localdate() + timedelta(days=1)
+
+    def test_null_material_is_unique_per_day(self):
+        ReviewSchedule.objects.create(course=self.course, review_date=self.day)
+        ReviewSchedule.objects.create(course=self.course, material=self.material, review_date=self.day)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ReviewSchedule.objects.create(course=self.course, review_date=self.day)
+        response = self.client.post(reverse('review_create'), {'course': self.course.pk, 'review_date': self.day})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(ReviewSchedule.objects.count(), 2)
+
+    def test_complete_ignores_existing_next_review(self):
+        review = ReviewSchedule.objects.create(course=self.course, material=self.material, review_date=self.day)
+        # 完成第1次复习后，下次复习在学习日期（创建时间所在的本地日期）后第3天
+        next_day = timezone.localdate(review.created_at) + timedelta(days=3)
+        ReviewSchedule.objects.create(course=self.course, material=self.material, review_date=next_day)
+        response = self.client.get(reverse('review_complete', args=[review.pk]))
+        self.assertRedirects(response, reverse('review_list'))
+        self.assertEqual(ReviewSchedule.objects.filter(review_date=next_day).count(), 1)
+        self.assertEqual(ReviewSchedule.objects.count(), 2)
+
+    def test_delete_material_drops_conflicting_reviews(self):
+        ReviewSchedule.objects.create(course=self.course, review_date=self.day)
+        ReviewSchedule.objects.create(course=self.course, material=self.material, review_date=self.day)
+        ReviewSchedule.objects.create(course=self.course, material=self.material,
+                                      review_date=self.day + timedelta(days=1))
+        StudyMaterial.objects.filter(pk=self.material.pk).delete()
+        self.assertEqual(
+            sorted(ReviewSchedule.objects.values_list('material_id', 'review_date')),
+            [(None, self.day), (None, self.day + timedelta(days=1))]
+        )
+
+
+class SchedulerTests(SimpleTestCase):
+    '''复习调度引擎'''
+
+    def test_fixed_matches_interval_table(self):
+        scheduler = schedulers.get_scheduler('fixed')
+        study = datetime(2025, 3, 1, 9, 30)
+        state = schedulers.ReviewState()
+        for count in range(1, 9):
+            state, next_date = scheduler.review(state, schedulers.GRADE_AGAIN, date(2025, 3, 5), study)
+            self.assertEqual(state.review_count, count)
+            self.assertEqual(next_date, fc.get_next_review_date(study, count).date())
+
+    def test_fsrs_adapts_to_grade(self):
+        scheduler = schedulers.get_scheduler('fsrs')
+        today = date(2025, 3, 1)
+        intervals = {}
+        for grade in (1, 2, 3, 4):
+            state, next_date = scheduler.review(schedulers.ReviewState(), grade, today)
+            self.assertEqual(state.last_reviewed, today)
+            intervals[grade] = (next_date - today).days
+        self.assertEqual(sorted(intervals.values()), [intervals[g] for g in (1, 2, 3, 4)])
+
+        # 按时复习并记住：稳定性增长，间隔变长；忘记：稳定性下降、难度上升
+        state, due = scheduler.review(schedulers.ReviewState(), schedulers.GRADE_GOOD, today)
+        good, good_due = scheduler.review(state, schedulers.GRADE_GOOD, due)
+        self.assertGreater(good.stability, state.stability)
+        self.assertGreater((good_due - due).days, (due - today).days)
+        again, _ = scheduler.review(state, schedulers.GRADE_AGAIN, due)
+        self.assertLess(again.stability, state.stability)
+        self.assertGreater(again.difficulty, state.difficulty)
+        self.assertEqual(again.review_count, 2)
+
+    def test_invalid_input(self):
+        self.assertEqual(schedulers.parse_grade(''), schedulers.DEFAULT_GRADE)
+        for value in ('0', '5', 'good'):
+            with self.assertRaises(ValueError):
+                schedulers.parse_grade(value)
+        with self.assertRaises(ValueError):
+            schedulers.get_scheduler('sm3')
+
+
+@override_settings(REVIEW_SCHEDULER='fsrs')
+class ReviewCompleteTests(TestCase):
+    '''完成复习：评分交给调度引擎，记忆状态写入下一条复习计划'''
+
+    def setUp(self):
+        self.course = Course.objects.create(name='高等数学')
+        self.review = ReviewSchedule.objects.create(course=self.course, review_date=timezone.localdate())
+
+    def test_state_is_carried_to_next_review(self):
+        self.client.get(reverse('review_complete', args=[self.review.pk]), {'grade': 4})
+        self.review.refresh_from_db()
+        self.assertEqual((self.review.completed, self.review.grade, self.review.review_count), (True, 4, 1))
+        next_review = ReviewSchedule.objects.get(completed=False)
+        expected, due = schedulers.FSRSScheduler().review(schedulers.ReviewState(), 4, timezone.localdate())
+        self.assertEqual(next_review.memory_state(), expected)
+        self.assertEqual(next_review.review_date, due)
+
+    @override_settings(REVIEW_SCHEDULER='fixed')
+    def test_fixed_interval_counts_from_local_creation_day(self):
+        day = timezone.localdate() - timedelta(days=2)
+        # 本地零点半创建（UTC 仍是前一天）的计划，按本地日期作为学习日期
+        ReviewSchedule.objects.filter(pk=self.review.pk).update(
+            created_at=timezone.make_aware(datetime.combine(day, datetime.min.time()) + timedelta(minutes=30))
+        )
+        self.client.get(reverse('review_complete', args=[self.review.pk]))
+        self.review.refresh_from_db()
+        self.assertEqual(self.review.elapsed_days, 2)
+        self.assertEqual(ReviewSchedule.objects.get(completed=False).review_date, day + timedelta(days=3))
+
+    def test_next_review_skips_completed_day(self):
+        _, due = schedulers.FSRSScheduler().review(schedulers.ReviewState(), 3, timezone.localdate())
+        ReviewSchedule.objects.create(course=self.course, review_date=due, completed=True)
+        response = self.client.get(reverse('review_complete', args=[self.review.pk]), follow=True)
+        # 这一天已有完成的计划，唯一约束会忽略插入，顺延到下一天
+        next_day = due + timedelta(days=1)
+        self.assertEqual(ReviewSchedule.objects.get(completed=False).review_date, next_day)
+        self.assertIn(f'下次复习日期：{next_day}', [str(m) for m in response.context['messages']][0])
+
+    def test_invalid_grade(self):
+        response = self.client.get(reverse('review_complete', args=[self.review.pk]), {'grade': 9}, follow=True)
+        self.assertIn('无效的复习评分', [str(m) for m in response.context['messages']][0])
+        self.review.refresh_from_db()
+        self.assertFalse(self.review.completed)
+
+
+class ReviewQueueTests(TestCase):
+    '''今日复习队列：只含到期计划，按预测保留率从低到高，游标翻页'''
+
+    def setUp(self):
+        self.math = Course.objects.create(name='高等数学')
+        self.python = Course.objects.create(name='Python基础')
+        today = timezone.localdate()
+        # (课程, 复习日期偏移, 上次学习/复习偏移, 复习次数)
+        for course, due, seen, count in [
+            (self.math, 0, -1, 0), (self.math, -2, -10, 0), (self.math, -1, -40, 0), (self.math, 0, -1, 3),
+            (self.python, 0, -3, 1), (self.python, -5, None, 0), (self.python, -1, -10, 0), (self.python, 0, -10, 0),
+        ]:
+            ReviewSchedule.objects.create(
+                course=course, material=StudyMaterial.objects.create(course=course, name='资料'),
+                review_date=today + timedelta(days=due), review_count=count,
+                last_reviewed=today + timedelta(days=seen) if seen is not None else None
+            )
+        ReviewSchedule.objects.create(course=self.math, review_date=today + timedelta(days=1), last_reviewed=today)
+        ReviewSchedule.objects.create(course=self.math, review_date=today - timedelta(days=3), completed=True)
+        self.url = reverse('review_queue_api')
+
+    def expected(self, course_ids=None):
+        today = timezone.localdate()
+        rows = ReviewSchedule.objects.filter(completed=False, review_date__lte=today)
+        if course_ids:
+            rows = rows.filter(course_id__in=course_ids)
+        ranked = [
+            (fc.get_retention_rate((today - (r.last_reviewed or r.review_date)).days, r.review_count),
+             r.last_reviewed or r.review_date, r.review_count, r.review_date, r.pk)
+            for r in rows
+        ]
+        return [row[4] for row in sorted(ranked)]
+
+    def test_ranked_by_retention_with_cursor(self):
+        ids, cursor, pages = [], None, 0
+        while True:
+            params = {'limit': 3}
+            if cursor:
+                params['cursor'] = cursor
+            data = self.client.get(self.url, params).json()
+            self.assertEqual(data['due_count'], 8)
+            ids += [item['id'] for item in data['items']]
+            pages += 1
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(pages, 3)
+        self.assertEqual(ids, self.expected())
+        first = self.client.get(self.url, {'limit': 1}).json()['items'][0]
+        self.assertEqual((first['retention'], first['overdue_days']), (0.2, 1))
+
+    def test_course_filter_and_completion_between_pages(self):
+        data = self.client.get(self.url, {'limit': 2, 'course': self.python.pk}).json()
+        self.assertEqual([item['id'] for item in data['items']], self.expected([self.python.pk])[:2])
+        # 翻页前完成了上一页的计划，游标仍然有效
+        ReviewSchedule.objects.filter(pk__in=[item['id'] for item in data['items']]).update(completed=True)
+        rest = self.client.get(self.url, {'limit': 10, 'course': self.python.pk, 'cursor': data['next_cursor']}).json()
+        self.assertEqual([item['id'] for item in rest['items']], self.expected([self.python.pk]))
+        self.assertEqual(self.client.get(self.url, {'limit': 'x'}).status_code, 400)
+
+class CurveFitTests(TestCase):
+    '''按复习记录拟合课程遗忘曲线：数据足够的课程用拟合参数，其余沿用默认曲线'''
+
+    def setUp(self):
+        self.math = Course.objects.create(name='高等数学')
+        self.python = Course.objects.create(name='Python基础')
+        truth = fc.DecayCurve(4.0, 2.0)
+        base = date(2025, 1, 1)
+        reviews = []
+        for days in (1, 3, 7, 15):
+            for count in range(3):
+                recalled = round(10 * truth.retention(days, count))
+                for i in range(10):
+                    reviews.append(ReviewSchedule(
+                        course=self.math, review_date=base + timedelta(days=len(reviews)), completed=True,
+                        review_count=count + 1, elapsed_days=days, grade=3 if i < recalled else 1
+                    ))
+        reviews += [
+            ReviewSchedule(course=self.python, review_date=base + timedelta(days=i), completed=True, review_count=1,
+                           elapsed_days=2, grade=3)
+            for i in range(5)
+        ]
+        ReviewSchedule.objects.bulk_create(reviews)
+
+    def test_fit_and_fallback(self):
+        out = StringIO()
+        call_command('fit_forgetting_curves', '--min-reviews', '20', stdout=out)
+        self.assertIn('拟合课程 1 门', out.getvalue())
+        curve = get_fitted_curves().get(self.math.pk)
+        self.assertAlmostEqual(curve.stability, 4.0, delta=1.0)
+        self.assertAlmostEqual(curve.growth, 2.0, delta=0.5)
+        self.assertIsNone(get_fitted_curves().get(self.python.pk))
+
+        today = timezone.localdate()
+        for course in (self.math, self.python):
+            ReviewSchedule.objects.create(course=course, review_date=today, last_reviewed=today - timedelta(days=7))
+        items = {item['course_id']: item['retention'] for item in
+                 self.client.get(reverse('review_queue_api')).json()['items']}
+        self.assertEqual(items, {
+            self.math.pk: round(curve.retention(7, 0), 4), self.python.pk: fc.get_retention_rate(7, 0)
+        })
+
+    @override_settings(REVIEW_SCHEDULER='curve')
+    def test_curve_scheduler_uses_fitted_interval(self):
+        fit_forgetting_curves(min_reviews=20)
+        curve = get_fitted_curves().get(self.math.pk)
+        today = timezone.localdate()
+        review = ReviewSchedule.objects.create(course=self.math, review_date=today, last_reviewed=today - timedelta(days=3))
+        self.client.get(reverse('review_complete', args=[review.pk]), {'grade': 3})
+        review.refresh_from_db()
+        self.assertEqual((review.elapsed_days, review.review_count), (3, 1))
+        next_review = ReviewSchedule.objects.get(course=self.math, completed=False)
+        self.assertEqual(next_review.review_date, today + timedelta(days=curve.interval(1, 0.9)))
+
+class StatsApiTests(TestCase):
+    '''统计JSON接口：日期区间、课程筛选、条件请求'''
+
+    def setUp(self):
+        self.math = Course.objects.create(name='高等数学')
+        self.python = Course.objects.create(name='Python基础')
+        make_session(self.math, timezone.make_aware(datetime(2025, 12, 1, 23, 30)), 60)
+        make_session(self.python, timezone.make_aware(datetime(2025, 12, 2, 9, 0)), 30)
+        self.url = reverse('stats_api')
+
+    def test_range_and_course_filter(self):
+        data = self.client.get(self.url, {'start': '2025-12-01', 'end': '2025-12-31'}).json()
+        self.assertEqual([d['date'] for d in data['daily']], ['2025-12-01', '2025-12-02'])
+        self.assertEqual([c['course'] for c in data['distribution']], ['高等数学', 'Python基础'])
+        self.assertEqual(data['range_total'], {'minutes': 90, 'hours': 1.5, 'sessions': 2})
+
+        data = self.client.get(self.url, {'start': '2025-12-02', 'end': '2025-12-02', 'course': self.math.pk}).json()
+        self.assertEqual(data['daily'], [])
+        self.assertEqual(data['total']['minutes'], 60)
+        self.assertEqual(self.client.get(self.url, {'start': '2025-12-05', 'end': '2025-12-01'}).status_code, 400)
+
+    def test_conditional_get(self):
+        params = {'start': '2025-12-01', 'end': '2025-12-31'}
+        response = self.client.get(self.url, params)
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+        self.assertEqual(self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # 其它查询参数对应不同的ETag
+        self.assertEqual(self.client.get(self.url, dict(params, course=self.math.pk), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        make_session(self.math, timezone.make_aware(datetime(2025, 12, 3, 9, 0)), 15)
+        response = self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+def make_pdf(path, pages):
+    '''生成每页一行文字的PDF'''
+    from matplotlib.backends.backend_pdf import PdfPages
+    from matplotlib.figure import Figure
+    with PdfPages(path) as pdf:
+        for text in pages:
+            figure = Figure()
+            figure.text(0.1, 0.5, text)
+            pdf.savefig(figure)
+
+
+class PdfIndexCacheTests(SimpleTestCase):
+    '''PDF向量索引按内容哈希缓存在磁盘上，超出大小预算时按最近使用淘汰'''
+
+    def setUp(self):
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+
+        class CountingEmbeddings(DeterministicFakeEmbedding):
+            calls: int = 0
+
+            def embed_documents(self, texts):
+                self.calls += 1
+                return super().embed_documents(texts)
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        self.embeddings = CountingEmbeddings(size=16)
+
+    def test_index_is_built_once_per_content(self):
+        from .pdf_index import PdfIndexCache, load_pdf_index
+        pdf = os.path.join(self.tmp, 'a.pdf')
+        make_pdf(pdf, ['matrix determinant', 'eigenvalue basics'])
+        with override_settings(PDF_INDEX_CACHE_DIR=os.path.join(self.tmp, 'index'),
+                               EMBEDDING_CACHE_PATH=os.path.join(self.tmp, 'embeddings.sqlite3')):
+            first = load_pdf_index(pdf, self.embeddings)
+            copy = os.path.join(self.tmp, 'copy.pdf')
+            shutil.copy(pdf, copy)
+            second = load_pdf_index(copy, self.embeddings)
+        self.assertIs(first, second)
+        self.assertEqual(self.embeddings.calls, 1)
+        # 新进程（新的缓存对象）直接从磁盘读取
+        entries = PdfIndexCache(os.path.join(self.tmp, 'index')).entries()
+        self.assertEqual(len(entries), 1)
+        reloaded = PdfIndexCache(os.path.join(self.tmp, 'index')).load(entries[0][0].name, self.embeddings)
+        self.assertEqual(
+            [d.page_content for d in reloaded.similarity_search('eigenvalue basics', k=2)],
+            [d.page_content for d in first.similarity_search('eigenvalue basics', k=2)]
+        )
+        self.assertEqual(self.embeddings.calls, 1)
+
+    def test_streaming_build_adds_batches_incrementally(self):
+        from .pdf_index import build_pdf_index
+        pdf = os.path.join(self.tmp, 'book.pdf')
+        make_pdf(pdf, [f'chapter {i} topic{i}' for i in range(7)])
+        reports = []
+        with override_settings(EMBEDDING_CACHE_PATH=os.path.join(self.tmp, 'embeddings.sqlite3')):
+            store, stats = build_pdf_index(pdf, self.embeddings, reports.append, batch_size=3)
+            whole, _ = build_pdf_index(pdf, self.embeddings, batch_size=100)
+        # 每批一次嵌入请求，逐批追加到同一个索引
+        self.assertEqual((self.embeddings.calls, stats.texts, store.index.ntotal), (3, 7, 7))
+        self.assertEqual([r.chunks_embedded for r in reports if r.chunks_embedded], [3, 6, 7, 7])
+        self.assertTrue(all(r.chunks_embedded <= r.chunks_total for r in reports))
+        self.assertEqual(reports[-1][:2], (7, 7))
+        self.assertEqual(
+            [d.page_content for d in store.similarity_search('chapter 5 topic5', k=3)],
+            [d.page_content for d in whole.similarity_search('chapter 5 topic5', k=3)]
+        )
+
+    def test_lru_eviction_under_size_budget(self):
+        from langchain_community.vectorstores import FAISS
+        from .pdf_index import PdfIndexCache
+
+        def build(text):
+            return lambda: FAISS.from_texts([text] * 50, self.embeddings)
+
+        cache = PdfIndexCache(self.tmp, max_bytes=10 ** 9, memory_entries=0)
+        for i, key in enumerate(['a', 'b']):
+            cache.get_or_build(key, self.embeddings, build(key))
+            os.utime(cache.entry_path(key), (1000 + i, 1000 + i))
+        size = cache.entries()[0][1]
+        cache.max_bytes = size * 2 + size // 2
+        cache.load('a', self.embeddings)  # a 变为最近使用
+        cache.get_or_build('c', self.embeddings, build('c'))
+        self.assertEqual(sorted(path.name for path, _, _ in cache.entries()), ['a', 'c'])
+        self.assertEqual((cache.hits, cache.misses), (0, 3))
+
+
+class EmbeddingCacheTests(SimpleTestCase):
+    '''分块嵌入按 (模型, 维度, 文字) 缓存，只有没见过的分块才请求嵌入接口'''
+
+    def setUp(self):
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+
+        class RecordingEmbeddings(DeterministicFakeEmbedding):
+            requests: list = []
+
+            def embed_documents(self, texts):
+                self.requests.append(list(texts))
+                return super().embed_documents(texts)
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        self.embeddings = RecordingEmbeddings(size=8)
+
+    def test_only_unseen_chunks_are_embedded(self):
+        import numpy as np
+        from .embedding_cache import CachedEmbeddings, EmbeddingStore
+        store = EmbeddingStore(os.path.join(self.tmp, 'cache.sqlite3'))
+        cached = CachedEmbeddings(self.embeddings, store)
+        first = cached.embed_documents(['a', 'b', 'a'])
+        second = cached.embed_documents(['b', 'c'])
+        self.assertEqual(self.embeddings.requests, [['a', 'b'], ['c']])
+        self.assertEqual(first[1], second[0])
+        self.assertEqual(first[0], np.float32(self.embeddings.embed_query('a')).tolist())
+        self.assertEqual((cached.stats.texts, cached.stats.hits, cached.stats.requested), (5, 1, 3))
+        # 另一个模型名不共用缓存
+        CachedEmbeddings(self.embeddings, store, model_name='other').embed_documents(['a'])
+        self.assertEqual(self.embeddings.requests[-1], ['a'])
+        self.assertEqual(store.count(), 4)
+
+    def test_pdfs_sharing_pages_reuse_embeddings(self):
+        from .pdf_index import build_pdf_index
+        first, second, same = (os.path.join(self.tmp, name) for name in ('a.pdf', 'b.pdf', 'c.pdf'))
+        make_pdf(first, ['limits', 'derivatives', 'integrals'])
+        make_pdf(second, ['limits', 'derivatives', 'series'])
+        make_pdf(same, ['limits', 'derivatives', 'integrals', 'series'])
+        with override_settings(EMBEDDING_CACHE_PATH=os.path.join(self.tmp, 'embeddings.sqlite3')):
+            _, stats = build_pdf_index(first, self.embeddings)
+            self.assertEqual((stats.hits, stats.api_calls, stats.api_calls_saved), (0, 1, 0))
+            _, stats = build_pdf_index(second, self.embeddings)
+            self.assertEqual((stats.texts, stats.hits, stats.requested), (3, 2, 1))
+            store, stats = build_pdf_index(same, self.embeddings)
+            self.assertEqual((stats.hit_ratio, stats.api_calls, stats.api_calls_saved), (1.0, 0, 1))
+        self.assertEqual(self.embeddings.requests[1:], [['series']])
+        self.assertEqual(store.similarity_search('series', k=1)[0].page_content, 'series')
+
+
+class PdfIngestionTests(TestCase):
+    '''上传PDF后在后台解析，页面轮询进度，提问复用建好的索引'''
+
+    def setUp(self):
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        override = override_settings(
+            PDF_INGEST_WORKERS=0, PDF_INGEST_CHAT_WAIT=0, PDF_INDEX_CACHE_DIR=os.path.join(self.tmp, 'index'),
+            EMBEDDING_CACHE_PATH=os.path.join(self.tmp, 'embeddings.sqlite3'),
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        patcher = mock.patch('tracker.llm.get_embeddings', return_value=DeterministicFakeEmbedding(size=8))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pdf = os.path.join(self.tmp, 'book.pdf')
+        make_pdf(self.pdf, [f'chapter {i}' for i in range(12)])
+
+    def upload(self):
+        with open(self.pdf, 'rb') as f:
+            upload = SimpleUploadedFile('book.pdf', f.read(), content_type='application/pdf')
+        data = self.client.post(reverse('agent_upload'), {'pdf_file': upload}).json()
+        self.addCleanup(os.remove, self.client.session['pdf_file_path'])
+        return data
+
+    def test_upload_ingests_and_reports_progress(self):
+        from .pdf_index import get_pdf_index_cache, index_key, pdf_digest
+        data = self.upload()
+        self.assertEqual(data['ingestion']['status'], PdfIngestion.DONE)
+        status = self.client.get(data['progress_url']).json()
+        self.assertEqual(
+            (status['progress'], status['pages_done'], status['pages_total'], status['chunks_embedded']), (1.0, 12, 12, 12)
+        )
+        self.assertTrue(get_pdf_index_cache().contains(index_key(pdf_digest(self.pdf))))
+        # 再次上传同一份PDF（内容相同）复用已完成的任务，不重新解析
+        with mock.patch('tracker.pdf_ingest.run_ingestion') as run:
+            again = self.upload()
+        run.assert_not_called()
+        self.assertEqual(again['ingestion']['id'], data['ingestion']['id'])
+        self.assertEqual(PdfIngestion.objects.count(), 1)
+
+    def test_progress_and_eta_while_running(self):
+        from .pdf_index import index_key, pdf_digest
+        ingestion = PdfIngestion.objects.create(
+            key=index_key(pdf_digest(self.pdf)), file_path=self.pdf, status=PdfIngestion.RUNNING,
+            started_at=timezone.now() - timedelta(seconds=30), pages_done=8, pages_total=10,
+            chunks_embedded=40, chunks_total=50,
+        )
+        data = self.client.get(reverse('pdf_ingestion_status', args=[ingestion.pk])).json()
+        self.assertAlmostEqual(data['progress'], 0.64)
+        self.assertAlmostEqual(data['eta_seconds'], 30 * 0.36 / 0.64, delta=0.5)
+        # 解析中提问：不等待、不当场建索引
+        from .views import simple_agent
+        with mock.patch('tracker.views.get_chat_model'), mock.patch('tracker.views.get_api_key'):
+            answer = simple_agent('这份PDF的第一章讲了什么内容', self.pdf)
+        self.assertIn('PDF正在后台解析（已完成64%）', answer)
+        # 超过 STALE_SECONDS 没有更新视为中断，重新上传时重新开始
+        PdfIngestion.objects.filter(pk=ingestion.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(self.upload()['ingestion']['status'], PdfIngestion.DONE)
+
+    def test_queued_ingestion_is_kept_alive_by_heartbeat(self):
+        from . import pdf_ingest
+        from .pdf_index import index_key, pdf_digest
+        # 排在别的任务后面已超过 STALE_SECONDS，一直没有进度更新
+        ingestion = PdfIngestion.objects.create(key=index_key(pdf_digest(self.pdf)), file_path=self.pdf)
+        PdfIngestion.objects.filter(pk=ingestion.pk).update(updated_at=timezone.now() - timedelta(seconds=200))
+        ingestion.refresh_from_db()
+        self.assertFalse(pdf_ingest.is_active(ingestion))
+        with mock.patch.object(pdf_ingest, '_held', {ingestion.pk}):
+            self.assertEqual(pdf_ingest.heartbeat(), 1)
+        ingestion.refresh_from_db()
+        self.assertTrue(pdf_ingest.is_active(ingestion))
+        # 重新上传不会再提交一次任务
+        with mock.patch('tracker.pdf_ingest._submit') as submit:
+            data = self.upload()
+        submit.assert_not_called()
+        self.assertEqual((data['ingestion']['id'], data['ingestion']['status']), (ingestion.pk, PdfIngestion.PENDING))
+        # 不在本进程中的任务（如进程已重启）不刷新
+        self.assertEqual(pdf_ingest.heartbeat(), 0)
+
+    def test_failed_ingestion_is_reported(self):
+        with mock.patch('tracker.pdf_ingest.build_pdf_index', side_effect=ValueError('PDF文本提取失败')), \
+                self.assertLogs('tracker.pdf_ingest', 'ERROR'):
+            data = self.upload()
+        self.assertEqual((data['ingestion']['status'], data['ingestion']['error']), ('failed', 'PDF文本提取失败'))
+        self.assertEqual(self.upload()['ingestion']['status'], PdfIngestion.DONE)
+
+
+class AgentChatStreamTests(TestCase):
+    '''流式聊天：逐token推送，推送结束后写入对话历史'''
+
+    async def chat(self, question, model=None, api_key=None):
+        with mock.patch('tracker.views.get_chat_model', return_value=model), \
+                mock.patch('tracker.views.get_api_key', **(api_key or {})):
+            response = await self.async_client.post(reverse('agent_chat_stream'), {'question': question})
+            self.assertEqual(response['Content-Type'], 'text/event-stream; charset=utf-8')
+            body = ''.join([chunk.decode() async for chunk in response.streaming_content])
+        events = []
+        for block in body.strip().split('\n\n'):
+            event, data = block.split('\n')
+            events.append((event[len('event: '):], json.loads(data[len('data: '):])))
+        return events
+
+    async def history(self):
+        from django.contrib.sessions.backends.db import SessionStore
+        session = SessionStore(self.async_client.cookies[settings.SESSION_COOKIE_NAME].value)
+        return await sync_to_async(lambda: session.get('chat_history'))()
+
+    async def test_streams_tokens_then_saves_history(self):
+        from langchain_core.language_models import GenericFakeChatModel
+        from langchain_core.messages import AIMessage
+        answer = '遗忘曲线 描述了 记忆 随时间 衰减的规律'
+        model = GenericFakeChatModel(messages=iter([AIMessage(content=answer)]))
+        events = await self.chat('什么是遗忘曲线', model)
+        tokens = [data['text'] for event, data in events if event == 'token']
+        self.assertGreater(len(tokens), 1)
+        self.assertEqual(''.join(tokens), answer)
+        self.assertEqual(events[-1], ('done', {'answer': answer}))
+        self.assertEqual(await self.history(), [
+            {'type': 'human', 'content': '什么是遗忘曲线'}, {'type': 'ai', 'content': answer},
+        ])
+        # 工具的结果整段推送，追加在已有历史之后
+        events = await self.chat('现在几点了', model)
+        self.assertEqual([event for event, _ in events], ['token', 'done'])
+        self.assertTrue(events[0][1]['text'].startswith('当前时间是：'))
+        self.assertEqual(len(await self.history()), 4)
+
+    async def test_error_event_does_not_save_history(self):
+        with redirect_stderr(StringIO()):
+            events = await self.chat('什么是遗忘曲线', api_key={'side_effect': ValueError('未配置API密钥')})
+        self.assertEqual(events, [('error', {'error': '处理失败: 未配置API密钥'})])
+        self.assertEqual(await self.history(), [])
+        response = await self.async_client.post(reverse('agent_chat_stream'), {'question': ' '})
+        self.assertEqual(response.status_code, 400)
+
+
+class AsyncAgentTests(TestCase):
+    '''异步Agent：大模型用 ainvoke 调用，工具的ORM查询经 sync_to_async 执行'''
+
+    def fake_model(self, *answers):
+        from langchain_core.language_models import GenericFakeChatModel
+        from langchain_core.messages import AIMessage
+        return GenericFakeChatModel(messages=iter([AIMessage(content=answer) for answer in answers]))
+
+    async def ask(self, question, model=None):
+        with mock.patch('tracker.views.get_chat_model', return_value=model), mock.patch('tracker.views.get_api_key'):
+            response = await self.async_client.post(reverse('agent_chat'), {'question': question})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['answer']
+
+    async def test_chat_answers_and_saves_history(self):
+        self.assertEqual(await self.ask('什么是间隔重复', self.fake_model('按遗忘曲线安排复习')), '按遗忘曲线安排复习')
+        await self.ask('再说详细一点', self.fake_model('第二次回答'))
+        from django.contrib.sessions.backends.db import SessionStore
+        session = SessionStore(self.async_client.cookies[settings.SESSION_COOKIE_NAME].value)
+        history = await sync_to_async(lambda: session.get('chat_history'))()
+        self.assertEqual([m['content'] for m in history], ['什么是间隔重复', '按遗忘曲线安排复习', '再说详细一点', '第二次回答'])
+
+    async def test_tools_query_database(self):
+        course = await Course.objects.acreate(name='Python基础')
+        self.assertIn('"name": "Python基础"', await self.ask('搜索课程Python基础'))
+        record = '{"course_name": "Python基础", "start_time": "2025-12-30 14:00", "end_time": "2025-12-30 16:00"}'
+        answer = await self.ask('导入学习记录：Python基础，今天14点到16点', self.fake_model(f'```json\n{record}\n```'))
+        self.assertIn('学习记录已成功导入', answer)
+        session = await StudySession.objects.aget(course=course)
+        self.assertEqual(session.duration, 120)
+        self.assertIn('缺少结束时间', await self.ask('记录一下Python基础', self.fake_model('{"course_name": "Python基础", "start_time": "2025-12-30 14:00"}')))
+
+
+class LazyImportTests(TestCase):
+    '''启动时不加载AI与绘图依赖'''
+
+    def test_urls_do_not_import_ai_stack(self):
+        code = (
+            "import django, sys; django.setup(); "
+            "from django.urls import get_resolver; get_resolver().url_patterns; "
+            "print(' '.join(sorted({m.split('.')[0] for m in sys.modules})))"
+        )
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE='learning_tracker.settings', TRACKER_WARM_UP='0')
+        project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        result = subprocess.run([sys.executable, '-c', code], cwd=project_dir, env=env,
+                                capture_output=True, text=True, check=True)
+        loaded = set(result.stdout.split())
+        self.assertFalse(loaded & {'langchain', 'langchain_core', 'langchain_openai', 'openai', 'faiss', 'pypdf', 'matplotlib'})
@@ -3,19 +3,40 @@
 AI 使用的工具
 """
 import json
-import os
+from asgiref.sync import sync_to_async
 from langchain_core.tools import tool
 from datetime import datetime, timedelta
 from django.utils import timezone
 from .models import Course, StudyMaterial, StudySession, ReviewSchedule, PomodoroSession, KnowledgePoint
 
-# PDF解析相关导入
-from langchain.chains import ConversationalRetrievalChain
-from langchain_community.vectorstores import FAISS
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain.memory import ConversationBufferMemory
+from .llm import get_api_key, get_chat_model, get_embeddings
+
+def pdf_qa_chain(pdf_path:str):
+    """针对PDF问答的检索链（parse_pdf 同步调用，流式聊天逐token输出回答）"""
+    # PDF解析相关依赖较重，用到时才导入
+    from langchain.chains import ConversationalRetrievalChain
+    from langchain.memory import ConversationBufferMemory
+
+    from .pdf_index import load_pdf_index
+
+    api_key=get_api_key()
+    model=get_chat_model(api_key)
+    # 创建嵌入模型（已关闭Tokenize，见 llm.get_embeddings）
+    embeddings=get_embeddings(api_key)
+    # 向量数据库按PDF内容哈希缓存在磁盘上，同一份PDF只在第一次提问时分块、嵌入并建立索引（见 pdf_index.py）
+    db=load_pdf_index(pdf_path, embeddings)
+    retriever=db.as_retriever()
+    # 创建对话记忆,每次调用都是新的，因为工具函数应该是无状态的
+    memory=ConversationBufferMemory(
+        memory_key="chat_history",
+        return_messages=True,
+        output_key="answer"
+    )
+    return ConversationalRetrievalChain.from_llm(
+        llm=model,
+        retriever=retriever,
+        memory=memory,
+    )
 
 # 解析PDF
 @tool
@@ -31,56 +52,7 @@ def parse_pdf(pdf_path:str,question:str)->str:
     返回：
         基于PDF内容和AI的理解的详细准确的答案
     """
-    api_key=os.environ.get('SCHOOL_LLM_API_KEY', '')
-    if not api_key:
-        raise ValueError("未配置API密钥，请设置环境变量 SCHOOL_LLM_API_KEY")
-    model=ChatOpenAI(
-        model="ecnu-max",
-        api_key=api_key,
-        base_url="https://chat.ecnu.edu.cn/open/api/v1",
-        temperature=0.7
-    )
-    loader=PyPDFLoader(pdf_path)
-    docs=loader.load()
-    if not docs or len(docs)==0:
-        raise ValueError("PDF文件为空或无法解析，请检查PDF文件是否有效")
-    text_splitter=RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200,
-        separators=['\n\n', '\n', '.', '。', '!', '?', '；', '；', '：', '，', '、', '']
-    )
-    texts=text_splitter.split_documents(docs)
-    if not texts or len(texts) == 0:
-        raise ValueError("PDF文本提取失败，请检查PDF文件内容")
-    # 创建嵌入模型
-    """
-    LangChain 在 OpenAIEmbedding 模式下，
-    默认会将 input 的字符串按 openai 的模型进行 Tokenize。
-    此时提交接口的 input 将不再是字符串而是 token 数组。
-    这对于非 openai 模型下实现的 OpenAI 兼容 api 是无法支持的。
-    因此，需要设置 check_embedding_ctx_length=False 来关闭 Tokenize 行为。
-    """
-    embeddings=OpenAIEmbeddings(
-        base_url="https://chat.ecnu.edu.cn/open/api/v1",  # 不要加/embeddings，LangChain会自动添加
-        model="ecnu-embedding-small",
-        api_key=api_key,
-        dimensions=1024,  # 学校模型返回1024维向量
-        check_embedding_ctx_length=False  # 重要：关闭Tokenize，确保提交的是字符串而不是token数组
-    )
-    #  创建向量数据库
-    db=FAISS.from_documents(texts, embeddings)
-    retriever=db.as_retriever()
-    # 创建对话记忆,每次调用都是新的，因为工具函数应该是无状态的
-    memory=ConversationBufferMemory(
-        memory_key="chat_history",
-        return_messages=True,
-        output_key="answer"
-    )
-    chain=ConversationalRetrievalChain.from_llm(
-        llm=model,
-        retriever=retriever,
-        memory=memory,
-    )
+    chain=pdf_qa_chain(pdf_path)
     response = chain.invoke({"question": question})
     if isinstance(response, dict):
         return response.get('answer', str(response))
@@ -190,8 +162,9 @@ def import_study_session(course_name:str,start_time:str,end_time:str,notes:str="
             return f"❌ 错误：找不到课程'{course_name}'。请先创建该课程，或使用search_course工具查找相似课程。"
         # 2. 解析时间
         try:
-            start_dt=datetime.strptime(start_time, "%Y-%m-%d %H:%M")
-            end_dt=datetime.strptime(end_time, "%Y-%m-%d %H:%M")
+            # 按本地时间理解（汇总每日学习时长时需要带时区的时间）
+            start_dt=timezone.make_aware(datetime.strptime(start_time, "%Y-%m-%d %H:%M"))
+            end_dt=timezone.make_aware(datetime.strptime(end_time, "%Y-%m-%d %H:%M"))
         except ValueError:
             return f"❌ 时间格式错误。请使用格式：YYYY-MM-DD HH:MM（例如：2025-12-23 13:00）"
         # 3. 验证时间
@@ -213,4 +186,51 @@ def import_study_session(course_name:str,start_time:str,end_time:str,notes:str="
     except Exception as e:
         return f"❌ 导入失败：{str(e)}"
 
-# 导入学习资料记录
+# 查看学习资料统计工具
+@tool
+def list_study_materials(course_name: str = "") -> str:
+    """查看学习资料及其学习统计
+
+    当用户询问学习资料的学习情况（学了多久、学了几次、最近什么时候学的）时，使用此工具。
+
+    Args:
+        course_name: 课程名称（可选，为空时返回全部课程的资料）
+
+    Returns:
+        JSON格式的资料列表，每项包含名称、所属课程、已学时长（分钟）、学习次数、最近学习时间
+    """
+    # with_study_stats()一次分组查询带出统计，避免逐个资料查询学习记录
+    materials = StudyMaterial.objects.select_related('course').with_study_stats()
+    if course_name:
+        course = find_course_by_name(course_name)
+        if not course:
+            return json.dumps({
+                "found": False,
+                "message": f"找不到课程'{course_name}'"
+            }, ensure_ascii=False)
+        materials = materials.filter(course=course)
+    items = [
+        {
+            "name": m.name,
+            "course": m.course.name,
+            "total_minutes": round(m.total_minutes, 2),
+            "session_count": m.session_count,
+            "last_studied": timezone.localtime(m.last_studied).strftime("%Y-%m-%d %H:%M") if m.last_studied else None,
+        }
+        for m in materials[:20]
+    ]
+    return json.dumps({"found": bool(items), "materials": items}, ensure_ascii=False)
+
+
+# 异步调用（异步视图中用 tool.ainvoke）：大模型走 ainvoke，等待网络时不占用线程；
+# ORM查询经 sync_to_async 在Django的同步线程中执行，读取或建立PDF索引放到线程池
+async def aparse_pdf(pdf_path:str,question:str)->str:
+    chain=await sync_to_async(pdf_qa_chain, thread_sensitive=False)(pdf_path)
+    response = await chain.ainvoke({"question": question})
+    if isinstance(response, dict):
+        return response.get('answer', str(response))
+    return str(response)
+
+parse_pdf.coroutine=aparse_pdf
+for _tool in (search_course, import_study_session, list_study_materials):
+    _tool.coroutine=sync_to_async(_tool.func)
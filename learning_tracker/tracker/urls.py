@@ -15,8 +15,11 @@ urlpatterns=[
     # 学习记录
     path('sessions/',views.session_list,name='session_list'),
     path('sessions/create/',views.session_create,name='session_create'),
+    path('sessions/import/',views.session_import,name='session_import'),
     path('sessions/<int:pk>/update/',views.session_update,name='session_update'),
     path('sessions/<int:pk>/delete/',views.session_delete,name='session_delete'),
+    # 数据导出
+    path('export/<str:table>/',views.export_data,name='export_data'),
     # 番茄钟
     path('pomodoro/',views.pomodoro_list,name='pomodoro_list'),
     path('pomodoro/start/',views.pomodoro_start,name='pomodoro_start'),
@@ -28,6 +31,7 @@ urlpatterns=[
     path('reviews/auto-generate/',views.review_auto_generate,name='review_auto_generate'),
     path('reviews/<int:pk>/complete/',views.review_complete,name='review_complete'),
     path('reviews/<int:pk>/delete/',views.review_delete,name='review_delete'),
+    path('api/reviews/due/',views.review_queue_api,name='review_queue_api'),
     # 知识点
     path('knowledge/',views.knowledge_list,name='knowledge_list'),
     path('knowledge/create/',views.knowledge_create,name='knowledge_create'),
@@ -39,10 +43,14 @@ urlpatterns=[
     path('materials/<int:pk>/delete/',views.material_delete,name='material_delete'),
     # 仪表板
     path('dashboard/',views.dashboard,name='dashboard'),
+    path('dashboard/charts/<str:name>',views.dashboard_chart,name='dashboard_chart'),
+    path('api/stats/',views.stats_api,name='stats_api'),
     # Agent智能助手（新版本，支持多工具）
     path('agent/',views.AgentView.as_view(),name='agent'),
     path('agent/chat/',views.agent_chat,name='agent_chat'),
+    path('agent/chat/stream/',views.agent_chat_stream,name='agent_chat_stream'),
     path('agent/upload/',views.upload_pdf,name='agent_upload'),
+    path('agent/pdf/<int:pk>/status/',views.pdf_ingestion_status,name='pdf_ingestion_status'),
     path('agent/clear/',views.clear_chat,name='agent_clear'),
 ]
 # <int:pk>	URL中的动态参数
@@ -0,0 +1,184 @@
+"""
+图表渲染（进程池）
+
+只使用面向对象的 Figure API（Figure + FigureCanvasAgg），不经过 pyplot 的全局状态机，
+渲染结果写入内存缓冲区并以 PNG 字节返回。
+ChartRenderPool 把渲染放到独立进程中执行：工作进程启动时预先导入 matplotlib，之后复用；
+排队中的任务数有上限，等待结果有超时，队列已满或超时时调用方直接返回（页面不等图表），
+超时的任务完成后仍会通过回调写入缓存文件，下一次请求即可命中。
+
+本模块不依赖 Django，工作进程以 spawn 方式启动时只需导入本文件。
+"""
+import io
+import multiprocessing
+import os
+import platform
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError  # noqa: F401  调用方据此捕获超时
+from concurrent.futures.process import BrokenProcessPool
+
+DEFAULT_WORKERS = 2
+DEFAULT_QUEUE_SIZE = 8
+DEFAULT_TIMEOUT = 5.0
+
+
+def setup_matplotlib():
+    '''导入matplotlib并配置中文字体（工作进程初始化时调用一次）'''
+    import matplotlib
+    matplotlib.use('Agg')  # 非交互式后端
+    from matplotlib import rcParams
+
+    system = platform.system()
+    if system == 'Windows':
+        rcParams['font.sans-serif'] = ['Microsoft YaHei', 'SimHei', 'SimSun', 'KaiTi', 'FangSong', 'sans-serif']
+    elif system == 'Darwin':  # macOS
+        rcParams['font.sans-serif'] = ['Arial Unicode MS', 'PingFang SC', 'STHeiti', 'sans-serif']
+    else:  # Linux
+        rcParams['font.sans-serif'] = ['WenQuanYi Micro Hei', 'WenQuanYi Zen Hei', 'Noto Sans CJK SC', 'sans-serif']
+    rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
+    # 预先导入渲染用到的模块，首个任务不再承担导入耗时
+    import matplotlib.backends.backend_agg  # noqa: F401
+    import matplotlib.figure  # noqa: F401
+
+
+def _new_figure(figsize):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def _png_bytes(fig):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png')
+    return buffer.getvalue()
+
+
+def render_trend(points):
+    '''学习时长趋势折线图，points: [(日期, 小时数)]'''
+    fig = _new_figure((10, 6))
+    ax = fig.add_subplot()
+    ax.plot([d for d, _ in points], [h for _, h in points], marker='o')
+    ax.set_title('学习时长趋势（最近30天）')
+    ax.set_xlabel('日期')
+    ax.set_ylabel('学习时长（小时）')
+    ax.tick_params(axis='x', labelrotation=45)
+    fig.tight_layout()
+    return _png_bytes(fig)
+
+
+def render_distribution(items):
+    '''课程时间分布饼图，items: [(课程名, 小时数)]'''
+    fig = _new_figure((8, 8))
+    ax = fig.add_subplot()
+    ax.pie([t for _, t in items], labels=[n for n, _ in items], autopct='%1.1f%%')
+    ax.set_title('课程时间分布')
+    return _png_bytes(fig)
+
+
+def render_chart(kind, data):
+    '''按图表类型渲染，返回PNG字节'''
+    return globals()[f'render_{kind}'](data)
+
+
+def write_atomic(path, data):
+    '''先写临时文件再原子替换，并发读取不会看到写了一半的文件'''
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+class ChartQueueFull(Exception):
+    """排队中的渲染任务已达上限"""
+
+
+class ChartRenderPool:
+    """图表渲染进程池：有界队列 + 超时；workers=0 时在当前进程内渲染（测试、单进程调试用）"""
+
+    def __init__(self, workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE, timeout=DEFAULT_TIMEOUT):
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(queue_size)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._inline_ready = False
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn：不继承Web进程的线程与数据库连接
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=setup_matplotlib,
+                )
+            return self._executor
+
+    def _reset_executor(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, kind, data):
+        '''提交任务；进程池已损坏（工作进程异常退出）时重建一次再提交'''
+        executor = self._get_executor()
+        try:
+            return executor, executor.submit(render_chart, kind, data)
+        except (BrokenProcessPool, RuntimeError):
+            self._reset_executor(executor)
+        executor = self._get_executor()
+        return executor, executor.submit(render_chart, kind, data)
+
+    def render(self, kind, data, path=None):
+        '''渲染图表；指定 path 时结果写入该文件（超时后完成的任务也会写入）。
+        返回PNG字节，队列已满时抛出ChartQueueFull，超时抛出TimeoutError'''
+        if not self.workers:
+            with self._lock:
+                if not self._inline_ready:
+                    setup_matplotlib()
+                    self._inline_ready = True
+            png = render_chart(kind, data)
+            if path:
+                write_atomic(path, png)
+            return png
+        if not self._slots.acquire(blocking=False):
+            raise ChartQueueFull(kind)
+        try:
+            executor, future = self._submit(kind, data)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda f: self._finish(f, path))
+        try:
+            png = future.result(timeout=self.timeout)
+        except BrokenProcessPool:
+            # 工作进程异常退出，下次调用时重建进程池
+            self._reset_executor(executor)
+            raise
+        # 回调可能晚于 result() 返回才执行，按时完成的结果由调用线程直接写入
+        if path and not os.path.exists(path):
+            write_atomic(path, png)
+        return png
+
+    def _finish(self, future, path):
+        self._slots.release()
+        if path and not future.cancelled() and future.exception() is None and not os.path.exists(path):
+            try:
+                write_atomic(path, future.result())
+            except OSError:
+                pass
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
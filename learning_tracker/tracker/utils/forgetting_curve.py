@@ -1,9 +1,24 @@
 """
 遗忘曲线算法（艾宾浩斯遗忘曲线）
 用于自动生成复习计划
+
+batch_* 函数是对应单条函数的向量化版本：输入 NumPy datetime64 / 整数数组，
+查预先计算好的累计间隔表，一次处理成千上万条学习记录，结果与单条函数逐条计算一致。
+
+get_retention_rate 是所有课程共用的经验曲线；积累了复习记录的课程可以用 fit_decay_curves
+批量拟合各自的指数遗忘曲线（DecayCurve），数据不足时仍用经验曲线。
 """
+import math
 from datetime import datetime, timedelta
-from typing import List, Tuple
+from itertools import accumulate
+from typing import List, NamedTuple, Tuple
+
+# 复习间隔（天）：前6次复习的间隔，之后每30天复习一次
+REVIEW_INTERVALS = [1, 2, 4, 8, 15, 30]
+LATER_INTERVAL = 30
+MAX_FUTURE_REVIEWS = 5
+# 累计间隔表：CUMULATIVE_DAYS[k] 为第k次复习距学习日的天数（k<=6）
+CUMULATIVE_DAYS = list(accumulate(REVIEW_INTERVALS, initial=0))
 
 
 def calculate_review_dates(study_date: datetime, review_count: int = 0) -> List[datetime]:
@@ -27,7 +42,7 @@ def calculate_review_dates(study_date: datetime, review_count: int = 0) -> List[
         复习日期列表（datetime对象列表）
     """
     # 复习间隔（天）
-    intervals = [1, 2, 4, 8, 15, 30]  # 前6次复习的间隔
+    intervals = REVIEW_INTERVALS  # 前6次复习的间隔
     
     review_dates = []
     current_date = study_date
@@ -42,11 +57,11 @@ def calculate_review_dates(study_date: datetime, review_count: int = 0) -> List[
         
         # 如果已完成所有基础间隔，使用固定30天间隔
         if review_count >= len(intervals):
-            days_since_last = 30 * (review_count - len(intervals) + 1)
+            days_since_last = LATER_INTERVAL * (review_count - len(intervals) + 1)
             current_date = study_date + timedelta(days=sum(intervals) + days_since_last)
     
     # 生成未来的复习日期（最多生成5个）
-    max_future_reviews = 5
+    max_future_reviews = MAX_FUTURE_REVIEWS
     for i in range(max_future_reviews):
         if review_count == 0 and i == 0:
             # 第一次复习：学习后1天
@@ -58,7 +73,7 @@ def calculate_review_dates(study_date: datetime, review_count: int = 0) -> List[
         else:
             # 使用固定30天间隔
             base_days = sum(intervals)
-            additional_days = 30 * (review_count + i - len(intervals) + 1)
+            additional_days = LATER_INTERVAL * (review_count + i - len(intervals) + 1)
             next_date = study_date + timedelta(days=base_days + additional_days)
         
         review_dates.append(next_date)
@@ -160,3 +175,195 @@ def should_review_now(study_date: datetime, review_count: int = 0, current_date:
     # 如果当前日期已经到达或超过复习日期，应该复习
     return current_date.date() >= next_review_date.date()
 
+
+def review_offsets(review_numbers):
+    """
+    第k次复习距学习日的天数（向量化），k>6 时按每30天递增
+
+    Args:
+        review_numbers: 复习序号数组（从1开始）
+
+    Returns:
+        天数数组（int64）
+    """
+    import numpy as np
+    k = np.asarray(review_numbers, dtype=np.int64)
+    table = np.asarray(CUMULATIVE_DAYS, dtype=np.int64)
+    last = len(REVIEW_INTERVALS)
+    return np.where(
+        k <= last,
+        table[np.clip(k, 0, last)],
+        table[last] + LATER_INTERVAL * (k - last)
+    )
+
+
+def _as_dates(study_dates):
+    import numpy as np
+    dates = np.asarray(study_dates)
+    if not np.issubdtype(dates.dtype, np.datetime64):
+        dates = dates.astype('datetime64[s]')
+    return dates
+
+
+def batch_calculate_review_dates(study_dates, review_counts=0, max_future_reviews: int = MAX_FUTURE_REVIEWS):
+    """
+    calculate_review_dates 的批量版本
+
+    Args:
+        study_dates: 学习日期数组（datetime64，或可转换为datetime64的不带时区的datetime序列）
+        review_counts: 已完成的复习次数数组（或单个整数，对所有条目生效）
+        max_future_reviews: 每条生成的复习日期数
+
+    Returns:
+        形状为 (条数, max_future_reviews) 的datetime64数组，第i行为第i条的复习日期
+    """
+    import numpy as np
+    dates = _as_dates(study_dates)
+    counts = np.broadcast_to(np.asarray(review_counts, dtype=np.int64), dates.shape)
+    numbers = counts[:, None] + np.arange(1, max_future_reviews + 1)
+    return dates[:, None] + review_offsets(numbers).astype('timedelta64[D]')
+
+
+def batch_next_review_dates(study_dates, review_counts=0):
+    """
+    get_next_review_date 的批量版本
+
+    Returns:
+        与 study_dates 等长的datetime64数组
+    """
+    import numpy as np
+    dates = _as_dates(study_dates)
+    counts = np.broadcast_to(np.asarray(review_counts, dtype=np.int64), dates.shape)
+    return dates + review_offsets(counts + 1).astype('timedelta64[D]')
+
+
+def batch_generate_review_schedule(study_dates, review_counts=0, max_reviews: int = MAX_FUTURE_REVIEWS):
+    """
+    generate_review_schedule 的批量版本
+
+    Returns:
+        (复习日期数组, 复习次数数组)，形状均为 (条数, min(max_reviews, 5))
+    """
+    import numpy as np
+    max_reviews = max(0, min(max_reviews, MAX_FUTURE_REVIEWS))
+    dates = _as_dates(study_dates)
+    counts = np.broadcast_to(np.asarray(review_counts, dtype=np.int64), dates.shape)
+    return (
+        batch_calculate_review_dates(dates, counts, max_reviews),
+        counts[:, None] + np.arange(1, max_reviews + 1),
+    )
+
+
+def batch_retention_rate(days_since_study, review_counts=0):
+    """
+    get_retention_rate 的批量版本
+
+    Args:
+        days_since_study: 距离学习的天数数组
+        review_counts: 已完成的复习次数数组（或单个整数）
+
+    Returns:
+        与 days_since_study 等长的保留率数组（float64）
+    """
+    import numpy as np
+    days = np.asarray(days_since_study, dtype=np.int64)
+    counts = np.broadcast_to(np.asarray(review_counts, dtype=np.int64), days.shape)
+    base = np.select(
+        [days == 1, days <= 7, days <= 30],
+        [0.26, 0.23, 0.21],
+        default=np.maximum(0.1, 0.21 - (days - 30) * 0.001)
+    )
+    return np.where(days <= 0, 1.0, np.minimum(1.0, base + counts * 0.15))
+
+
+# ---- 按复习记录拟合的指数遗忘曲线 ----
+# R = exp(-t / (stability * growth^n))：t 为距上次学习/复习的天数，n 为已完成的复习次数
+
+MAX_STABILITY = 36500.0
+MIN_STABILITY = 0.1
+MAX_GROWTH = 10.0
+# 拟合时斜率 ln(growth) 向先验值收缩（间隔表大致每次翻倍），只有一种复习次数的课程也有解
+PRIOR_GROWTH = 2.0
+RIDGE = 1.0
+
+
+class DecayCurve(NamedTuple):
+    '''拟合出的遗忘曲线参数'''
+    stability: float  # 未复习时的稳定性：保留率降到 1/e 的天数
+    growth: float     # 每完成一次复习，稳定性乘以的倍数
+
+    def stability_after(self, review_count: int) -> float:
+        log_stability = math.log(self.stability) + max(review_count, 0) * math.log(self.growth)
+        return math.exp(min(log_stability, math.log(MAX_STABILITY)))
+
+    def retention(self, days_since_study: int, review_count: int = 0) -> float:
+        '''与 get_retention_rate 含义相同的保留率'''
+        if days_since_study <= 0:
+            return 1.0
+        return math.exp(-days_since_study / self.stability_after(review_count))
+
+    def interval(self, review_count: int, desired_retention: float) -> int:
+        '''保留率降到 desired_retention 所需的天数（至少1天）'''
+        days = round(-self.stability_after(review_count) * math.log(desired_retention))
+        return int(min(max(days, 1), MAX_STABILITY))
+
+
+def batch_decay_retention(days_since_study, review_counts, stability, growth):
+    """
+    DecayCurve.retention 的批量版本，stability / growth 可以是每条一个值的数组
+
+    Returns:
+        保留率数组（float64）；stability 为 NaN 的条目结果为 NaN
+    """
+    import numpy as np
+    days = np.asarray(days_since_study, dtype=np.float64)
+    counts = np.maximum(np.asarray(review_counts, dtype=np.float64), 0)
+    with np.errstate(invalid='ignore'):
+        log_stability = np.minimum(np.log(stability) + counts * np.log(growth), np.log(MAX_STABILITY))
+        retention = np.exp(-days / np.exp(log_stability))
+    return np.where(days <= 0, np.where(np.isnan(log_stability), np.nan, 1.0), retention)
+
+
+def fit_decay_curves(groups, days_since_study, review_counts, totals, recalled, group_count: int,
+                     ridge: float = RIDGE, prior_growth: float = PRIOR_GROWTH):
+    """
+    一次拟合所有组（课程/资料）的指数遗忘曲线
+
+    输入是按 (组, 间隔天数, 复习次数) 汇总的复习记录：totals 条中 recalled 条记住了。
+    由 ln t - ln(-ln R) = ln stability + n * ln growth，对每组以条数为权重做线性最小二乘；
+    各组的加权和用 np.bincount 一次算出，再按 2x2 正规方程的闭式解得到所有组的参数。
+    观测保留率取 (recalled + 0.5) / (totals + 1)，全部记住或全部忘记时也能取对数。
+
+    Args:
+        groups: 每行所属的组号（0 ~ group_count-1）
+        days_since_study: 每行的间隔天数（<=0 的行忽略）
+        review_counts: 每行复习前已完成的复习次数
+        totals / recalled: 每行的复习条数 / 记住的条数
+        group_count: 组数
+        ridge: 斜率向 ln(prior_growth) 收缩的强度（相当于多少条样本）
+
+    Returns:
+        (stability数组, growth数组, 每组样本数数组)，长度均为 group_count
+    """
+    import numpy as np
+    groups = np.asarray(groups, dtype=np.int64)
+    days = np.asarray(days_since_study, dtype=np.float64)
+    x = np.asarray(review_counts, dtype=np.float64)
+    w = np.asarray(totals, dtype=np.float64)
+    keep = days > 0
+    groups, days, x, w = groups[keep], days[keep], x[keep], w[keep]
+    observed = (np.asarray(recalled, dtype=np.float64)[keep] + 0.5) / (w + 1)
+    y = np.log(days) - np.log(-np.log(observed))
+
+    def total(values):
+        return np.bincount(groups, weights=values, minlength=group_count)
+
+    sw, swx, swy, swxx, swxy = total(w), total(w * x), total(w * y), total(w * x * x), total(w * x * y)
+    prior = np.log(prior_growth)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        det = sw * (swxx + ridge) - swx * swx
+        intercept = (swy * (swxx + ridge) - swx * (swxy + ridge * prior)) / det
+        slope = (sw * (swxy + ridge * prior) - swx * swy) / det
+    stability = np.clip(np.exp(intercept), MIN_STABILITY, MAX_STABILITY)
+    growth = np.clip(np.exp(slope), 1.0, MAX_GROWTH)
+    return stability, growth, sw.astype(np.int64)
@@ -0,0 +1,153 @@
+"""
+键集（游标）分页
+按模型 Meta.ordering 的字段再加上 id 排序，用上一页边界行的键值定位下一页，
+不使用 OFFSET，因此第N页与第1页的查询代价相同。
+游标是签名过的不透明字符串，客户端无法伪造或修改。
+"""
+from functools import reduce
+from operator import or_
+
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import QueryDict
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+CURSOR_SALT = 'tracker.keyset-cursor'
+
+
+class KeysetPage:
+    """一页数据及前后页游标"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None, params=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self._params = params if params is not None else QueryDict(mutable=True)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def _query_with(self, cursor):
+        '''保留原有筛选参数，只替换游标'''
+        params = self._params.copy()
+        params['cursor'] = cursor
+        return params.urlencode()
+
+    @property
+    def next_query(self):
+        return self._query_with(self.next_cursor) if self.has_next else ''
+
+    @property
+    def previous_query(self):
+        return self._query_with(self.previous_cursor) if self.has_previous else ''
+
+
+def get_ordering(queryset):
+    '''取查询集的排序字段（没有则用模型 Meta.ordering），并补上 id 保证顺序唯一'''
+    ordering = [str(f) for f in (queryset.query.order_by or queryset.model._meta.ordering)]
+    ordering = [{'pk': 'id', '-pk': '-id'}.get(f, f) for f in ordering]
+    if 'id' not in [f.lstrip('-') for f in ordering]:
+        # id 与最后一个排序字段同向，索引 (字段, id) 可以整体正序或倒序扫描
+        descending = bool(ordering) and ordering[-1].startswith('-')
+        ordering.append('-id' if descending else 'id')
+    return ordering
+
+
+def keyset_filter(queryset, ordering, key, reverse=False):
+    '''筛选排在键值 key 之后（reverse=True 时为之前）的行
+
+    行比较 (f1, f2, ...) > (v1, v2, ...) 展开为
+    f1 > v1 OR (f1 = v1 AND f2 > v2) OR ...，降序字段使用 <。
+    另外补充首字段的非严格范围条件，数据库可以直接做索引范围扫描。
+    '''
+    clauses = []
+    for i, field in enumerate(ordering):
+        descending = field.startswith('-') != reverse
+        equal = {f.lstrip('-'): v for f, v in zip(ordering[:i], key[:i])}
+        equal[f"{field.lstrip('-')}__{'lt' if descending else 'gt'}"] = key[i]
+        clauses.append(Q(**equal))
+    first_descending = ordering[0].startswith('-') != reverse
+    bound = Q(**{f"{ordering[0].lstrip('-')}__{'lte' if first_descending else 'gte'}": key[0]})
+    return queryset.filter(bound & reduce(or_, clauses))
+
+
+def _reverse_ordering(ordering):
+    return [f[1:] if f.startswith('-') else f'-{f}' for f in ordering]
+
+
+def encode_cursor(obj, ordering, backward=False):
+    '''把边界行的排序键编码为签名游标'''
+    values = [obj._meta.get_field(f.lstrip('-')).value_to_string(obj) for f in ordering]
+    return signing.dumps({'k': values, 'b': backward}, salt=CURSOR_SALT, compress=True)
+
+
+def decode_cursor(token, model, ordering):
+    '''解析游标，返回 (键值列表, 是否向前翻页)；游标无效时返回 (None, False)'''
+    try:
+        data = signing.loads(token, salt=CURSOR_SALT)
+        values = data['k']
+        if len(values) != len(ordering):
+            return None, False
+        key = [model._meta.get_field(f.lstrip('-')).to_python(v) for f, v in zip(ordering, values)]
+    except (signing.BadSignature, KeyError, TypeError, ValueError, ValidationError):
+        return None, False
+    return key, bool(data.get('b'))
+
+
+def get_page_size(request, default=DEFAULT_PAGE_SIZE):
+    try:
+        size = int(request.GET.get('page_size', default))
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def paginate_keyset(request, queryset, page_size=None):
+    '''对查询集做键集分页，游标从 request.GET['cursor'] 读取，其余筛选参数原样保留'''
+    page_size = page_size or get_page_size(request)
+    ordering = get_ordering(queryset)
+    key, backward = (None, False)
+    token = request.GET.get('cursor')
+    if token:
+        key, backward = decode_cursor(token, queryset.model, ordering)
+
+    if key is None:
+        rows = list(queryset.order_by(*ordering)[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        has_next, has_previous = has_more, False
+    elif not backward:
+        rows = list(keyset_filter(queryset, ordering, key).order_by(*ordering)[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        has_next, has_previous = has_more, True
+    else:
+        # 向前翻页：反向排序取边界之前的行，再翻转回正常顺序
+        reverse_ordering = _reverse_ordering(ordering)
+        rows = list(keyset_filter(queryset, ordering, key, reverse=True).order_by(*reverse_ordering)[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size][::-1]
+        has_next, has_previous = True, has_more
+
+    params = request.GET.copy()
+    params.pop('cursor', None)
+    next_cursor = encode_cursor(rows[-1], ordering) if rows and has_next else None
+    previous_cursor = encode_cursor(rows[0], ordering, backward=True) if rows and has_previous else None
+    return KeysetPage(rows, next_cursor, previous_cursor, params)
@@ -0,0 +1,151 @@
+"""
+复习负载模拟
+
+模拟 N 个学习者 D 天内每天要做的复习数：每个学习者每天学习的新内容数服从泊松分布
+（均值可按星期/日期变化，学习者之间的活跃度可以不同），每项学习内容按遗忘曲线间隔表
+（review_offsets，与 calculate_review_dates 一致）在学习后第1、3、7、15、30、60天……复习。
+每人每天最多完成 capacity 个复习，超出部分顺延形成积压；固定间隔表以学习日期为起点，
+补做的复习不改变之后的复习日期。
+
+实现上按学习者分块，学习数矩阵 (块大小, D) 按每个复习间隔整体平移累加得到每天的到期数，
+积压按天递推但在学习者维度向量化，10万人×365天只需数秒。
+"""
+from typing import NamedTuple, Optional
+
+from .forgetting_curve import review_offsets
+
+DEFAULT_CHUNK_SIZE = 10000
+
+
+class SimulationResult(NamedTuple):
+    '''模拟结果（数组长度均为天数，下标为第几天）'''
+    learners: int
+    days: int
+    studied: object            # 每天新学习的内容数（全体）
+    due: object                # 每天到期的复习数（全体）
+    completed: object          # 每天完成的复习数（全体，受 capacity 限制）
+    backlog: object            # 每天结束时积压的复习数（全体）
+    overloaded: object         # 每天到期数超过 capacity 的学习者人数
+    learner_peak: object       # 每个学习者单日到期数的最大值
+
+    def peak_days(self, top=5):
+        '''到期复习数最多的几天：[(第几天, 到期数)]'''
+        import numpy as np
+        order = np.argsort(-self.due, kind='stable')[:top]
+        return [(int(day), int(self.due[day])) for day in order]
+
+    def summary(self, steady_window=30):
+        '''汇总指标；稳态取最后 steady_window 天'''
+        import numpy as np
+        window = self.due[-steady_window:]
+        return {
+            'learners': self.learners,
+            'days': self.days,
+            'total_studied': int(self.studied.sum()),
+            'total_due': int(self.due.sum()),
+            'mean_due_per_learner_day': round(float(self.due.mean() / self.learners), 3),
+            'steady_due_per_learner_day': round(float(window.mean() / self.learners), 3),
+            'peak_days': self.peak_days(),
+            'final_backlog': int(self.backlog[-1]),
+            'max_backlog': int(self.backlog.max()),
+            'max_overloaded_learners': int(self.overloaded.max()),
+            'learner_peak_p95': float(np.percentile(self.learner_peak, 95)),
+        }
+
+
+def _day_rates(sessions_per_day, days):
+    '''每天的学习数均值：单个数、按星期的7个数（第0天为星期一）或每天一个数'''
+    import numpy as np
+    rates = np.asarray(sessions_per_day, dtype=np.float64)
+    if rates.ndim == 0:
+        return np.full(days, float(rates))
+    if rates.shape == (7,):
+        return np.resize(rates, days)
+    if rates.shape == (days,):
+        return rates
+    raise ValueError('sessions_per_day 应为单个数、7个数（按星期）或每天一个数')
+
+
+def review_load(studied, max_review_count: Optional[int] = None):
+    """
+    每天到期的复习数
+
+    Args:
+        studied: (学习者数, 天数) 的每天新学习内容数
+        max_review_count: 每项内容最多复习几次（None 表示一直按间隔复习下去）
+
+    Returns:
+        与 studied 同形状的每天到期复习数
+    """
+    import numpy as np
+    studied = np.asarray(studied)
+    days = studied.shape[-1]
+    load = np.zeros(studied.shape, dtype=np.int32)
+    k = 1
+    while max_review_count is None or k <= max_review_count:
+        offset = int(review_offsets(k))
+        if offset >= days:
+            break
+        load[..., offset:] += studied[..., :days - offset]
+        k += 1
+    return load
+
+
+def simulate_reviews(learners: int, days: int, sessions_per_day=1.0, capacity: Optional[int] = None,
+                     activity_shape: Optional[float] = None, max_review_count: Optional[int] = None,
+                     seed: int = 0, chunk_size: int = DEFAULT_CHUNK_SIZE) -> SimulationResult:
+    """
+    模拟复习负载
+
+    Args:
+        learners: 学习者数
+        days: 模拟天数
+        sessions_per_day: 每人每天新学习内容数的均值（单个数 / 按星期7个数 / 每天一个数）
+        capacity: 每人每天最多完成的复习数（None 表示不限，没有积压）
+        activity_shape: 学习者活跃度差异，活跃度服从均值为1、形状参数为该值的伽马分布（越小差异越大）；
+            None 表示所有人相同
+        max_review_count: 每项内容最多复习几次
+        seed: 随机种子
+        chunk_size: 每次处理的学习者数，决定内存占用
+
+    Returns:
+        SimulationResult
+    """
+    import numpy as np
+    if learners < 1 or days < 1:
+        raise ValueError('learners 和 days 必须大于0')
+    rng = np.random.default_rng(seed)
+    rates = _day_rates(sessions_per_day, days)
+
+    studied_total = np.zeros(days, dtype=np.int64)
+    due_total = np.zeros(days, dtype=np.int64)
+    done_total = np.zeros(days, dtype=np.int64)
+    backlog_total = np.zeros(days, dtype=np.int64)
+    overloaded = np.zeros(days, dtype=np.int64)
+    learner_peak = np.empty(learners, dtype=np.int64)
+
+    for start in range(0, learners, chunk_size):
+        n = min(chunk_size, learners - start)
+        lam = np.broadcast_to(rates, (n, days))
+        if activity_shape is not None:
+            lam = lam * rng.gamma(activity_shape, 1 / activity_shape, size=(n, 1))
+        studied = rng.poisson(lam).astype(np.int32)
+        due = review_load(studied, max_review_count)
+
+        studied_total += studied.sum(axis=0)
+        due_total += due.sum(axis=0)
+        learner_peak[start:start + n] = due.max(axis=1)
+        if capacity is None:
+            done_total += due.sum(axis=0)
+            continue
+        overloaded += (due > capacity).sum(axis=0)
+        pending = np.zeros(n, dtype=np.int64)
+        for day in range(days):
+            pending += due[:, day]
+            done = np.minimum(pending, capacity)
+            pending -= done
+            done_total[day] += done.sum()
+            backlog_total[day] += pending.sum()
+
+    return SimulationResult(learners, days, studied_total, due_total, done_total, backlog_total, overloaded,
+                            learner_peak)
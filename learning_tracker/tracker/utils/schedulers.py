@@ -0,0 +1,186 @@
+"""
+复习调度引擎
+
+引擎根据本次复习的评分，由复习项当前的记忆状态算出新的状态和下次复习日期：
+- FixedIntervalScheduler（fixed）：原有的固定间隔表（见 forgetting_curve.py），忽略评分
+- FSRSScheduler（fsrs）：FSRS 风格的自适应引擎。每个复习项只保存 稳定性/难度/上次复习日期，
+  完成一次复习用这三个值做一次 O(1) 更新，不需要回放历史复习记录
+- CurveScheduler（curve）：按复习记录拟合的该课程/资料遗忘曲线（DecayCurve），间隔取保留率降到
+  desired_retention 的天数；没有拟合参数（复习记录太少）时与 fixed 相同
+
+settings.REVIEW_SCHEDULER 选择引擎（默认 fixed，拟合的遗忘曲线需显式选择 curve），get_scheduler(name, **options) 返回对应实例。
+"""
+import math
+from abc import ABC, abstractmethod
+from datetime import date, datetime, timedelta
+from typing import NamedTuple, Optional, Tuple
+
+from .forgetting_curve import DecayCurve, get_next_review_date
+
+# 复习评分
+GRADE_AGAIN = 1
+GRADE_HARD = 2
+GRADE_GOOD = 3
+GRADE_EASY = 4
+GRADE_CHOICES = [
+    (GRADE_AGAIN, '忘记'),
+    (GRADE_HARD, '困难'),
+    (GRADE_GOOD, '良好'),
+    (GRADE_EASY, '简单'),
+]
+DEFAULT_GRADE = GRADE_GOOD
+
+
+class ReviewState(NamedTuple):
+    '''复习项的记忆状态'''
+    review_count: int = 0                # 已完成的复习次数
+    stability: Optional[float] = None    # 稳定性：保留率降到90%所需的天数
+    difficulty: Optional[float] = None   # 难度：1（最易）~10（最难）
+    last_reviewed: Optional[date] = None  # 上次复习日期
+
+
+def parse_grade(value) -> int:
+    '''解析评分参数，空值时返回默认评分'''
+    if value in (None, ''):
+        return DEFAULT_GRADE
+    try:
+        grade = int(value)
+    except (TypeError, ValueError):
+        grade = 0
+    if not GRADE_AGAIN <= grade <= GRADE_EASY:
+        raise ValueError(f'无效的复习评分：{value}，应为1~4')
+    return grade
+
+
+def _as_date(value) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+
+class Scheduler(ABC):
+    '''调度引擎接口'''
+    name = ''
+
+    @abstractmethod
+    def review(self, state: ReviewState, grade: int, reviewed_on: date,
+               study_date=None) -> Tuple[ReviewState, date]:
+        """
+        完成一次复习
+
+        Args:
+            state: 复习前的记忆状态
+            grade: 本次复习评分（1~4）
+            reviewed_on: 复习日期
+            study_date: 学习日期（固定间隔表以它为起点，自适应引擎不需要）
+
+        Returns:
+            (复习后的记忆状态, 下次复习日期)
+        """
+
+
+class FixedIntervalScheduler(Scheduler):
+    '''固定间隔表：下次复习日期只取决于学习日期和已完成次数'''
+    name = 'fixed'
+
+    def review(self, state, grade, reviewed_on, study_date=None):
+        count = state.review_count + 1
+        next_date = get_next_review_date(study_date if study_date is not None else reviewed_on, count)
+        return state._replace(review_count=count, last_reviewed=reviewed_on), _as_date(next_date)
+
+
+class FSRSScheduler(Scheduler):
+    """
+    FSRS（v4）风格的自适应引擎
+
+    - 保留率 R = (1 + t / (9S))^-1，t 为距上次复习的天数
+    - 首次复习按评分给出初始稳定性和难度
+    - 之后评分越低难度越高（向默认难度回归）；记住时稳定性按难度、当前稳定性和遗忘程度增长，
+      忘记时稳定性降低
+    - 间隔取保留率降到 desired_retention 的天数
+    """
+    name = 'fsrs'
+    # FSRS v4 默认参数
+    WEIGHTS = (0.4, 0.6, 2.4, 5.8, 4.93, 0.94, 0.86, 0.01, 1.49, 0.14, 0.94, 2.18, 0.05, 0.34, 1.26, 0.29, 2.61)
+    DESIRED_RETENTION = 0.9
+    MAX_INTERVAL = 36500
+
+    def __init__(self, weights=WEIGHTS, desired_retention=DESIRED_RETENTION):
+        self.w = weights
+        self.desired_retention = desired_retention
+
+    @staticmethod
+    def retrievability(stability: float, elapsed_days: float) -> float:
+        return (1 + max(elapsed_days, 0) / (9 * stability)) ** -1
+
+    def initial_stability(self, grade: int) -> float:
+        return self.w[grade - 1]
+
+    def initial_difficulty(self, grade: int) -> float:
+        return min(max(self.w[4] - (grade - 3) * self.w[5], 1.0), 10.0)
+
+    def next_difficulty(self, difficulty: float, grade: int) -> float:
+        changed = difficulty - self.w[6] * (grade - 3)
+        reverted = self.w[7] * self.initial_difficulty(GRADE_GOOD) + (1 - self.w[7]) * changed
+        return min(max(reverted, 1.0), 10.0)
+
+    def next_stability(self, stability: float, difficulty: float, retrievability: float, grade: int) -> float:
+        w = self.w
+        if grade == GRADE_AGAIN:
+            forgotten = (w[11] * difficulty ** -w[12] * ((stability + 1) ** w[13] - 1)
+                         * math.exp(w[14] * (1 - retrievability)))
+            return min(forgotten, stability)
+        hard_penalty = w[15] if grade == GRADE_HARD else 1.0
+        easy_bonus = w[16] if grade == GRADE_EASY else 1.0
+        return stability * (1 + math.exp(w[8]) * (11 - difficulty) * stability ** -w[9]
+                            * (math.exp(w[10] * (1 - retrievability)) - 1) * hard_penalty * easy_bonus)
+
+    def interval(self, stability: float) -> int:
+        days = round(9 * stability * (1 / self.desired_retention - 1))
+        return min(max(days, 1), self.MAX_INTERVAL)
+
+    def review(self, state, grade, reviewed_on, study_date=None):
+        if state.stability is None or state.difficulty is None:
+            stability, difficulty = self.initial_stability(grade), self.initial_difficulty(grade)
+        else:
+            last = state.last_reviewed or _as_date(study_date) or reviewed_on
+            r = self.retrievability(state.stability, (reviewed_on - last).days)
+            stability = self.next_stability(state.stability, state.difficulty, r, grade)
+            difficulty = self.next_difficulty(state.difficulty, grade)
+        new_state = ReviewState(state.review_count + 1, round(stability, 4), round(difficulty, 4), reviewed_on)
+        return new_state, reviewed_on + timedelta(days=self.interval(stability))
+
+
+class CurveScheduler(Scheduler):
+    """
+    按拟合的遗忘曲线安排复习
+
+    curve 为该课程/资料的 DecayCurve：第n次复习后的间隔为保留率降到 desired_retention 的天数；
+    评分为“忘记”时按未复习过的稳定性重新开始。curve 为 None 时退回固定间隔表。
+    """
+    name = 'curve'
+    DESIRED_RETENTION = 0.9
+
+    def __init__(self, curve: Optional[DecayCurve] = None, desired_retention=DESIRED_RETENTION):
+        self.curve = curve
+        self.desired_retention = desired_retention
+
+    def review(self, state, grade, reviewed_on, study_date=None):
+        if self.curve is None:
+            return FixedIntervalScheduler().review(state, grade, reviewed_on, study_date)
+        count = state.review_count + 1
+        days = self.curve.interval(0 if grade == GRADE_AGAIN else count, self.desired_retention)
+        return state._replace(review_count=count, last_reviewed=reviewed_on), reviewed_on + timedelta(days=days)
+
+
+SCHEDULERS = {
+    FixedIntervalScheduler.name: FixedIntervalScheduler,
+    FSRSScheduler.name: FSRSScheduler,
+    CurveScheduler.name: CurveScheduler,
+}
+
+
+def get_scheduler(name: str = FixedIntervalScheduler.name, **options) -> Scheduler:
+    '''按名称返回调度引擎，options 传给引擎的构造函数（如 curve 的 curve=DecayCurve）'''
+    try:
+        return SCHEDULERS[name](**options)
+    except KeyError:
+        raise ValueError(f'未知的复习调度引擎：{name}，可选：{", ".join(SCHEDULERS)}')
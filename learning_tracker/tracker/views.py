@@ -1,9 +1,15 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.conf import settings
 from django.contrib import messages
+from django.db import transaction
 from django.utils import timezone
-from .models import StudySession, Course, PomodoroSession, ReviewSchedule, KnowledgePoint, StudyMaterial  # 导入所有模型
+from .models import StudySession, Course, PomodoroSession, ReviewSchedule, KnowledgePoint, StudyMaterial, CourseStudyStat, DailyStudyStat, PdfIngestion  # 导入所有模型
 from .forms import StudySessionForm, PomodoroSessionForm, ReviewScheduleForm, KnowledgePointForm, CourseForm, StudyMaterialForm
-from .utils.forgetting_curve import generate_review_schedule,get_next_review_date
+from .utils.forgetting_curve import generate_review_schedule
+from .utils.schedulers import GRADE_CHOICES, CurveScheduler, get_scheduler, parse_grade
+from .utils.pagination import paginate_keyset
+from .review_load import get_day_load_index, leveling_enabled, release_reviews
+from django.utils.dateparse import parse_date
 from datetime import datetime, timedelta
 
 def home(request):
@@ -12,6 +18,20 @@ def home(request):
 def pdf_assistant(request):
     return render(request, 'pdf_assistant.html', context={})
 
+def local_day_start(value, days=0):
+    """把YYYY-MM-DD转换为本地时区当天零点（可再偏移days天），无效日期返回None
+
+    用时间范围代替 start_time__date 之类的函数比较，查询才能走索引
+    """
+    try:
+        day = parse_date(value) if value else None
+    except ValueError:
+        day = None
+    if not day:
+        return None
+    return timezone.make_aware(datetime.combine(day + timedelta(days=days), datetime.min.time()))
+
+
 def session_list(request):
     """显示学习记录列表，支持按课程和日期筛选"""
     # 使用select_related优化查询，避免N+1问题
@@ -23,17 +43,23 @@ def session_list(request):
     date_start = request.GET.get('date_start')
     date_end = request.GET.get('date_end')
 
-    # 筛选逻辑
+    # 筛选逻辑（日期转换为时间范围，走 course/start_time 复合索引）
     if course_id:
         sessions = sessions.filter(course_id=course_id)
-    if date_start:
-        sessions = sessions.filter(start_time__date__gte=date_start)
-    if date_end:
-        sessions = sessions.filter(end_time__date__lte=date_end)
+    start_from = local_day_start(date_start)
+    if start_from:
+        sessions = sessions.filter(start_time__gte=start_from)
+    end_before = local_day_start(date_end, days=1)
+    if end_before:
+        # 开始时间不晚于结束时间，补充 start_time 上界以便索引范围扫描
+        sessions = sessions.filter(start_time__lt=end_before, end_time__lt=end_before)
 
+    # 键集分页：按 (start_time, id) 定位，翻到第N页与第1页代价相同
+    page = paginate_keyset(request, sessions)
 
     context = {
-        'sessions': sessions,
+        'sessions': page.object_list,
+        'page': page,
         'courses': courses,
     }
     return render(request, 'tracker/session_list.html', context)
@@ -68,6 +94,72 @@ def session_update(request, pk):
     return render(request, 'tracker/session_form.html', {'form': form, 'title': '编辑记录'})
 
 
+def session_import(request):
+    """批量导入学习记录（CSV/JSONL，流式读取、分批插入）"""
+    from io import TextIOWrapper
+    from .importers import DEFAULT_BATCH_SIZE, guess_format, import_sessions
+
+    report = None
+    if request.method == 'POST':
+        upload = request.FILES.get('file')
+        if not upload:
+            messages.error(request, '请选择要导入的文件')
+            return redirect('session_import')
+        fmt = request.POST.get('format') or guess_format(upload.name)
+        try:
+            batch_size = max(1, int(request.POST.get('batch_size') or DEFAULT_BATCH_SIZE))
+        except ValueError:
+            batch_size = DEFAULT_BATCH_SIZE
+        try:
+            # 上传文件逐行解码读取，不一次性读入内存
+            stream = TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+            report = import_sessions(stream, fmt, batch_size)
+        except (ValueError, UnicodeDecodeError) as e:
+            messages.error(request, f'导入失败：{e}')
+            return redirect('session_import')
+        if report.created:
+            messages.success(request, report.summary())
+        else:
+            messages.warning(request, report.summary())
+
+    return render(request, 'tracker/session_import.html', {
+        'report': report,
+        'default_batch_size': DEFAULT_BATCH_SIZE,
+    })
+
+
+def export_data(request, table):
+    """流式导出学习记录/番茄钟/复习计划：?format=csv|jsonl&gzip=1&since=水位线
+
+    本次导出的水位线放在响应头 X-Export-Watermark 中，下次作为 since 传入即可增量导出
+    """
+    from django.http import StreamingHttpResponse
+    from .exporters import EXPORT_FORMATS, EXPORT_TABLES, export_filename, export_stream, next_watermark, parse_since
+
+    if table not in EXPORT_TABLES:
+        return JsonResponse({'error':f'不支持导出的表：{table}'},status=404)
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return JsonResponse({'error':f'不支持的格式：{fmt}'},status=400)
+    try:
+        since = parse_since(request.GET.get('since'))
+    except ValueError as e:
+        return JsonResponse({'error':str(e)},status=400)
+    compress = request.GET.get('gzip') in ('1', 'true', 'yes')
+
+    # 响应头先于内容发出，先确定本次导出的上界
+    until = next_watermark(table, since)
+    content_type = 'text/csv; charset=utf-8' if fmt == 'csv' else 'application/x-ndjson; charset=utf-8'
+    response = StreamingHttpResponse(
+        export_stream(table, fmt, since, compress, until=until),
+        content_type='application/gzip' if compress else content_type,
+    )
+    response['Content-Disposition'] = f'attachment; filename="{export_filename(table, fmt, compress)}"'
+    if until is not None:
+        response['X-Export-Watermark'] = str(until)
+    return response
+
+
 def session_delete(request, pk):
     """删除学习记录"""
     session = get_object_or_404(StudySession, pk=pk)
@@ -80,9 +172,10 @@ def session_delete(request, pk):
 
 
 from django.views import View
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import condition, require_GET
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 import os
 # Create your views here.
 '''
@@ -96,9 +189,15 @@ class CourseListView(ListView):
     template_name='course/course_list.html' # 模版路径（Django自动找templates目录）
     context_object_name='courses' # 模版中使用的变量
 
+    def get_context_data(self, **kwargs):
+        # ListView自带的分页基于OFFSET，这里改用键集分页
+        page=paginate_keyset(self.request,self.object_list)
+        return super().get_context_data(object_list=page.object_list,page=page,**kwargs)
+
 class CourseDetailView(DetailView):
     """课程详细视图"""
     model=Course
+    queryset=Course.objects.select_related('study_stat')  # 总学习时长直接读取汇总表
     template_name='course/course_detail.html'
     
 class CourseCreateView(CreateView):
@@ -120,33 +219,30 @@ class CourseUpdateView(UpdateView):
     template_name = 'course/course_form.html'
     success_url = reverse_lazy('course_list')
 
-# AI Agent相关导入
+# AI Agent相关（LangChain等依赖在首次调用时才导入，见 tracker/llm.py）
+import json
 import sys
 import tempfile
-from langchain_openai import ChatOpenAI
-from langchain.memory import ConversationBufferMemory
-from langchain_community.chat_message_histories import ChatMessageHistory
-from .tools import parse_pdf, get_current_time, search_course, import_study_session
+from importlib import import_module
+from typing import NamedTuple
 
-def simple_agent(question: str, pdf_path=None, chat_history=None)->str:
-    """简单的Agent实现：直接判断并调用工具"""
-    # 获取API密钥
-    api_key=os.environ.get('SCHOOL_LLM_API_KEY','')
-    if not api_key:
-        raise ValueError("未配置API密钥，请设置环境变量 SCHOOL_LLM_API_KEY")
-    # 创建LLM
-    llm=ChatOpenAI(
-        model="ecnu-max",
-        api_key=api_key,
-        base_url="https://chat.ecnu.edu.cn/open/api/v1",
-        temperature=0.7
-    )
+from asgiref.sync import sync_to_async
+from .llm import get_api_key, get_chat_model
+
+class ToolCall(NamedTuple):
+    """按关键词选中的工具：调用 tool(args)，结果按 template 组成回答；args 为None时先由大模型从问题中提取"""
+    tool: object
+    args: dict = None
+    template: str = "{}"
+
+def plan_tool(question: str):
+    """按关键词选择工具（时间、课程搜索、资料统计、导入记录），返回 ToolCall；可以直接回复时返回提示文字；都没有命中时返回None"""
+    from .tools import get_current_time, search_course, import_study_session, list_study_materials
     # 1. 判断是否需要调用工具
     # 检查是否需要获取时间
     time_keywords=["现在几点了", "现在什么时间", "当前时间", "现在时间", "几点了"]
     if any(keyword in question for keyword in time_keywords):
-        current_time = get_current_time.invoke({})
-        return f"当前时间是：{current_time}"
+        return ToolCall(get_current_time, {}, "当前时间是：{}")
     # 检查是否需要搜索课程
     course_keywords = ["搜索课程", "找课程", "查找课程", "课程搜索", "找一下", "帮我找"]
     if any(keyword in question for keyword in course_keywords):
@@ -157,17 +253,30 @@ def simple_agent(question: str, pdf_path=None, chat_history=None)->str:
         if not course_name or len(course_name) < 2:
             return "请告诉我你想搜索哪个课程，例如：'搜索高等数学'、'找Python编程课程'"
         
-        result = search_course.invoke({"course_name": course_name})
-        return f"搜索结果：{result}"
+        return ToolCall(search_course, {"course_name": course_name}, "搜索结果：{}")
 
-    # 检查是否需要导入学习记录
+    # 检查是否需要查看学习资料统计
+    material_keywords = ["查看资料", "资料统计", "学习资料统计", "资料学习情况"]
+    if any(keyword in question for keyword in material_keywords):
+        course_name = question
+        for keyword in material_keywords:
+            course_name = course_name.replace(keyword, "").strip()
+        course_name = course_name.strip("：:，,。 ")
+        return ToolCall(list_study_materials, {"course_name": course_name}, "学习资料统计：{}")
+
+    # 检查是否需要导入学习记录（使用LLM提取学习记录信息）
     import_keywords = ["导入学习记录", "添加学习记录", "记录学习", "保存学习", "记录一下", "导入记录"]
     if any(keyword in question for keyword in import_keywords):
-        # 使用LLM提取学习记录信息
-        # 先获取当前时间，帮助处理相对时间
-        current_time_str = get_current_time.invoke({})
+        return ToolCall(import_study_session)
+    return None
+
+def import_record_messages(question: str):
+    """让大模型从问题中提取学习记录的消息"""
+    from .tools import get_current_time
+    # 先获取当前时间，帮助处理相对时间
+    current_time_str = get_current_time.invoke({})
 
-        extract_prompt = f"""从用户的问题中提取学习记录信息，返回JSON格式：
+    extract_prompt = f"""从用户的问题中提取学习记录信息，返回JSON格式：
 {{
     "course_name": "课程名称",
     "start_time": "开始时间（格式：YYYY-MM-DD HH:MM，例如：2025-12-30 14:00）",
@@ -188,65 +297,99 @@ def simple_agent(question: str, pdf_path=None, chat_history=None)->str:
 
 只返回JSON格式，例如：
 {{"course_name": "Python基础", "start_time": "2025-12-30 14:00", "end_time": "2025-12-30 16:00", "notes": ""}}"""
+    return [("system", "你是一个数据提取助手，必须只返回有效的JSON格式数据，不要添加任何解释文字。"), ("human", extract_prompt)]
+
+def parse_import_record(extract_response):
+    """从大模型的回复中取出学习记录（import_study_session 的参数），取不出或信息不完整时返回提示文字"""
+    import re
+    # 尝试从响应中提取JSON
+    response_text = extract_response.content if hasattr(extract_response, 'content') else str(extract_response)
+    # 清理响应文本，移除可能的markdown代码块标记
+    response_text = response_text.strip()
+    if response_text.startswith('```'):
+        # 移除markdown代码块
+        response_text = re.sub(r'^```(?:json)?\s*', '', response_text)
+        response_text = re.sub(r'\s*```$', '', response_text)
+
+    # 查找JSON部分（更宽松的匹配）
+    json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', response_text, re.DOTALL)
+    if not json_match:
+        return f"❌ 无法从AI响应中提取JSON格式。AI返回的内容：{response_text[:200]}。请直接提供：课程名称、开始时间、结束时间（格式：YYYY-MM-DD HH:MM）"
+    try:
+        record_data = json.loads(json_match.group())
+    except json.JSONDecodeError as je:
+        return f"❌ JSON解析失败：{str(je)}。AI返回的内容：{response_text[:200]}"
+    course_name = record_data.get("course_name", "").strip()
+    start_time = record_data.get("start_time", "").strip()
+    end_time = record_data.get("end_time", "").strip()
+    notes = record_data.get("notes", "").strip()
+
+    # 验证必要字段
+    if not course_name:
+        return "❌ 缺少课程名称，请提供课程名称，例如：'导入学习记录：Python基础，2025-12-30 14:00到16:00'"
+    if not start_time:
+        return "❌ 缺少开始时间，请提供开始时间（格式：YYYY-MM-DD HH:MM），例如：2025-12-30 14:00"
+    if not end_time:
+        return "❌ 缺少结束时间，请提供结束时间（格式：YYYY-MM-DD HH:MM），例如：2025-12-30 16:00"
+    return {
+        "course_name": course_name,
+        "start_time": start_time,
+        "end_time": end_time,
+        "notes": notes
+    }
 
-        try:
-            extract_response = llm.invoke([("system", "你是一个数据提取助手，必须只返回有效的JSON格式数据，不要添加任何解释文字。"), ("human", extract_prompt)])
-            import json
-            import re
-            # 尝试从响应中提取JSON
-            response_text = extract_response.content if hasattr(extract_response, 'content') else str(extract_response)
-            # 清理响应文本，移除可能的markdown代码块标记
-            response_text = response_text.strip()
-            if response_text.startswith('```'):
-                # 移除markdown代码块
-                response_text = re.sub(r'^```(?:json)?\s*', '', response_text)
-                response_text = re.sub(r'\s*```$', '', response_text)
-
-            # 查找JSON部分（更宽松的匹配）
-            json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', response_text, re.DOTALL)
-            if json_match:
-                try:
-                    record_data = json.loads(json_match.group())
-                    course_name = record_data.get("course_name", "").strip()
-                    start_time = record_data.get("start_time", "").strip()
-                    end_time = record_data.get("end_time", "").strip()
-                    notes = record_data.get("notes", "").strip()
-
-                    # 验证必要字段
-                    if not course_name:
-                        return "❌ 缺少课程名称，请提供课程名称，例如：'导入学习记录：Python基础，2025-12-30 14:00到16:00'"
-                    if not start_time:
-                        return "❌ 缺少开始时间，请提供开始时间（格式：YYYY-MM-DD HH:MM），例如：2025-12-30 14:00"
-                    if not end_time:
-                        return "❌ 缺少结束时间，请提供结束时间（格式：YYYY-MM-DD HH:MM），例如：2025-12-30 16:00"
-
-                    # 调用导入工具
-                    result = import_study_session.invoke({
-                        "course_name": course_name,
-                        "start_time": start_time,
-                        "end_time": end_time,
-                        "notes": notes
-                    })
-                    return result
-                except json.JSONDecodeError as je:
-                    return f"❌ JSON解析失败：{str(je)}。AI返回的内容：{response_text[:200]}"
-            else:
-                return f"❌ 无法从AI响应中提取JSON格式。AI返回的内容：{response_text[:200]}。请直接提供：课程名称、开始时间、结束时间（格式：YYYY-MM-DD HH:MM）"
-        except Exception as e:
-            import traceback
-            error_detail = traceback.format_exc()
-            return f"❌ 导入学习记录时出错：{str(e)}。详细信息：{error_detail[:300]}。请直接提供：课程名称、开始时间、结束时间（格式：YYYY-MM-DD HH:MM）"
-    # 检查是否需要解析PDF
+def import_record_error(e):
+    """导入学习记录出错时的回答（在except中调用）"""
+    import traceback
+    error_detail = traceback.format_exc()
+    return f"❌ 导入学习记录时出错：{str(e)}。详细信息：{error_detail[:300]}。请直接提供：课程名称、开始时间、结束时间（格式：YYYY-MM-DD HH:MM）"
+
+def agent_tools(question: str, llm):
+    """按关键词调用工具，返回答案；都没有命中时返回None"""
+    plan=plan_tool(question)
+    if not isinstance(plan, ToolCall):
+        return plan
+    if plan.args is not None:
+        return plan.template.format(plan.tool.invoke(plan.args))
+    try:
+        record=parse_import_record(llm.invoke(import_record_messages(question)))
+        return record if isinstance(record, str) else plan.tool.invoke(record)
+    except Exception as e:
+        return import_record_error(e)
+
+async def aagent_tools(question: str, llm):
+    """agent_tools 的异步版本：大模型用 ainvoke 调用，工具用 ainvoke 调用（ORM查询经 sync_to_async 执行，见 tools.py）"""
+    plan=plan_tool(question)
+    if not isinstance(plan, ToolCall):
+        return plan
+    if plan.args is not None:
+        return plan.template.format(await plan.tool.ainvoke(plan.args))
+    try:
+        record=parse_import_record(await llm.ainvoke(import_record_messages(question)))
+        return record if isinstance(record, str) else await plan.tool.ainvoke(record)
+    except Exception as e:
+        return import_record_error(e)
+
+def pdf_wanted(question: str, pdf_path=None)->bool:
+    """是否针对上传的PDF提问"""
     if pdf_path and os.path.exists(pdf_path):
         pdf_keywords=["pdf","文档","文件","内容","总结","概述"]
-        if any(keyword in question.lower() for keyword in pdf_keywords) or len(question) > 10:
-            try:
-                answer=parse_pdf.invoke({"pdf_path":pdf_path, "question":question})
-                return answer
-            except Exception as e:
-                return f"PDF解析出错：{str(e)}"
-    
-    # 2. 如果不需要工具，直接使用LLM回答
+        return any(keyword in question.lower() for keyword in pdf_keywords) or len(question) > 10
+    return False
+
+def pdf_busy_message(ingestion):
+    """
+    PDF仍在后台解析时的提示；解析完成或没有任务时返回None
+
+    上传时已在后台解析（见 pdf_ingest.py），提问前先用 wait_for_ingestion / await_ingestion 稍等
+    """
+    from .pdf_ingest import is_active
+    if ingestion is not None and is_active(ingestion):
+        return f"PDF正在后台解析（已完成{ingestion.progress:.0%}），解析完成后再提问即可。"
+    return None
+
+def chat_messages(question: str, chat_history=None):
+    """直接问大模型时的消息（带上最近5条对话历史）"""
     if chat_history:
         messages=[]
         for msg in chat_history[-5:]:  # 只取最近5条
@@ -257,9 +400,89 @@ def simple_agent(question: str, pdf_path=None, chat_history=None)->str:
         messages.append(("human",question))
     else:
         messages = [("system", "你是一个智能学习助手，可以帮助用户学习各种知识。"), ("human", question)]
-    response = llm.invoke(messages)
+    return messages
+
+def simple_agent(question: str, pdf_path=None, chat_history=None)->str:
+    """简单的Agent实现：直接判断并调用工具"""
+    from .tools import parse_pdf
+    # 获取API密钥
+    api_key=get_api_key()
+    # 创建LLM
+    llm=get_chat_model(api_key)
+    answer=agent_tools(question, llm)
+    if answer is not None:
+        return answer
+    # 检查是否需要解析PDF
+    if pdf_wanted(question, pdf_path):
+        from .pdf_ingest import wait_for_ingestion
+        busy=pdf_busy_message(wait_for_ingestion(pdf_path))
+        if busy:
+            return busy
+        try:
+            answer=parse_pdf.invoke({"pdf_path":pdf_path, "question":question})
+            return answer
+        except Exception as e:
+            return f"PDF解析出错：{str(e)}"
+    
+    # 2. 如果不需要工具，直接使用LLM回答
+    response = llm.invoke(chat_messages(question, chat_history))
     return response.content if hasattr(response, 'content') else str(response)
 
+async def asimple_agent(question: str, pdf_path=None, chat_history=None)->str:
+    """
+    simple_agent 的异步版本
+
+    大模型和PDF问答链用 ainvoke 调用，等待回答时不占用线程，一个ASGI进程可以同时处理大量对话；
+    工具里的ORM查询经 sync_to_async 执行（见 tools.py），等待PDF解析用异步ORM轮询。
+    """
+    from .pdf_ingest import await_ingestion
+    from .tools import parse_pdf
+    llm=get_chat_model(get_api_key())
+    answer=await aagent_tools(question, llm)
+    if answer is not None:
+        return answer
+    if pdf_wanted(question, pdf_path):
+        busy=pdf_busy_message(await await_ingestion(pdf_path))
+        if busy:
+            return busy
+        try:
+            return await parse_pdf.ainvoke({"pdf_path":pdf_path, "question":question})
+        except Exception as e:
+            return f"PDF解析出错：{str(e)}"
+    response=await llm.ainvoke(chat_messages(question, chat_history))
+    return response.content if hasattr(response, 'content') else str(response)
+
+async def stream_agent(question: str, pdf_path=None, chat_history=None):
+    """
+    asimple_agent 的流式版本：逐段产出回答
+
+    工具的结果整段产出，大模型（直接回答或PDF问答链）的回答按token产出。
+    """
+    from .pdf_ingest import await_ingestion
+    llm=get_chat_model(get_api_key())
+    answer=await aagent_tools(question, llm)
+    if answer is not None:
+        yield answer
+        return
+    if pdf_wanted(question, pdf_path):
+        busy=pdf_busy_message(await await_ingestion(pdf_path))
+        if busy:
+            yield busy
+            return
+        from .tools import pdf_qa_chain
+        try:
+            chain=await sync_to_async(pdf_qa_chain, thread_sensitive=False)(pdf_path)
+            # 问答链的记忆每次都是新的，不会先调用模型改写问题，流出的token都是最终回答
+            async for event in chain.astream_events({"question":question}, version="v2"):
+                if event["event"]=="on_chat_model_stream" and event["data"]["chunk"].content:
+                    yield event["data"]["chunk"].content
+        except Exception as e:
+            yield f"PDF解析出错：{str(e)}"
+        return
+    async for chunk in llm.astream(chat_messages(question, chat_history)):
+        if chunk.content:
+            yield chunk.content
+
 # Agent视图
 class AgentView(View):
     """智能助手页面"""
@@ -268,6 +491,7 @@ class AgentView(View):
         """显示聊天页面"""
         pdf_path=request.session.get('pdf_file_path')
         pdf_name=request.session.get('pdf_file_name', '')
+        ingestion_id=request.session.get('pdf_ingestion_id')
         
         # 获取聊天历史
         chat_history = request.session.get('chat_history', [])
@@ -276,52 +500,26 @@ class AgentView(View):
             'has_pdf': bool(pdf_path),
             'pdf_name': pdf_name,
             'chat_history': chat_history,
+            # 页面打开时PDF仍在解析，继续轮询进度
+            'ingestion_status_url': reverse('pdf_ingestion_status', args=[ingestion_id]) if ingestion_id else '',
         }
         return render(request, self.template_name, context)
 
 
-def agent_chat(request):
-    """处理Agent聊天请求"""
+async def agent_chat(request):
+    """处理Agent聊天请求（异步视图，以 ASGI 部署时等待大模型不占用线程）"""
     if request.method!='POST':
         return JsonResponse({'error':'只支持POST请求'},status=400)
     # 获取用户消息
     question=request.POST.get('question','').strip()
     if not question:
         return JsonResponse({'error':'请输入问题'},status=400)
-    # 获取PDF路径
-    pdf_path=request.session.get('pdf_file_path')
-    # 初始化对话历史（从session获取）
-    if 'chat_history' not in request.session:
-        request.session['chat_history']=[]
-    # 创建Memory（从session恢复）
-    chat_history=ChatMessageHistory()
-    # 恢复历史消息
-    for msg in request.session['chat_history']:
-        if msg['type']=='human':
-            chat_history.add_user_message(msg['content'])
-        elif msg['type']=='ai':
-            chat_history.add_ai_message(msg['content'])
-    
-    memory=ConversationBufferMemory(
-        chat_memory=chat_history,
-        memory_key="chat_history",
-        return_messages=True
-    )
-    
+    # 获取PDF路径和对话历史（从session获取）
+    pdf_path,chat_history=await sync_to_async(_chat_state)(request)
     try:
         # Agent实现
-        chat_history_list=request.session.get('chat_history',[])
-        answer=simple_agent(question,pdf_path,chat_history_list)
-        request.session['chat_history'].append({
-            'type':'human',
-            'content':question
-        })
-        request.session['chat_history'].append({
-            'type':'ai',
-            'content':answer
-        })
-        if len(request.session['chat_history']) > 20:
-            request.session['chat_history'] = request.session['chat_history'][-20:]
+        answer=await asimple_agent(question,pdf_path,chat_history)
+        await sync_to_async(save_chat_turn)(request.session, question, answer)
         return JsonResponse({
             'success': True,
             'answer':answer
@@ -335,6 +533,61 @@ def agent_chat(request):
             'error': f'处理失败: {str(e)}'
         }, status=500)
 
+def save_chat_turn(session, question, answer):
+    """把一轮问答追加到session的对话历史（只保留最近20条）"""
+    chat_history=session.get('chat_history',[])
+    chat_history+=[{'type':'human','content':question},{'type':'ai','content':answer}]
+    session['chat_history']=chat_history[-20:]
+
+def sse_event(event, data):
+    """一条 Server-Sent Events 消息"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def _chat_state(request):
+    # 新会话在这里写入session，由中间件保存并下发cookie（流式接口在开始推送前）
+    chat_history=request.session.setdefault('chat_history',[])
+    return request.session.get('pdf_file_path'), list(chat_history)
+
+def _save_streamed_turn(session_key, question, answer):
+    # 推送结束时中间件早已保存过session：重新读取（期间可能清空过对话）后追加并保存
+    session=import_module(settings.SESSION_ENGINE).SessionStore(session_key)
+    save_chat_turn(session, question, answer)
+    session.save()
+
+async def agent_chat_stream(request):
+    """
+    处理Agent聊天请求（流式）：以 Server-Sent Events 边生成边返回回答，推送结束后写入对话历史
+
+    事件：token（{"text": 回答片段}）、done（{"answer": 完整回答}）、error（{"error": 错误信息}）。
+    以 ASGI（learning_tracker/asgi.py，如 uvicorn learning_tracker.asgi:application）部署时
+    首个token生成即发送，等待模型时不占用工作线程；WSGI 下会在回答全部生成后一次返回。
+    """
+    if request.method!='POST':
+        return JsonResponse({'error':'只支持POST请求'},status=400)
+    question=request.POST.get('question','').strip()
+    if not question:
+        return JsonResponse({'error':'请输入问题'},status=400)
+    pdf_path,chat_history=await sync_to_async(_chat_state)(request)
+
+    async def events():
+        pieces=[]
+        try:
+            async for piece in stream_agent(question,pdf_path,chat_history):
+                pieces.append(piece)
+                yield sse_event('token',{'text':piece})
+            answer=''.join(pieces)
+            await sync_to_async(_save_streamed_turn)(request.session.session_key,question,answer)
+            yield sse_event('done',{'answer':answer})
+        except Exception as e:
+            import traceback
+            print(f"Agent错误:\n{traceback.format_exc()}", file=sys.stderr)
+            yield sse_event('error',{'error':f'处理失败: {str(e)}'})
+
+    response=StreamingHttpResponse(events(),content_type='text/event-stream; charset=utf-8')
+    response['Cache-Control']='no-cache'
+    response['X-Accel-Buffering']='no'  # 经 nginx 反向代理时不缓冲
+    return response
+
 def upload_pdf(request):
     """上传PDF文件（只上传一次）"""
     if request.method!='POST':
@@ -350,22 +603,35 @@ def upload_pdf(request):
         with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf',dir=temp_dir) as temp_file:
             temp_file_path=temp_file.name
             temp_file.write(content)
+        # 后台解析（加载→分块→嵌入→建索引），页面轮询进度
+        from .pdf_ingest import start_ingestion
+        ingestion=start_ingestion(temp_file_path, file.name)
         # 保存文件路径到session
         request.session['pdf_file_path']=temp_file_path
         request.session['pdf_file_name']=file.name
+        request.session['pdf_ingestion_id']=ingestion.pk
         # 初始化对话历史（新的PDF，重置对话）
         request.session['chat_history']=[]
         return JsonResponse({
             'success':True,
             'filename':file.name,
-            'message':'PDF上传成功，可以开始对话了！'
-        })
+            'message':'PDF上传成功，正在后台解析，解析完成后即可针对PDF提问' if ingestion.status!=ingestion.DONE
+            else 'PDF上传成功，可以开始对话了！',
+            'ingestion':ingestion.as_dict(),
+            'progress_url':reverse('pdf_ingestion_status', args=[ingestion.pk]),
+        }, json_dumps_params={'ensure_ascii': False})
     except Exception as e:
         import traceback
         error_detail=traceback.format_exc()
         print(f"上传错误:\n{error_detail}",file=sys.stderr)
         return JsonResponse({'error': f'上传失败: {str(e)}'},status=500)
 
+@require_GET
+def pdf_ingestion_status(request, pk):
+    """PDF后台解析进度（智能助手页面轮询）"""
+    ingestion=get_object_or_404(PdfIngestion, pk=pk)
+    return JsonResponse(ingestion.as_dict(), json_dumps_params={'ensure_ascii': False})
+
 def clear_chat(request):
     """清空对话历史"""
     if 'chat_history' in request.session:
@@ -383,8 +649,11 @@ def pomodoro_list(request):
     if course_id:
         pomodoros = pomodoros.filter(course_id=course_id)
 
+    page = paginate_keyset(request, pomodoros)
+
     context = {
-        'pomodoros': pomodoros,
+        'pomodoros': page.object_list,
+        'page': page,
         'courses': courses,
     }
     return render(request, 'tracker/pomodoro_list.html', context)
@@ -469,9 +738,13 @@ def review_list(request):
     if not show_completed:
         reviews = reviews.filter(completed=False)
 
+    page=paginate_keyset(request, reviews)
+
     context={
-        'reviews':reviews,
+        'reviews':page.object_list,
+        'page':page,
         'courses':courses,
+        'grade_choices':GRADE_CHOICES,
     }
     return render(request, 'tracker/review_list.html', context)
 
@@ -522,9 +795,9 @@ def review_auto_generate(request):
             messages.warning(request, f'课程"{course.name}"还没有学习记录，无法生成复习计划')
             return redirect('review_list')
 
-        # 使用最近一次学习记录的开始时间作为学习日期
+        # 使用最近一次学习记录的开始时间作为学习日期（按本地日期）
         last_session = sessions[0]
-        study_date = last_session.start_time
+        study_date = timezone.localtime(last_session.start_time)
 
         # 检查是否已有复习计划
         existing_reviews = ReviewSchedule.objects.filter(course=course, material=material)
@@ -538,18 +811,36 @@ def review_auto_generate(request):
         # 生成复习计划（生成3个）
         schedule = generate_review_schedule(study_date, review_count, max_reviews=3)
 
-        created_count = 0
-        for review_date, review_num in schedule:
-            # 检查是否已存在该日期的复习计划
-            if not existing_reviews.filter(review_date=review_date.date()).exists():
-                ReviewSchedule.objects.create(
-                    course=course,
-                    material=material,
-                    review_date=review_date.date(),
-                    review_count=review_count,
-                    completed=False
-                )
-                created_count += 1
+        # 唯一约束保证同一天只有一条计划：已存在的日期由数据库忽略，一条语句完成插入
+        study_day = study_date.date()
+        review_dates = sorted({review_date.date() for review_date, _ in schedule})
+        if leveling_enabled():
+            # 负载均衡：在浮动窗口内挑待复习计划最少的一天，窗口内已有计划的不再生成
+            load_index = get_day_load_index()
+            scheduled, blocked = set(), set()
+            for day, done in existing_reviews.filter(review_date__gt=study_day).values_list('review_date', 'completed'):
+                (blocked if done else scheduled).add(day)
+            placed = [
+                load_index.place(day, (day - study_day).days, scheduled, study_day + timedelta(days=1), blocked)
+                for day in review_dates
+            ]
+            review_dates = [day for day, exists in placed if not exists]
+        existing_days = set(existing_reviews.filter(review_date__in=review_dates).values_list('review_date', flat=True))
+        ReviewSchedule.objects.bulk_create([
+            ReviewSchedule(
+                course=course,
+                material=material,
+                review_date=review_date,
+                review_count=review_count,
+                completed=False,
+                last_reviewed=study_day
+            )
+            for review_date in review_dates
+        ], ignore_conflicts=True)
+        # 按插入后的结果统计新建的计划（并发写入的同日计划同样会让插入被忽略）
+        created_count = len(set(
+            existing_reviews.filter(review_date__in=review_dates, completed=False).values_list('review_date', flat=True)
+        ) - existing_days)
 
         if created_count > 0:
             messages.success(request, f'已为"{course.name}"自动生成{created_count}个复习计划（基于遗忘曲线算法）')
@@ -576,36 +867,80 @@ def review_auto_generate(request):
     return render(request, 'tracker/review_auto_generate.html', context)
 
 def review_complete(request, pk):
-    """标记复习完成"""
+    """标记复习完成，grade 为本次复习评分（1忘记 2困难 3良好 4简单，默认3）"""
 
     review=get_object_or_404(ReviewSchedule, pk=pk)
-    review.completed=True
-    review.review_count += 1
-    review.save()
-
-    # 自动生成下一次复习计划（基于遗忘曲线）
-    # 使用创建时间作为学习日期，或者使用当前日期
-    study_date = review.created_at if review.created_at else datetime.now()
-    next_review_date = get_next_review_date(study_date, review.review_count)
-
-    # 检查是否已存在下一次复习计划
-    existing = ReviewSchedule.objects.filter(
-        course=review.course,
-        material=review.material,
-        review_date=next_review_date.date()
-    ).exists()
-
-    if not existing:
-        ReviewSchedule.objects.create(
+    try:
+        grade=parse_grade(request.POST.get('grade') or request.GET.get('grade'))
+    except ValueError as e:
+        messages.error(request, str(e))
+        return redirect('review_list')
+
+    # 由调度引擎根据复习前的记忆状态计算下次复习：固定间隔表以创建时间作为学习日期，
+    # 自适应引擎只用这条计划上保存的稳定性/难度/上次复习日期，curve 引擎用该课程/资料拟合的遗忘曲线；
+    # 距上次学习/复习的天数和评分一起记下，作为拟合遗忘曲线的样本
+    options={}
+    if settings.REVIEW_SCHEDULER==CurveScheduler.name:
+        from .curve_fit import get_fitted_curves
+        options['curve']=get_fitted_curves().get(review.course_id, review.material_id)
+    scheduler=get_scheduler(settings.REVIEW_SCHEDULER, **options)
+    today=timezone.localdate()
+    # 学习日期按本地时间（与 elapsed_days 和自动生成复习计划一致，零点到八点创建的计划不会算到前一天）
+    study_date = timezone.localtime(review.created_at) if review.created_at else timezone.localtime()
+    seen=review.last_reviewed or study_date.date()
+    state, next_review_date = scheduler.review(review.memory_state(), grade, today, study_date)
+    # 同一学习项之后的计划：已完成的日期受唯一约束不能再插入，待复习的日期可以沿用
+    scheduled, blocked = set(), set()
+    for day, done in ReviewSchedule.objects.filter(
+        course=review.course, material=review.material, review_date__gt=today
+    ).exclude(pk=review.pk).values_list('review_date', 'completed'):
+        (blocked if done else scheduled).add(day)
+    if leveling_enabled():
+        # 负载均衡：窗口内已有待复习计划时沿用该计划，否则挑待复习计划最少的一天
+        next_review_date, _ = get_day_load_index().place(
+            next_review_date, (next_review_date - today).days, scheduled, today + timedelta(days=1), blocked
+        )
+    else:
+        # 这一天已有完成的计划时顺延到下一个空闲日期，否则插入会被忽略，复习项没有下次复习
+        while next_review_date in blocked:
+            next_review_date += timedelta(days=1)
+
+    next_reviews=ReviewSchedule.objects.filter(
+        course=review.course, material=review.material, review_date=next_review_date
+    )
+    with transaction.atomic():
+        if not review.completed:
+            release_reviews([(review.review_date, 1)])
+        review.completed=True
+        review.review_count=state.review_count
+        review.grade=grade
+        review.elapsed_days=(today-seen).days
+        review.last_reviewed=today
+        review.save()
+
+        # 已存在同一天的计划时由唯一约束忽略
+        ReviewSchedule.objects.bulk_create([ReviewSchedule(
             course=review.course,
             material=review.material,
-            review_date=next_review_date.date(),
-            review_count=review.review_count,
-            completed=False
-        )
-        messages.success(request, f'复习已完成！已自动生成下次复习计划：{next_review_date.date()}')
+            review_date=next_review_date,
+            review_count=state.review_count,
+            completed=False,
+            stability=state.stability,
+            difficulty=state.difficulty,
+            last_reviewed=state.last_reviewed,
+        )], ignore_conflicts=True)
+        if state.stability is not None:
+            # 同一天已有待复习计划时，把最新的记忆状态写到那一条上
+            next_reviews.filter(completed=False).update(
+                stability=state.stability, difficulty=state.difficulty, last_reviewed=state.last_reviewed,
+                updated_at=timezone.now(),
+            )
+        # 插入可能因并发写入的同日计划被忽略，按实际结果提示
+        has_next=next_reviews.filter(completed=False).exists()
+    if has_next:
+        messages.success(request, f'复习已完成！下次复习日期：{next_review_date}')
     else:
-        messages.success(request, '复习已完成！')
+        messages.warning(request, f'复习已完成！但{next_review_date}已有复习计划，未能安排下次复习，请重新生成复习计划')
 
     return redirect('review_list')
 
@@ -630,8 +965,11 @@ def knowledge_list(request):
     if course_id:
         knowledge_points = knowledge_points.filter(course_id=course_id)
 
+    page = paginate_keyset(request, knowledge_points)
+
     context = {
-        'knowledge_points': knowledge_points,
+        'knowledge_points': page.object_list,
+        'page': page,
         'courses': courses,
     }
     return render(request, 'tracker/knowledge_list.html', context)
@@ -662,7 +1000,8 @@ def knowledge_delete(request, pk):
 def material_list(request):
     """学习资料列表"""
     # 使用select_related优化查询，避免N+1问题
-    materials=StudyMaterial.objects.select_related('course').all()
+    # with_study_stats()一次分组查询附带学习时长，避免逐行查询学习记录
+    materials=StudyMaterial.objects.select_related('course').with_study_stats()
     courses=Course.objects.all()
 
     # 筛选
@@ -674,8 +1013,11 @@ def material_list(request):
     if material_type:
         materials=materials.filter(material_type=material_type)
 
+    page=paginate_keyset(request, materials)
+
     context = {
-        'materials':materials,
+        'materials':page.object_list,
+        'page':page,
         'courses':courses,
         'material_types':StudyMaterial.MATERIAL_TYPES,
     }
@@ -720,98 +1062,114 @@ def material_delete(request,pk):
 
 def dashboard(request):
     """仪表板：显示统计数据和图表"""
-    from django.db.models import Sum, Count
-    from datetime import datetime, timedelta
-    from pathlib import Path
-    import matplotlib
-    matplotlib.use('Agg')  # 非交互式后端
-    import matplotlib.pyplot as plt
-    from django.conf import settings
-    import platform
-
-    # 配置中文字体
-    system = platform.system()
-    if system == 'Windows':
-        # Windows系统常用中文字体
-        plt.rcParams['font.sans-serif'] = ['Microsoft YaHei', 'SimHei', 'SimSun', 'KaiTi', 'FangSong', 'sans-serif']
-    elif system == 'Darwin':  # macOS
-        plt.rcParams['font.sans-serif'] = ['Arial Unicode MS', 'PingFang SC', 'STHeiti', 'sans-serif']
-    else:  # Linux
-        plt.rcParams['font.sans-serif'] = ['WenQuanYi Micro Hei', 'WenQuanYi Zen Hei', 'Noto Sans CJK SC', 'sans-serif']
-    plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
-
-    # 统计数据
-    total_sessions = StudySession.objects.count()
-    total_time = StudySession.objects.aggregate(Sum('duration'))['duration__sum'] or 0
+    from django.db.models import Sum, F
+    from .charts import distribution_chart, trend_chart
+    from .models import DataVersion
+
+    # 统计数据（读取课程汇总表，不再扫描全部学习记录）
+    totals = CourseStudyStat.objects.aggregate(
+        total_sessions=Sum('session_count'),
+        total_time=Sum('total_minutes')
+    )
+    total_sessions = totals['total_sessions'] or 0
+    total_time = totals['total_time'] or 0
     total_time_hours = round(total_time / 60, 2)
 
-    # 今日学习
-    today = timezone.now().date()
-    today_sessions = StudySession.objects.filter(start_time__date=today)
-    today_time = today_sessions.aggregate(Sum('duration'))['duration__sum'] or 0
+    # 今日学习（读取每日汇总，按本地日期）
+    today = timezone.localdate()
+    today_time = DailyStudyStat.objects.filter(date=today).aggregate(Sum('total_minutes'))['total_minutes__sum'] or 0
     today_time_hours = round(today_time / 60, 2)
 
-    # 课程统计
-    course_stats = Course.objects.annotate(
-        total_time=Sum('studysession__duration')
-    ).order_by('-total_time')[:5]
-
-    # 生成图表
-    charts_dir = Path(settings.BASE_DIR) / 'static' / 'charts'
-    charts_dir.mkdir(parents=True, exist_ok=True)
-
-    # 1. 学习时长趋势图（最近30天）
-    thirty_days_ago = timezone.now() - timedelta(days=30)
-    daily_stats = StudySession.objects.filter(
-        start_time__gte=thirty_days_ago
-    ).extra(
-        select={'day': "DATE(start_time)"}
-    ).values('day').annotate(
-        total_duration=Sum('duration')
-    ).order_by('day')
-
-    if daily_stats:
-        dates = [item['day'] for item in daily_stats]
-        hours = [round(item['total_duration'] / 60, 2) for item in daily_stats]
-
-        plt.figure(figsize=(10, 6))
-        plt.plot(dates, hours, marker='o')
-        plt.title('学习时长趋势（最近30天）')
-        plt.xlabel('日期')
-        plt.ylabel('学习时长（小时）')
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        plt.savefig(str(charts_dir / 'trend.png'))
-        plt.close()
-        trend_chart = '/static/charts/trend.png'
-    else:
-        trend_chart = None
-
-    # 2. 课程时间分布饼图
-    if course_stats:
-        course_names = [c.name for c in course_stats if c.total_time]
-        course_times = [round((c.total_time or 0) / 60, 2) for c in course_stats if c.total_time]
-
-        if course_names and course_times:
-            plt.figure(figsize=(8, 8))
-            plt.pie(course_times, labels=course_names, autopct='%1.1f%%')
-            plt.title('课程时间分布')
-            plt.savefig(str(charts_dir / 'course_distribution.png'))
-            plt.close()
-            distribution_chart = '/static/charts/course_distribution.png'
-        else:
-            distribution_chart = None
-    else:
-        distribution_chart = None
+    # 课程统计（读取课程汇总）
+    course_stats = list(Course.objects.annotate(
+        total_time=F('study_stat__total_minutes')
+    ).order_by(F('total_time').desc(nulls_last=True))[:5])
 
+    # 图表按学习数据版本缓存，数据未变化时不重新绘制
+    version = DataVersion.current(DataVersion.STUDY).cache_key
     context = {
         'total_sessions': total_sessions,
         'total_time_hours': total_time_hours,
         'today_time_hours': today_time_hours,
         'course_stats': course_stats,
-        'trend_chart': trend_chart,
-        'distribution_chart': distribution_chart,
+        'trend_chart': trend_chart(version),
+        'distribution_chart': distribution_chart(version, course_stats),
     }
     return render(request, 'tracker/dashboard.html', context)
 
 
+def dashboard_chart(request, name):
+    """返回缓存的仪表板图表；文件名由数据版本哈希得到，内容不会变化，允许长期缓存"""
+    from django.http import FileResponse, Http404
+    from .charts import CACHE_MAX_AGE, CHART_NAME_RE, chart_dir
+
+    if not CHART_NAME_RE.match(name):
+        raise Http404('图表不存在')
+    try:
+        response = FileResponse(open(chart_dir() / name, 'rb'), content_type='image/png')
+    except FileNotFoundError:
+        raise Http404('图表不存在')
+    response['Cache-Control'] = f'public, max-age={CACHE_MAX_AGE}, immutable'
+    return response
+
+
+def _stats_state(request):
+    """统计接口的查询参数、数据版本和当天日期；ETag、Last-Modified 与视图共用，只查询一次"""
+    state = getattr(request, '_stats_state', None)
+    if state is None:
+        from .stats import StatsQuery, current_version
+        today = timezone.localdate()
+        try:
+            query = StatsQuery.from_params(request.GET, today)
+        except ValueError as e:
+            query = e
+        state = request._stats_state = (query, current_version(), today)
+    return state
+
+
+def _stats_etag(request):
+    from .stats import stats_etag
+    query, version, today = _stats_state(request)
+    return None if isinstance(query, ValueError) else stats_etag(query, version, today)
+
+
+def _stats_last_modified(request):
+    from .stats import stats_last_modified
+    query, version, today = _stats_state(request)
+    return None if isinstance(query, ValueError) else stats_last_modified(version, today)
+
+
+@require_GET
+@condition(etag_func=_stats_etag, last_modified_func=_stats_last_modified)
+def stats_api(request):
+    """学习统计JSON接口：?start=YYYY-MM-DD&end=YYYY-MM-DD&course=1,2
+    数据未变化时根据 If-None-Match / If-Modified-Since 返回304"""
+    from django.utils.cache import patch_cache_control
+    from .stats import compute_stats
+
+    query, version, today = _stats_state(request)
+    if isinstance(query, ValueError):
+        return JsonResponse({'error':str(query)},status=400)
+    data = compute_stats(query, today)
+    data['version'] = version.version
+    response = JsonResponse(data, json_dumps_params={'ensure_ascii': False})
+    # 允许缓存，但每次使用前必须带条件请求重新验证
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+@require_GET
+def review_queue_api(request):
+    """今日复习队列JSON接口：到期和逾期的复习计划按预测保留率从低到高排列
+    ?limit=20&course=1,2&cursor=上一页返回的next_cursor"""
+    from .review_queue import DEFAULT_LIMIT, get_due_queue
+
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+        course_ids = sorted({
+            int(part) for value in request.GET.getlist('course') for part in value.split(',') if part.strip()
+        })
+    except ValueError:
+        return JsonResponse({'error':'limit 和 course 必须为整数'},status=400)
+    queue = get_due_queue(limit, request.GET.get('cursor'), course_ids)
+    return JsonResponse(queue.as_dict(), json_dumps_params={'ensure_ascii': False})